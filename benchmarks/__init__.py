@@ -0,0 +1,6 @@
+"""Microbenchmarks for psycopg2-pgevents.
+
+Each benchmark is a module that can be run directly, e.g.::
+
+    python -m benchmarks.poll_debug
+"""
@@ -0,0 +1,95 @@
+"""Compare writer throughput under trigger-based and logical-decoding capture.
+
+The same workload of single-row inserts, each in a transaction of its own, is
+run against a table without capture, with row-level and statement-level
+triggers, and with a logical replication slot that is read after the
+workload, so that only the writers' cost is measured. Unlike the other
+benchmarks, this one needs a database, given by the ``BENCHMARK_DATABASE_DSN``
+environment variable; logical decoding additionally needs ``wal_level`` set
+to ``logical`` and the wal2json plugin.
+"""
+
+import sys
+import time
+from os import environ
+
+from psycopg2 import connect
+from psycopg2.extras import LogicalReplicationConnection
+
+from benchmarks.common import report
+from psycopg2_pgevents.logical import (
+    LogicalEventSource,
+    create_replication_slot,
+)
+from psycopg2_pgevents.sql import execute
+from psycopg2_pgevents.trigger import (
+    install_trigger,
+    install_trigger_function,
+    uninstall_trigger,
+)
+
+DSN = environ.get("BENCHMARK_DATABASE_DSN", "postgres:///postgres")
+ROWS = 10000
+SLOT_NAME = "pgevents_benchmark"
+
+
+def _write(connection) -> float:
+    execute(connection, "TRUNCATE public.pgevents_benchmark;")
+
+    start = time.perf_counter()
+    with connection.cursor() as cursor:
+        for value in range(ROWS):
+            cursor.execute("INSERT INTO public.pgevents_benchmark(value) VALUES (%s);", (value,))
+    return time.perf_counter() - start
+
+
+def _logical(connection) -> float:
+    replication = connect(DSN, connection_factory=LogicalReplicationConnection)
+    try:
+        create_replication_slot(replication, SLOT_NAME)
+        elapsed = _write(connection)
+
+        # Make sure that the slot did capture the workload
+        captured = 0
+        with LogicalEventSource(replication, SLOT_NAME, tables=[("public", "pgevents_benchmark")]) as source:
+            while captured < ROWS:
+                evts = source.poll(timeout=5.0)
+                if not evts:
+                    break
+                captured += sum(1 for evt in evts if evt.type == "INSERT")
+            source.ack()
+        if captured < ROWS:
+            sys.stderr.write("logical decoding captured {} of {} rows\n".format(captured, ROWS))
+    finally:
+        replication.close()
+        execute(connection, "SELECT pg_drop_replication_slot(%s);", (SLOT_NAME,))
+
+    return elapsed
+
+
+def main() -> None:
+    connection = connect(DSN)
+    connection.autocommit = True
+    execute(connection, "CREATE TABLE IF NOT EXISTS public.pgevents_benchmark (id serial PRIMARY KEY, value integer);")
+    install_trigger_function(connection, id_strategy="sequence")
+
+    try:
+        report("No capture", _write(connection), ROWS)
+
+        for mode in ("row", "statement"):
+            install_trigger(connection, "pgevents_benchmark", mode=mode, overwrite=True)
+            report("Triggers (mode={})".format(mode), _write(connection), ROWS)
+            uninstall_trigger(connection, "pgevents_benchmark")
+
+        wal_level = execute(connection, "SHOW wal_level;")[0][0]
+        if wal_level == "logical":
+            report("Logical decoding (wal2json)", _logical(connection), ROWS)
+        else:
+            sys.stderr.write("Skipping logical decoding (wal_level is {})\n".format(wal_level))
+    finally:
+        execute(connection, "DROP TABLE public.pgevents_benchmark;")
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
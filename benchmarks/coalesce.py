@@ -0,0 +1,38 @@
+"""Measure ``EventCoalescer`` throughput, and how many events it collapses.
+
+A burst of updates is spread over a varying number of hot rows; the fewer
+the rows, the more of the burst is collapsed. Every event is added and every
+coalesced event is flushed, in batches of at most 1000 events.
+"""
+
+import sys
+
+from benchmarks.common import report, timed
+from psycopg2_pgevents.coalesce import EventCoalescer
+from psycopg2_pgevents.event import Event
+
+HOT_ROW_COUNTS = (10, 1000, 100000)
+EVENTS = 100000
+
+
+def _coalesce(burst) -> int:
+    coalescer = EventCoalescer(window=0)
+    coalescer.add(burst)
+
+    flushed = 0
+    while coalescer:
+        flushed += len(coalescer.flush())
+
+    return flushed
+
+
+def main() -> None:
+    for row_count in HOT_ROW_COUNTS:
+        burst = [Event((1, index), "UPDATE", "public", "settings", index % row_count) for index in range(EVENTS)]
+        elapsed, flushed = timed(lambda: _coalesce(burst))
+        report("EventCoalescer (rows={})".format(row_count), elapsed, EVENTS)
+        sys.stderr.write("{:<40} {:>10d} events flushed\n".format("", flushed))
+
+
+if __name__ == "__main__":
+    main()
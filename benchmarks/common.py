@@ -0,0 +1,69 @@
+"""Helpers shared by the benchmarks."""
+__all__ = ["FakeConnection", "make_payloads", "report", "timed"]
+
+import socket
+import sys
+import time
+from typing import Callable, List, Tuple
+from uuid import uuid4
+
+from psycopg2.extensions import Notify
+
+from psycopg2_pgevents.event import Event
+
+
+class FakeConnection:
+    """Stand-in for a psycopg2 connection that always has notifications pending.
+
+    The connection exposes a readable file descriptor, so that ``select`` and
+    ``selectors`` report it as ready immediately, and every call to ``poll()``
+    queues a copy of the given notifications. This isolates the client-side
+    cost of polling from the network and the database server.
+    """
+
+    def __init__(self, notifies: List[Notify]) -> None:
+        self._reader, self._writer = socket.socketpair()
+        self._writer.send(b"x")
+        self._batch = notifies
+        self.notifies: List[Notify] = []
+        self.autocommit = True
+
+    def fileno(self) -> int:
+        return self._reader.fileno()
+
+    def poll(self) -> int:
+        self.notifies.extend(self._batch)
+        return 0
+
+    def close(self) -> None:
+        self._reader.close()
+        self._writer.close()
+
+
+def make_payloads(count: int, channel: str = "psycopg2_pgevents_channel") -> List[Notify]:
+    """Build ``count`` notifications carrying row-level event payloads."""
+    return [
+        Notify(0, channel, Event(str(uuid4()), "INSERT", "public", "settings", row_id).tojson())
+        for row_id in range(count)
+    ]
+
+
+def timed(fn: Callable[[], int], repeat: int = 5) -> Tuple[float, int]:
+    """Run ``fn`` ``repeat`` times and return the best time and its item count."""
+    best = None
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = fn()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best, count
+
+
+def report(label: str, elapsed: float, count: int) -> None:
+    """Print a single benchmark result line to stderr."""
+    sys.stderr.write(
+        "{:<40} {:>10d} events {:>9.4f}s {:>12.0f} events/sec\n".format(label, count, elapsed, count / elapsed)
+    )
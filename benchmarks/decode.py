@@ -0,0 +1,40 @@
+"""Measure the time and memory it takes to decode events from notification payloads.
+
+Payloads carry one row-level event each. Event IDs are parsed lazily, so
+neither measurement includes parsing them.
+"""
+
+import sys
+import tracemalloc
+
+from benchmarks.common import make_payloads, report, timed
+from psycopg2_pgevents.event import Event
+
+EVENTS = 10000
+
+
+def _decode(payloads) -> int:
+    return len([evt for payload in payloads for evt in Event.frompayload(payload)])
+
+
+def main() -> None:
+    payloads = [notify.payload for notify in make_payloads(EVENTS)]
+
+    elapsed, count = timed(lambda: _decode(payloads))
+    report("Event.frompayload", elapsed, count)
+    sys.stderr.write("{:<40} {:>10.2f} us/event\n".format("", elapsed / count * 1e6))
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        evts = [evt for payload in payloads for evt in Event.frompayload(payload)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    # Event objects plus their (unparsed) ID strings and list slots
+    sys.stderr.write("{:<40} {:>10.0f} bytes/event\n".format("", (after - before) / len(evts)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Measure how long it takes to drain a burst of queued notifications.
+
+Compares ``read_events`` against the previous strategy of popping
+notifications off of the front of ``connection.notifies`` one at a time,
+which is quadratic in the size of the burst. Both include decoding.
+"""
+
+from types import SimpleNamespace
+
+from benchmarks.common import make_payloads, report, timed
+from psycopg2_pgevents.event import Event, read_events
+
+BURST_SIZES = (10000, 100000, 1000000)
+
+# Popping from the front of a list is quadratic; beyond this it takes minutes.
+MAX_POP_BURST_SIZE = 100000
+
+
+def _pop_front(burst) -> int:
+    connection = SimpleNamespace(notifies=list(burst))
+    count = 0
+    while connection.notifies:
+        notify = connection.notifies.pop(0)
+        count += len(Event.frompayload(notify.payload))
+
+    return count
+
+
+def _read_events(burst) -> int:
+    connection = SimpleNamespace(notifies=list(burst))
+    return sum(1 for _evt in read_events(connection))
+
+
+def main() -> None:
+    payloads = make_payloads(max(BURST_SIZES))
+
+    for burst_size in BURST_SIZES:
+        burst = payloads[:burst_size]
+        repeat = 3 if burst_size <= MAX_POP_BURST_SIZE else 1
+
+        if burst_size <= MAX_POP_BURST_SIZE:
+            report("pop(0) drain ({})".format(burst_size), *timed(lambda: _pop_front(burst), repeat=repeat))
+        report("read_events ({})".format(burst_size), *timed(lambda: _read_events(burst), repeat=repeat))
+
+
+if __name__ == "__main__":
+    main()
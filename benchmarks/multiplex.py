@@ -0,0 +1,37 @@
+"""Measure ``EventMultiplexer`` throughput as the number of connections grows.
+
+Every connection always has a single notification pending, so each wakeup
+reads from every connection; this is the worst case for a multiplexer.
+"""
+
+from itertools import islice
+
+from benchmarks.common import FakeConnection, make_payloads, report, timed
+from psycopg2_pgevents.multiplex import EventMultiplexer
+
+CONNECTION_COUNTS = (1, 10, 100, 500)
+EVENTS = 100000
+
+
+def _multiplex(connections) -> int:
+    with EventMultiplexer(timeout=1.0) as mux:
+        for index, connection in enumerate(connections):
+            mux.add(connection, source=str(index))
+        return sum(1 for _evt in islice(mux, EVENTS))
+
+
+def main() -> None:
+    payloads = make_payloads(1)
+    for connection_count in CONNECTION_COUNTS:
+        connections = [FakeConnection(payloads) for _ in range(connection_count)]
+        try:
+            report(
+                "EventMultiplexer (connections={})".format(connection_count), *timed(lambda: _multiplex(connections))
+            )
+        finally:
+            for connection in connections:
+                connection.close()
+
+
+if __name__ == "__main__":
+    main()
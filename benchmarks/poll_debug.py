@@ -0,0 +1,46 @@
+"""Measure events/sec through ``poll`` with debug output enabled and disabled.
+
+Debug output is written to ``os.devnull`` so that terminal speed does not skew
+the "enabled" numbers.
+"""
+
+import os
+from contextlib import redirect_stdout
+
+from benchmarks.common import FakeConnection, make_payloads, report, timed
+from psycopg2_pgevents.debug import set_debug
+from psycopg2_pgevents.event import poll
+
+BATCH_SIZE = 100
+ROUNDS = 200
+
+
+def _run(connection: FakeConnection) -> int:
+    count = 0
+    for _ in range(ROUNDS):
+        for _evt in poll(connection, timeout=0.0):
+            count += 1
+
+    return count
+
+
+def main() -> None:
+    connection = FakeConnection(make_payloads(BATCH_SIZE))
+
+    try:
+        set_debug(False)
+        report("poll (debug disabled)", *timed(lambda: _run(connection)))
+
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            set_debug(True)
+            try:
+                elapsed, count = timed(lambda: _run(connection))
+            finally:
+                set_debug(False)
+        report("poll (debug enabled)", elapsed, count)
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
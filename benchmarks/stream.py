@@ -0,0 +1,43 @@
+"""Compare ``EventStream`` against the ``while True: poll()`` pattern.
+
+Both approaches consume the same number of events from a connection that
+always has notifications pending, with a handful of notifications arriving
+per wakeup.
+"""
+
+from itertools import islice
+
+from benchmarks.common import FakeConnection, make_payloads, report, timed
+from psycopg2_pgevents.event import poll
+from psycopg2_pgevents.stream import EventStream
+
+BATCH_SIZES = (1, 10, 100)
+EVENTS = 100000
+
+
+def _poll_loop(connection: FakeConnection) -> int:
+    count = 0
+    while count < EVENTS:
+        for _evt in poll(connection, timeout=1.0):
+            count += 1
+
+    return count
+
+
+def _stream(connection: FakeConnection) -> int:
+    with EventStream(connection, timeout=1.0) as stream:
+        return sum(1 for _evt in islice(stream, EVENTS))
+
+
+def main() -> None:
+    for batch_size in BATCH_SIZES:
+        connection = FakeConnection(make_payloads(batch_size))
+        try:
+            report("while True: poll() (batch={})".format(batch_size), *timed(lambda: _poll_loop(connection)))
+            report("EventStream (batch={})".format(batch_size), *timed(lambda: _stream(connection)))
+        finally:
+            connection.close()
+
+
+if __name__ == "__main__":
+    main()
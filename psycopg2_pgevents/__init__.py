@@ -1,17 +1,47 @@
 """This package provides the ability to listen for PostGreSQL table events at the database level."""
 
-from psycopg2_pgevents.debug import log, set_debug
+from psycopg2_pgevents.aio import AsyncEventListener
+from psycopg2_pgevents.buffer import BufferStats, EventBuffer
+from psycopg2_pgevents.coalesce import EventCoalescer, coalesce
+from psycopg2_pgevents.debug import debug_enabled, log, set_debug
+from psycopg2_pgevents.dispatch import BatchDispatcher, BatchStats
 from psycopg2_pgevents.event import (
+    event_channel,
+    get_codec,
     poll,
+    read_events,
+    register_codec,
     register_event_channel,
+    set_codec,
     unregister_event_channel,
 )
-from psycopg2_pgevents.sql import execute
+from psycopg2_pgevents.group import ConsumerGroup
+from psycopg2_pgevents.hydrate import RowHydrator, hydrate_events
+from psycopg2_pgevents.logical import (
+    LogicalEventSource,
+    create_replication_slot,
+    drop_replication_slot,
+)
+from psycopg2_pgevents.multiplex import EventMultiplexer
+from psycopg2_pgevents.outbox import (
+    OutboxConsumer,
+    acknowledge,
+    maintain_outbox,
+    outbox_position,
+    read_outbox,
+)
+from psycopg2_pgevents.sql import execute, execute_prepared
+from psycopg2_pgevents.stream import EventStream, listen_forever
 from psycopg2_pgevents.trigger import (
     install_trigger,
     install_trigger_function,
+    install_triggers,
+    invalidate_trigger_cache,
+    set_trigger_cache_ttl,
     trigger_function_installed,
     trigger_installed,
+    triggers_installed,
     uninstall_trigger,
     uninstall_trigger_function,
+    uninstall_triggers,
 )
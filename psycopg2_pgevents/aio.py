@@ -0,0 +1,183 @@
+"""This module provides functionality for listening for events with asyncio."""
+__all__ = ["AsyncEventListener"]
+
+
+import asyncio
+from collections import deque
+from typing import Deque, Optional
+
+from psycopg2.extensions import connection
+
+from psycopg2_pgevents.debug import log
+from psycopg2_pgevents.event import Event, read_events
+
+_LOGGER_NAME = "pgevents.aio"
+
+
+class AsyncEventListener:
+    """Asynchronously iterate over the events received by a connection.
+
+    The listener registers the connection's socket with the running event
+    loop, so no thread is needed to wait for events. Whenever the socket is
+    readable, all notifications received by the connection are decoded into
+    Events and buffered until they are consumed.
+
+    About `max_pending` events are buffered. Once the buffer is full, the
+    listener stops reading from the connection until the consumer has drained
+    half of the buffer; in the meantime, notifications queue up in the socket
+    and on the database server instead of in memory. The bound is soft: every
+    notification already read off of the socket is decoded, and a packed
+    notification may hold many events, so the buffer may overshoot
+    `max_pending` by the events of a single read.
+
+    The connection must not be used for anything else while the listener is
+    running, and must already be registered to the event channel.
+
+    Examples
+    --------
+    >>> async with AsyncEventListener(connection) as listener:
+            async for evt in listener:
+                print(evt)
+
+    """
+
+    def __init__(self, connection: connection, max_pending: int = 10000) -> None:
+        """Initialize a new AsyncEventListener.
+
+        Parameters
+        ----------
+        connection: psycopg2.extensions.connection
+            Active connection to a PostGreSQL database.
+        max_pending: int
+            Number of buffered events at which reads from the connection are
+            paused (a soft bound; see AsyncEventListener).
+
+        Returns
+        -------
+        None
+
+        """
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+
+        self.connection = connection
+        self.max_pending = max_pending
+
+        self._events: Deque[Event] = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._fd: Optional[int] = None
+        self._waiter: Optional[asyncio.Future] = None
+        self._reading = False
+        self._closed = False
+        self._exception: Optional[BaseException] = None
+
+    @property
+    def reading(self) -> bool:
+        """Whether or not the listener is currently reading from the connection."""
+        return self._reading
+
+    def start(self) -> None:
+        """Start listening for events on the running event loop.
+
+        Has no effect if the listener has already been started or closed.
+
+        Returns
+        -------
+        None
+
+        """
+        if self._loop is not None or self._closed:
+            return
+
+        log("Starting async listener...", logger_name=_LOGGER_NAME)
+        self._loop = asyncio.get_running_loop()
+        self._fd = self.connection.fileno()
+        self._resume()
+
+    def close(self) -> None:
+        """Stop listening for events.
+
+        Events that were already buffered may still be consumed; iteration
+        ends once the buffer is empty.
+
+        Returns
+        -------
+        None
+
+        """
+        if self._closed:
+            return
+
+        log("Closing async listener...", logger_name=_LOGGER_NAME)
+        self._pause()
+        self._closed = True
+        self._wake()
+
+    async def __aenter__(self) -> "AsyncEventListener":
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def __aiter__(self) -> "AsyncEventListener":
+        return self
+
+    async def __anext__(self) -> Event:
+        self.start()
+
+        while not self._events:
+            if self._exception is not None:
+                raise self._exception
+            if self._closed:
+                raise StopAsyncIteration
+
+            self._waiter = self._loop.create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+
+        event = self._events.popleft()
+
+        if not self._reading and not self._closed and len(self._events) <= self.max_pending // 2:
+            self._resume()
+
+        return event
+
+    def _resume(self) -> None:
+        self._loop.add_reader(self._fd, self._on_readable)
+        self._reading = True
+
+        # Notifications may already have been read off of the socket (e.g. by
+        # an earlier call to the connection's poll()); pick them up now, as
+        # the socket will not become readable for them again.
+        self._on_readable()
+
+    def _pause(self) -> None:
+        if self._reading:
+            self._loop.remove_reader(self._fd)
+            self._reading = False
+
+    def _on_readable(self) -> None:
+        try:
+            self.connection.poll()
+            self._events.extend(read_events(self.connection))
+        except Exception as e:
+            log("%s: %s", e.__class__.__name__, e, category="error", logger_name=_LOGGER_NAME)
+            self._exception = e
+            self._pause()
+            self._closed = True
+            self._wake()
+            return
+
+        if len(self._events) >= self.max_pending:
+            log("Buffer full (%s events); pausing reads...", len(self._events), logger_name=_LOGGER_NAME)
+            self._pause()
+
+        if self._events:
+            self._wake()
+
+    def _wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
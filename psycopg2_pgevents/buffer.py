@@ -0,0 +1,398 @@
+"""This module provides functionality for buffering events between a listener and a slow consumer."""
+__all__ = ["BufferStats", "EventBuffer"]
+
+
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import IO, Deque, Iterator, List, NamedTuple, Optional, Union
+
+from psycopg2_pgevents.coalesce import RowKey, merge_events
+from psycopg2_pgevents.debug import log
+from psycopg2_pgevents.event import Event
+
+_LOGGER_NAME = "pgevents.buffer"
+
+# Policies applied when events arrive while the buffer is full.
+OVERFLOW_POLICIES = ("block", "drop_oldest", "coalesce", "spill")
+
+# Minimum number of seconds between two warnings that the buffer is full.
+WARNING_INTERVAL = 10.0
+
+
+class BufferStats(NamedTuple):
+    """Metrics of an EventBuffer.
+
+    Attributes
+    ----------
+    depth: int
+        Number of events waiting in memory.
+    spilled: int
+        Number of events waiting in the spill file.
+    received: int
+        Number of events received from the source so far.
+    dropped: int
+        Number of events discarded so far, to make room for newer ones.
+    coalesced: int
+        Number of events merged into others so far.
+    """
+
+    depth: int
+    spilled: int
+    received: int
+    dropped: int
+    coalesced: int
+
+
+class EventBuffer:
+    """Read events from a stream in the background, into a buffer of bounded size.
+
+    Notifications that a listener has not read yet pile up in the
+    connection's notifies list and, past that, in the server's notification
+    queue, which is shared by the whole cluster; once that queue is full,
+    every transaction that sends a notification fails. An EventBuffer keeps
+    reading its source from a background thread, whatever the pace of the
+    consumer, and holds up to capacity events in memory. What happens once
+    the buffer is full depends on the overflow policy:
+
+    * "block" stops reading the source until the consumer catches up, so
+      nothing is lost, but notifications wait on the server in the meantime.
+    * "drop_oldest" discards the oldest buffered events.
+    * "coalesce" merges each event into the buffered event on the same row,
+      if any, as EventCoalescer does, and discards the oldest events once
+      capacity rows have events waiting. Merged events take the place of the
+      latest event on their row in the buffer.
+    * "spill" appends further events, in their wire form (see
+      Event.towire), to a temporary file, which is read back in order once
+      the events in memory have been consumed.
+
+    Only "block" lets a slow consumer hold up the server's notification
+    queue; the other policies keep the listener reading at full speed, and
+    count what they do in the buffer's stats. Warnings that the buffer is
+    full are logged at most once every WARNING_INTERVAL seconds.
+
+    The source must not be polled by anything but the buffer.
+
+    Examples
+    --------
+    >>> with EventStream(connection) as stream, EventBuffer(stream, capacity=10000, overflow="spill") as buffer:
+            for evt in buffer:
+                print(evt)
+
+    """
+
+    def __init__(
+        self,
+        source,
+        capacity: int = 10000,
+        overflow: str = "block",
+        spill_dir: Optional[str] = None,
+        timeout: float = 1.0,
+        max_batch: int = 10000,
+    ) -> None:
+        """Initialize a new EventBuffer, and start reading its source.
+
+        Parameters
+        ----------
+        source: EventStream, EventMultiplexer or OutboxConsumer
+            Stream of events, with a poll() method and a closed property.
+        capacity: int
+            Maximum number of events held in memory.
+        overflow: str
+            Policy applied to events arriving while the buffer is full; one
+            of "block", "drop_oldest", "coalesce" or "spill".
+        spill_dir: str
+            Directory in which to create the spill file, with the "spill"
+            policy. Defaults to the system's temporary directory.
+        timeout: float
+            Number of seconds to block for events before checking whether the
+            buffer has been closed, when iterating over the buffer.
+        max_batch: int
+            Maximum number of events returned per poll.
+
+        Returns
+        -------
+        None
+
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("Overflow policy must be one of: {}".format(", ".join(OVERFLOW_POLICIES)))
+
+        if spill_dir is not None and overflow != "spill":
+            raise ValueError("spill_dir is only supported by the spill overflow policy")
+
+        if max_batch < 1:
+            raise ValueError("max_batch must be positive")
+
+        self.source = source
+        self.capacity = capacity
+        self.overflow = overflow
+        self.spill_dir = spill_dir
+        self.timeout = timeout
+        self.max_batch = max_batch
+
+        # With the drop_oldest policy, the deque discards the oldest events
+        # by itself. With the coalesce policy, events are indexed by row, in
+        # the order of the latest event on each row.
+        self._events: Union[Deque[Event], "OrderedDict[RowKey, Event]"] = (
+            OrderedDict() if overflow == "coalesce" else deque(maxlen=capacity if overflow == "drop_oldest" else None)
+        )
+        self._received = 0
+        self._dropped = 0
+        self._coalesced = 0
+        self._warned_at: Optional[float] = None
+
+        # The spill file holds pickled lists of wire forms, from read_offset
+        # (inclusive) to write_offset (exclusive).
+        self._spill_file: Optional[IO[bytes]] = None
+        self._spilled = 0
+        self._read_offset = 0
+        self._write_offset = 0
+
+        self._condition = threading.Condition()
+        self._exception: Optional[BaseException] = None
+        self._closed = False
+        self._reading = True
+
+        self._reader = threading.Thread(target=self._read, name="pgevents-buffer", daemon=True)
+        self._reader.start()
+
+        log("Buffering up to %s events (overflow=%s)...", capacity, overflow, logger_name=_LOGGER_NAME)
+
+    @property
+    def closed(self) -> bool:
+        """Whether or not the buffer has been closed, or its source closed and every event consumed."""
+        with self._condition:
+            return self._closed or (
+                not self._reading and not self._events and not self._spilled and self._exception is None
+            )
+
+    @property
+    def stats(self) -> BufferStats:
+        """Metrics of the buffer."""
+        with self._condition:
+            return BufferStats(
+                depth=len(self._events),
+                spilled=self._spilled,
+                received=self._received,
+                dropped=self._dropped,
+                coalesced=self._coalesced,
+            )
+
+    def __len__(self) -> int:
+        """Get the number of events waiting in the buffer, in memory or spilled."""
+        with self._condition:
+            return len(self._events) + self._spilled
+
+    def _read(self) -> None:
+        """Read events from the source until either is closed (in the reader thread)."""
+        try:
+            while not self._closed and not self.source.closed:
+                evts = self.source.poll()
+                if evts:
+                    self._add(evts)
+        except Exception as e:
+            log("%s: %s", e.__class__.__name__, e, category="error", logger_name=_LOGGER_NAME)
+            with self._condition:
+                self._exception = e
+        finally:
+            with self._condition:
+                self._reading = False
+                self._condition.notify_all()
+
+    def _add(self, evts: List[Event]) -> None:
+        """Buffer events, applying the overflow policy to those that do not fit."""
+        events = self._events
+        capacity = self.capacity
+
+        with self._condition:
+            self._received += len(evts)
+
+            if self.overflow == "block":
+                for evt in evts:
+                    while len(events) >= capacity and not self._closed:
+                        self._condition.notify_all()
+                        self._condition.wait()
+                    events.append(evt)
+
+            elif self.overflow == "drop_oldest":
+                depth = len(events)
+                events.extend(evts)
+                dropped = depth + len(evts) - len(events)
+                if dropped:
+                    self._dropped += dropped
+                    self._warn_full()
+
+            elif self.overflow == "coalesce":
+                self._coalesce(evts)
+
+            elif self._spilled:
+                # Keep events in order behind those already spilled
+                self._spill(evts)
+
+            else:
+                room = capacity - len(events)
+                events.extend(evts[:room])
+                if len(evts) > room:
+                    self._spill(evts[room:])
+
+            self._condition.notify_all()
+
+    def _coalesce(self, evts: List[Event]) -> None:
+        """Merge events into the buffered events on the same rows, then drop the oldest events that do not fit."""
+        events = self._events
+
+        for evt in evts:
+            key = (evt.schema_name, evt.table_name, evt.row_id)
+
+            previous = events.pop(key, None)
+            if previous is not None:
+                evt = merge_events(previous, evt)
+                if evt is None:
+                    # Both events cancel out
+                    self._coalesced += 2
+                    continue
+
+                self._coalesced += 1
+
+            events[key] = evt
+
+        dropped = len(events) - self.capacity
+        if dropped > 0:
+            for _ in range(dropped):
+                events.popitem(last=False)
+            self._dropped += dropped
+            self._warn_full()
+
+    def _warn_full(self) -> None:
+        """Warn that the buffer is full, unless a warning was logged less than WARNING_INTERVAL seconds ago."""
+        now = time.monotonic()
+        if self._warned_at is not None and now - self._warned_at < WARNING_INTERVAL:
+            return
+
+        self._warned_at = now
+        log(
+            "Buffer full, %s events dropped and %s coalesced so far",
+            self._dropped,
+            self._coalesced,
+            category="warning",
+            logger_name=_LOGGER_NAME,
+        )
+
+    def _spill(self, evts: List[Event]) -> None:
+        """Append events to the spill file, in chunks of at most capacity events."""
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(prefix="pgevents-", suffix=".spill", dir=self.spill_dir)
+
+        spill_file = self._spill_file
+        spill_file.seek(self._write_offset)
+        for start in range(0, len(evts), self.capacity):
+            end = start + self.capacity
+            chunk = evts[start:end]
+            pickle.dump([evt.towire() for evt in chunk], spill_file, protocol=4)
+        self._write_offset = spill_file.tell()
+
+        if not self._spilled:
+            log("Buffer full, spilling events to disk", category="warning", logger_name=_LOGGER_NAME)
+        self._spilled += len(evts)
+
+    def _unspill(self) -> None:
+        """Read the oldest chunk of spilled events back into memory."""
+        spill_file = self._spill_file
+        spill_file.seek(self._read_offset)
+        wires = pickle.load(spill_file)
+        self._read_offset = spill_file.tell()
+
+        self._events.extend(Event.fromwire(wire) for wire in wires)
+        self._spilled -= len(wires)
+
+        if self._read_offset == self._write_offset:
+            # Everything was read back, so start the file over
+            spill_file.seek(0)
+            spill_file.truncate()
+            self._read_offset = self._write_offset = 0
+
+    def poll(self, timeout: Optional[float] = None) -> List[Event]:
+        """Wait for events and take the oldest ones from the buffer.
+
+        Parameters
+        ----------
+        timeout: float
+            Number of seconds to block for events before timing out. Defaults
+            to the buffer's timeout.
+
+        Returns
+        -------
+        list of Event
+            Up to max_batch events, in order; empty if the wait timed out.
+
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        events = self._events
+
+        with self._condition:
+            self._condition.wait_for(lambda: events or self._spilled or self._closed or not self._reading, timeout)
+
+            if not events and self._spilled:
+                self._unspill()
+
+            if len(events) <= self.max_batch:
+                batch = list(events.values() if isinstance(events, dict) else events)
+                events.clear()
+            elif isinstance(events, dict):
+                batch = [events.popitem(last=False)[1] for _ in range(self.max_batch)]
+            else:
+                batch = [events.popleft() for _ in range(self.max_batch)]
+
+            if batch:
+                # Wake up the reader, if it is blocked on a full buffer
+                self._condition.notify_all()
+            elif self._exception is not None:
+                exception, self._exception = self._exception, None
+                raise exception
+
+        return batch
+
+    def __iter__(self) -> Iterator[Event]:
+        while not self.closed:
+            yield from self.poll()
+
+    def close(self) -> None:
+        """Stop reading the source, and discard every buffered event.
+
+        The source itself is left open.
+
+        Returns
+        -------
+        None
+
+        """
+        if self._closed:
+            return
+
+        log("Closing event buffer...", logger_name=_LOGGER_NAME)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+        self._reader.join()
+
+        with self._condition:
+            self._events.clear()
+            self._spilled = 0
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+
+    def __enter__(self) -> "EventBuffer":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
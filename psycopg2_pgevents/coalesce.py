@@ -0,0 +1,279 @@
+"""This module provides functionality for coalescing bursts of events on the same rows."""
+__all__ = ["EventCoalescer", "coalesce", "merge_events"]
+
+
+import copy
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from psycopg2_pgevents.debug import log
+from psycopg2_pgevents.event import Event
+
+_LOGGER_NAME = "pgevents.coalesce"
+
+# Rows are identified by their schema, table and row ID.
+RowKey = Tuple[str, str, object]
+
+# Type of the event that replaces a pending event of the first type followed
+# by an event of the second type on the same row; None if the events cancel
+# out. All other sequences keep the type of the latest event.
+MERGED_EVENT_TYPES: Dict[Tuple[str, str], Optional[str]] = {
+    # The row did not exist before the window, so it is still new to listeners
+    ("INSERT", "UPDATE"): "INSERT",
+    # The row neither existed before the window, nor does it after
+    ("INSERT", "DELETE"): None,
+    # The row existed both before the window and after
+    ("DELETE", "INSERT"): "UPDATE",
+}
+
+
+def merge_events(previous: Event, evt: Event) -> Optional[Event]:
+    """Merge an event into the pending event on the same row.
+
+    The merged event is the latest event, or a copy of it if its type or
+    data change; the events passed in are left untouched. If the latest
+    event is an update, its data (if any) is merged over the data of the
+    pending event, so that merged diffs hold every column changed by either
+    event; otherwise the data of the latest event is kept as is.
+
+    Parameters
+    ----------
+    previous: Event
+        Pending event on the row.
+    evt: Event
+        Latest event on the row.
+
+    Returns
+    -------
+    Event or None
+        Event that replaces both events, with the type given by
+        MERGED_EVENT_TYPES; None if the events cancel out.
+
+    """
+    type_ = MERGED_EVENT_TYPES.get((previous.type, evt.type), evt.type)
+    if type_ is None:
+        return None
+
+    data = evt.data
+    if evt.type == "UPDATE" and previous.data is not None and data is not None:
+        data = {**previous.data, **data}
+
+    if type_ == evt.type and data is evt.data:
+        return evt
+
+    merged = copy.copy(evt)
+    merged.type = type_
+    merged.data = data
+    return merged
+
+
+class EventCoalescer:
+    """Collapse events on the same row that occur within a window.
+
+    Events are identified by their schema, table and row ID. Within a window,
+    the latest event on each row replaces any earlier one, keeping the type of
+    the latest event, except that an insert followed by updates remains an
+    insert, a delete followed by an insert becomes an update, and an insert
+    followed by a delete cancels out altogether. See merge_events for how
+    the data of merged events is combined.
+
+    A window opens with the first event added, and closes once it has lasted
+    for the given number of seconds, or once the given number of events has
+    been added to it. Coalesced events are then flushed in batches of bounded
+    size, ordered by the latest event on each row.
+
+    Examples
+    --------
+    >>> coalescer = EventCoalescer(window=0.5, max_batch=100)
+    >>> coalescer.add(poll(connection))
+    >>> if coalescer.ready:
+            invalidate(coalescer.flush())
+
+    """
+
+    def __init__(
+        self,
+        window: float = 0.1,
+        count: Optional[int] = None,
+        max_batch: int = 1000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize a new EventCoalescer.
+
+        Parameters
+        ----------
+        window: float
+            Number of seconds after the first event of a window at which the
+            window closes.
+        count: int
+            Number of events after which a window closes, however long it has
+            lasted; if None, windows are only limited in time.
+        max_batch: int
+            Maximum number of coalesced events per flushed batch.
+        clock: callable
+            Monotonic clock, returning the current time in seconds.
+
+        Returns
+        -------
+        None
+
+        """
+        if window < 0:
+            raise ValueError("window must not be negative")
+
+        if count is not None and count < 1:
+            raise ValueError("count must be positive")
+
+        if max_batch < 1:
+            raise ValueError("max_batch must be positive")
+
+        self.window = window
+        self.count = count
+        self.max_batch = max_batch
+        self.clock = clock
+
+        self._pending: Dict[RowKey, Event] = {}
+        self._received = 0
+        self._deadline: Optional[float] = None
+
+    def __len__(self) -> int:
+        """Get the number of coalesced events waiting to be flushed."""
+        return len(self._pending)
+
+    @property
+    def ready(self) -> bool:
+        """Whether or not the current window has closed and events are waiting to be flushed."""
+        if not self._pending:
+            return False
+
+        if self.count is not None and self._received >= self.count:
+            return True
+
+        return self.clock() >= self._deadline
+
+    def timeout(self) -> Optional[float]:
+        """Get the number of seconds until the current window closes.
+
+        Returns
+        -------
+        float or None
+            Number of seconds until the window closes; 0 if it already has,
+            or None if no window is open.
+
+        """
+        if self._deadline is None:
+            return None
+
+        if self.ready:
+            return 0.0
+
+        return max(self._deadline - self.clock(), 0.0)
+
+    def add(self, evts: Iterable[Event]) -> None:
+        """Add events to the current window, coalescing them with pending events.
+
+        Parameters
+        ----------
+        evts: iterable of Event
+            Events, in the order in which they were received.
+
+        Returns
+        -------
+        None
+
+        """
+        pending = self._pending
+        received = 0
+
+        for evt in evts:
+            received += 1
+            key = (evt.schema_name, evt.table_name, evt.row_id)
+
+            previous = pending.pop(key, None)
+            if previous is not None:
+                evt = merge_events(previous, evt)
+                if evt is None:
+                    continue
+
+            pending[key] = evt
+
+        self._received += received
+
+        if not pending:
+            # Everything cancelled out, so there is no window left to close
+            self._received = 0
+            self._deadline = None
+        elif self._deadline is None:
+            self._deadline = self.clock() + self.window
+
+    def flush(self, force: bool = False) -> List[Event]:
+        """Take a batch of coalesced events.
+
+        Parameters
+        ----------
+        force: bool
+            Whether or not to flush events even though the current window is
+            still open (e.g. on shutdown).
+
+        Returns
+        -------
+        list of Event
+            Up to max_batch coalesced events, ordered by the latest event on
+            each row; empty if the window is still open.
+
+        """
+        if not (force or self.ready):
+            return []
+
+        pending = self._pending
+        if len(pending) <= self.max_batch:
+            batch = list(pending.values())
+            pending.clear()
+        else:
+            keys = list(pending)[: self.max_batch]
+            batch = [pending.pop(key) for key in keys]
+
+        if not pending:
+            log("Window closed after %s events", self._received, logger_name=_LOGGER_NAME)
+            self._received = 0
+            self._deadline = None
+
+        return batch
+
+
+def coalesce(source, window: float = 0.1, count: Optional[int] = None, max_batch: int = 1000) -> Iterator[List[Event]]:
+    """Coalesce the events of a stream, and yield them in batches.
+
+    Parameters
+    ----------
+    source: EventStream or EventMultiplexer
+        Stream of events, with a poll(timeout) method and a closed property.
+    window: float
+        See EventCoalescer.
+    count: int
+        See EventCoalescer.
+    max_batch: int
+        See EventCoalescer.
+
+    Returns
+    -------
+    iterator of list of Event
+        Batches of coalesced events. Once the source is closed, the events
+        left pending are flushed before the iterator ends.
+
+    Examples
+    --------
+    >>> with EventStream(connection) as stream:
+            for batch in coalesce(stream, window=0.5):
+                invalidate(batch)
+
+    """
+    coalescer = EventCoalescer(window=window, count=count, max_batch=max_batch)
+
+    while not source.closed:
+        coalescer.add(source.poll(coalescer.timeout()))
+        while coalescer.ready:
+            yield coalescer.flush()
+
+    while coalescer:
+        yield coalescer.flush(force=True)
@@ -1,77 +1,123 @@
 """This module provides functionality for debug logging within the package."""
-__all__ = ["log", "set_debug"]
+__all__ = ["debug_enabled", "log", "set_debug"]
 
 import logging
 import sys
-from contextlib import contextmanager
-from typing import Generator
+from typing import Any, Dict
 
 _DEBUG_ENABLED = False
 
 _LOGGER_NAME = "pgevents.debug"
 
+_ENABLED_LEVEL = logging.INFO
+_DISABLED_LEVEL = logging.CRITICAL + 1
 
-def set_debug(enabled: bool):
-    """Enable or disable debug logs for the entire package.
+_FORMATTER = logging.Formatter("%(asctime)s %(levelname)-5s [%(name)s]: %(message)s")
 
-    Parameters
-    ----------
-    enabled: bool
-        Whether debug should be enabled or not.
+# Loggers that have already been configured by this module, keyed by name.
+_LOGGERS: Dict[str, logging.Logger] = {}
 
+
+class _StdoutHandler(logging.StreamHandler):
+    """Stream handler that writes a single logger's records to stdout.
+
+    The handler always writes to the *current* ``sys.stdout`` (rather than the
+    one that was active when the handler was created), and only handles
+    records that were logged directly to the logger it is attached to. The
+    latter prevents records from being printed more than once when both a
+    logger and one of its ancestors (e.g. "pgevents" and "pgevents.event")
+    have been configured.
     """
-    global _DEBUG_ENABLED
 
-    if not enabled:
-        log("Disabling debug output...", logger_name=_LOGGER_NAME)
-        _DEBUG_ENABLED = False
-    else:
-        _DEBUG_ENABLED = True
-        log("Enabling debug output...", logger_name=_LOGGER_NAME)
+    def __init__(self, logger_name: str) -> None:
+        super().__init__()
+        self.logger_name = logger_name
+        self.setFormatter(_FORMATTER)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        # The stream is always sys.stdout; ignore assignments from the base class.
+        pass
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.name == self.logger_name and super().filter(record)
 
 
-@contextmanager
-def _create_logger(name: str, level: int) -> Generator[logging.Logger, None, None]:
-    """Create a context-based logger.
+def _get_logger(name: str) -> logging.Logger:
+    """Get a logger, configuring it the first time it is requested.
+
     Parameters
     ----------
     name: str
-        Name of logger to use when logging.
-    level: int
-        Logging level, one of logging's levels (e.g. INFO, ERROR, etc.).
+        Name of logger to get.
 
     Returns
     -------
     logging.Logger
         Named logger that may be used for logging.
+
+    """
+    logger = _LOGGERS.get(name)
+    if logger is None:
+        logger = logging.getLogger(name)
+        logger.setLevel(_ENABLED_LEVEL if _DEBUG_ENABLED else _DISABLED_LEVEL)
+        logger.addHandler(_StdoutHandler(name))
+        _LOGGERS[name] = logger
+
+    return logger
+
+
+def debug_enabled() -> bool:
+    """Test whether or not debug logs are enabled.
+
+    Callers may use this to skip building expensive log messages altogether.
+
+    Returns
+    -------
+    bool
+        True if debug is enabled, otherwise False.
+
     """
-    # Get logger
-    logger = logging.getLogger(name)
+    return _DEBUG_ENABLED
+
 
-    # Set logger level
-    old_level = logger.level
-    logger.setLevel(level)
+def set_debug(enabled: bool):
+    """Enable or disable debug logs for the entire package.
+
+    Parameters
+    ----------
+    enabled: bool
+        Whether debug should be enabled or not.
 
-    # Setup handler and add to logger
-    handler = logging.StreamHandler(sys.stdout)
-    formatter = logging.Formatter("%(asctime)s %(levelname)-5s [%(name)s]: %(message)s")
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    """
+    global _DEBUG_ENABLED
 
-    yield logger
+    if not enabled:
+        log("Disabling debug output...", logger_name=_LOGGER_NAME)
+        _DEBUG_ENABLED = False
+        level = _DISABLED_LEVEL
+    else:
+        _DEBUG_ENABLED = True
+        level = _ENABLED_LEVEL
 
-    # Reset logger level
-    logger.setLevel(old_level)
+    for logger in _LOGGERS.values():
+        logger.setLevel(level)
 
-    # Remove handler from logger
-    logger.removeHandler(handler)
-    handler.close()
+    if enabled:
+        log("Enabling debug output...", logger_name=_LOGGER_NAME)
 
 
-def log(message: str, *args: str, category: str = "info", logger_name: str = "pgevents"):
+def log(message: str, *args: Any, category: str = "info", logger_name: str = "pgevents"):
     """Log a message to the given logger.
 
-    If debug has not been enabled, this method will not log a message.
+    If debug has not been enabled, this method returns immediately, without
+    looking up a logger or formatting the message. Formatting of the message
+    with its arguments is deferred to the logging module, so it only happens
+    for messages that are actually emitted.
 
     Parameters
     ----------
@@ -87,16 +133,11 @@ def log(message: str, *args: str, category: str = "info", logger_name: str = "pg
         Name of logger to which the message should be logged.
 
     """
-    global _DEBUG_ENABLED
-
-    if _DEBUG_ENABLED:
-        level = logging.INFO
-    else:
-        level = logging.CRITICAL + 1
+    if not _DEBUG_ENABLED:
+        return
 
-    with _create_logger(logger_name, level) as logger:
-        log_fn = getattr(logger, category, None)
-        if log_fn is None:
-            raise ValueError('Invalid log category "{}"'.format(category))
+    log_fn = getattr(_get_logger(logger_name), category, None)
+    if log_fn is None:
+        raise ValueError('Invalid log category "{}"'.format(category))
 
-        log_fn(message, *args)
+    log_fn(message, *args)
@@ -0,0 +1,354 @@
+"""This module provides functionality for handling batches of events in a process pool."""
+__all__ = ["BatchDispatcher", "BatchStats"]
+
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Callable, Deque, Iterable, List, NamedTuple, Optional, Tuple
+
+from psycopg2_pgevents.debug import log
+from psycopg2_pgevents.event import Event
+from psycopg2_pgevents.group import shard
+
+_LOGGER_NAME = "pgevents.dispatch"
+
+
+class BatchStats(NamedTuple):
+    """Timings of a batch of events handled by a BatchDispatcher.
+
+    Attributes
+    ----------
+    shard: int
+        Shard to which the batch's events belong.
+    size: int
+        Number of events in the batch.
+    lingered: float
+        Number of seconds between the first event of the batch being
+        dispatched and the batch being sealed.
+    queued: float
+        Number of seconds the sealed batch waited for the shard's previous
+        batch to complete.
+    latency: float
+        Number of seconds between the first event of the batch being
+        dispatched and the batch being handled.
+    """
+
+    shard: int
+    size: int
+    lingered: float
+    queued: float
+    latency: float
+
+
+def _handle_batch(handler: Callable[[List[Event]], None], wires: List[tuple]) -> None:
+    """Rebuild a batch of events from their wire form, and handle it (in a worker process)."""
+    handler([Event.fromwire(wire) for wire in wires])
+
+
+class _Shard:
+    def __init__(self) -> None:
+        # Wire forms of the events of the open batch, and the time at which
+        # its first event was dispatched.
+        self.wires: List[tuple] = []
+        self.opened: Optional[float] = None
+        # Sealed batches waiting for the batch in flight to complete, along
+        # with the times at which they were opened and sealed.
+        self.sealed: Deque[Tuple[List[tuple], float, float]] = deque()
+        self.in_flight: Optional[Future] = None
+
+
+class BatchDispatcher:
+    """Hand batches of events to a process pool, in order per row.
+
+    CPU-bound handlers are not slowed down by the GIL when they run in a pool
+    of processes, but shipping events to them one at a time costs a round of
+    pickling and inter-process communication per event. Events are instead
+    gathered into batches, converted to their compact wire form (see
+    Event.towire), and shipped a batch at a time.
+
+    Events are sharded by row, with one shard per worker (see
+    `psycopg2_pgevents.group.shard`), and a shard never has more than one
+    batch in flight, so that changes to the same row are handled in the order
+    they were received. A batch is sealed once it holds batch_size events,
+    or once its first event has lingered for the given number of seconds;
+    like EventCoalescer, the dispatcher relies on the caller to check for
+    lingering batches (see `timeout` and `run`).
+
+    At most max_pending sealed batches wait per shard; beyond that,
+    dispatching blocks until the shard catches up.
+
+    Examples
+    --------
+    >>> with BatchDispatcher(render_documents, batch_size=500, linger=0.05) as dispatcher:
+            dispatcher.run(stream)
+
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Event]], None],
+        workers: int = 4,
+        batch_size: int = 500,
+        linger: float = 0.05,
+        max_pending: int = 4,
+        on_batch: Optional[Callable[[BatchStats], None]] = None,
+        executor: Optional[Executor] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize a new BatchDispatcher.
+
+        Parameters
+        ----------
+        handler: callable
+            Picklable function called, in a worker process, with each batch
+            of events (as a list of Event).
+        workers: int
+            Number of worker processes, and thus of shards.
+        batch_size: int
+            Number of events at which a batch is sealed.
+        linger: float
+            Number of seconds after its first event at which a batch is
+            sealed, however few events it holds.
+        max_pending: int
+            Maximum number of sealed batches waiting per shard.
+        on_batch: callable
+            Function called with the BatchStats of each handled batch, from
+            a background thread.
+        executor: concurrent.futures.Executor
+            Executor with which to run the handler; defaults to a process
+            pool of the given number of workers, which is shut down along
+            with the dispatcher.
+        clock: callable
+            Monotonic clock, returning the current time in seconds.
+
+        Returns
+        -------
+        None
+
+        """
+        if workers < 1:
+            raise ValueError("workers must be positive")
+
+        if batch_size < 1:
+            raise ValueError("batch_size must be positive")
+
+        if linger < 0:
+            raise ValueError("linger must not be negative")
+
+        if max_pending < 1:
+            raise ValueError("max_pending must be positive")
+
+        self.handler = handler
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_pending = max_pending
+        self.on_batch = on_batch
+        self.clock = clock
+
+        self._owns_executor = executor is None
+        self._executor = executor if executor is not None else ProcessPoolExecutor(max_workers=workers)
+        self._shards = [_Shard() for _ in range(workers)]
+        self._condition = threading.Condition()
+        self._exception: Optional[BaseException] = None
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        """Whether or not the dispatcher has been closed."""
+        return self._closed
+
+    def _raise(self) -> None:
+        if self._exception is not None:
+            exception, self._exception = self._exception, None
+            raise exception
+
+    def _submit(self, index: int, wires: List[tuple], opened: float, sealed: float) -> None:
+        """Ship a batch to the executor; the shard's condition lock must be held."""
+        shard_ = self._shards[index]
+        future = self._executor.submit(_handle_batch, self.handler, wires)
+        shard_.in_flight = future
+
+        submitted = self.clock()
+        future.add_done_callback(lambda future: self._complete(index, len(wires), opened, sealed, submitted, future))
+
+    def _fail(self, exception: BaseException) -> None:
+        """Record the first exception raised, to be re-raised by the next dispatch or flush."""
+        if self._exception is None:
+            self._exception = exception
+
+    def _complete(self, index: int, size: int, opened: float, sealed: float, submitted: float, future: Future) -> None:
+        now = self.clock()
+
+        with self._condition:
+            try:
+                shard_ = self._shards[index]
+                shard_.in_flight = None
+
+                exception = future.exception()
+                if exception is not None:
+                    self._fail(exception)
+
+                if shard_.sealed:
+                    try:
+                        self._submit(index, *shard_.sealed.popleft())
+                    except Exception as e:
+                        # The executor is broken (e.g. a worker process died),
+                        # so the shard's pending batches can never be handled
+                        log(
+                            "Shard %s: %s: %s; dropping %s pending batches",
+                            index,
+                            e.__class__.__name__,
+                            e,
+                            len(shard_.sealed) + 1,
+                            category="error",
+                            logger_name=_LOGGER_NAME,
+                        )
+                        shard_.sealed.clear()
+                        self._fail(e)
+            finally:
+                # Exceptions raised by done-callbacks are swallowed, so waiters
+                # must be woken up whatever happens
+                self._condition.notify_all()
+
+        stats = BatchStats(
+            shard=index, size=size, lingered=sealed - opened, queued=submitted - sealed, latency=now - opened
+        )
+        log(
+            "Batch of %s events handled by shard %s in %.6f seconds",
+            size,
+            index,
+            stats.latency,
+            logger_name=_LOGGER_NAME,
+        )
+        if self.on_batch is not None:
+            self.on_batch(stats)
+
+    def _seal(self, index: int) -> None:
+        """Seal a shard's open batch, waiting for room if the shard has too many sealed batches."""
+        shard_ = self._shards[index]
+        wires, opened = shard_.wires, shard_.opened
+        shard_.wires = []
+        shard_.opened = None
+        sealed = self.clock()
+
+        with self._condition:
+            while len(shard_.sealed) >= self.max_pending:
+                self._condition.wait()
+
+            if shard_.in_flight is None:
+                self._submit(index, wires, opened, sealed)
+            else:
+                shard_.sealed.append((wires, opened, sealed))
+
+    def timeout(self) -> Optional[float]:
+        """Get the number of seconds until the next open batch is sealed.
+
+        Returns
+        -------
+        float or None
+            Number of seconds until the oldest open batch has lingered long
+            enough; None if no batch is open.
+
+        """
+        opened = [shard_.opened for shard_ in self._shards if shard_.opened is not None]
+        if not opened:
+            return None
+
+        return max(min(opened) + self.linger - self.clock(), 0.0)
+
+    def dispatch(self, evts: Iterable[Event]) -> None:
+        """Add events to the open batches of their shards, and ship the batches that are due.
+
+        Parameters
+        ----------
+        evts: iterable of Event
+            Events, in the order in which they were received.
+
+        Returns
+        -------
+        None
+
+        """
+        if self._closed:
+            raise ValueError("Dispatcher is closed")
+
+        self._raise()
+
+        shards = self._shards
+        count = len(shards)
+
+        for evt in evts:
+            index = shard(evt, count)
+            shard_ = shards[index]
+            if shard_.opened is None:
+                shard_.opened = self.clock()
+
+            shard_.wires.append(evt.towire())
+            if len(shard_.wires) >= self.batch_size:
+                self._seal(index)
+
+        now = self.clock()
+        for index, shard_ in enumerate(shards):
+            if shard_.opened is not None and now - shard_.opened >= self.linger:
+                self._seal(index)
+
+    def run(self, source) -> None:
+        """Dispatch the events of a stream until it is closed.
+
+        Parameters
+        ----------
+        source: EventStream, EventMultiplexer or OutboxConsumer
+            Stream of events, with a poll(timeout) method and a closed property.
+
+        Returns
+        -------
+        None
+
+        """
+        while not source.closed:
+            self.dispatch(source.poll(self.timeout()))
+
+    def flush(self) -> None:
+        """Ship every open batch, and wait for all batches to be handled.
+
+        Returns
+        -------
+        None
+
+        """
+        for index, shard_ in enumerate(self._shards):
+            if shard_.wires:
+                self._seal(index)
+
+        with self._condition:
+            while any(shard_.in_flight is not None or shard_.sealed for shard_ in self._shards):
+                self._condition.wait()
+
+        self._raise()
+
+    def close(self) -> None:
+        """Handle every pending event, and stop the dispatcher.
+
+        Returns
+        -------
+        None
+
+        """
+        if self._closed:
+            return
+
+        log("Closing batch dispatcher...", logger_name=_LOGGER_NAME)
+        try:
+            self.flush()
+        finally:
+            self._closed = True
+            if self._owns_executor:
+                self._executor.shutdown()
+
+    def __enter__(self) -> "BatchDispatcher":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
@@ -1,77 +1,397 @@
 """This module provides functionality for managing and polling for events."""
-__all__ = ["Event", "poll", "register_event_channel", "unregister_event_channel"]
+__all__ = [
+    "Event",
+    "event_channel",
+    "get_codec",
+    "poll",
+    "read_events",
+    "register_codec",
+    "register_event_channel",
+    "set_codec",
+    "unregister_event_channel",
+]
 
 
 import json
 import select
-from typing import Iterable
+from hashlib import md5
+from sys import intern
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 from uuid import UUID
 
-from psycopg2.extensions import connection
+from psycopg2.extensions import connection, quote_ident
 
-from psycopg2_pgevents.debug import log
+from psycopg2_pgevents.debug import debug_enabled, log
 from psycopg2_pgevents.sql import execute
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
 _LOGGER_NAME = "pgevents.event"
 
+# Channel on which all events are sent, unless triggers are installed with
+# another channel strategy.
+GLOBAL_CHANNEL = "psycopg2_pgevents_channel"
+
+# PostGreSQL identifiers, including channel names, are at most 63 bytes long.
+_MAX_CHANNEL_LENGTH = 63
+
+# Version of the payload format sent by the trigger functions.
+PAYLOAD_VERSION = 3
+
+# Events are identified either by a UUID or by a (major, minor) pair of integers.
+EventId = Union[UUID, Tuple[int, int]]
+
+# Packed and positional payloads abbreviate the event type to its first letter.
+_ABBREVIATED_EVENT_TYPES = {"I": "INSERT", "U": "UPDATE", "D": "DELETE"}
+_EVENT_TYPE_ABBREVIATIONS = {type_: abbreviation for abbreviation, type_ in _ABBREVIATED_EVENT_TYPES.items()}
+
+
+class _Codec(NamedTuple):
+    loads: Callable[[str], Any]
+    dumps: Callable[[Any], str]
+
+
+_CODECS: Dict[str, _Codec] = {"json": _Codec(json.loads, json.dumps)}
+if ujson is not None:
+    _CODECS["ujson"] = _Codec(ujson.loads, ujson.dumps)
+if orjson is not None:
+    _CODECS["orjson"] = _Codec(orjson.loads, lambda obj: orjson.dumps(obj).decode())
+
+# Use the fastest codec available by default.
+_CODEC_NAME = next(name for name in ("orjson", "ujson", "json") if name in _CODECS)
+_CODEC = _CODECS[_CODEC_NAME]
+
+
+def register_codec(name: str, loads: Callable[[str], Any], dumps: Callable[[Any], str]) -> None:
+    """Register a JSON codec that may be used to encode and decode payloads.
+
+    Parameters
+    ----------
+    name: str
+        Name under which to register the codec.
+    loads: Callable
+        Function that deserializes a JSON string.
+    dumps: Callable
+        Function that serializes an object into a JSON string (not bytes).
+
+    Returns
+    -------
+    None
+
+    """
+    _CODECS[name] = _Codec(loads, dumps)
+
+
+def set_codec(name: str) -> None:
+    """Set the JSON codec used to encode and decode payloads.
+
+    The "json" codec (the standard library) is always available; "orjson"
+    and "ujson" are available when the respective package is installed,
+    e.g. with the psycopg2-pgevents[orjson] extra. By default, the fastest
+    available codec is used.
+
+    Parameters
+    ----------
+    name: str
+        Name of a registered codec.
+
+    Returns
+    -------
+    None
+
+    """
+    global _CODEC, _CODEC_NAME
+
+    if name not in _CODECS:
+        raise ValueError('Unknown codec "{}"'.format(name))
+
+    log("Using %s codec...", name, logger_name=_LOGGER_NAME)
+    _CODEC_NAME = name
+    _CODEC = _CODECS[name]
+
+
+def get_codec() -> str:
+    """Get the name of the JSON codec used to encode and decode payloads.
+
+    Returns
+    -------
+    str
+        Name of the codec in use.
+
+    """
+    return _CODEC_NAME
+
+
+def _format_id(id_: EventId) -> str:
+    if isinstance(id_, tuple):
+        return "{}:{}".format(*id_)
+
+    return str(id_)
+
+
+def _parse_id(id_: str) -> EventId:
+    if ":" in id_:
+        major, minor = id_.split(":")
+        return int(major), int(minor)
+
+    return UUID(id_)
+
+
+# Decoders of row ID elements that JSON cannot represent, keyed by key type.
+# Key types are sent along with the row IDs of tables with UUID or composite
+# keys, one letter per key column: "u" (UUID), "i" (integer) or "s" (other).
+_KEY_DECODERS: Dict[str, Callable[[Any], Any]] = {"u": UUID}
+
+
+def _decode_row_ids(row_ids: List, key_types: str) -> List:
+    if len(key_types) == 1:
+        decode = _KEY_DECODERS.get(key_types)
+        return row_ids if decode is None else [decode(row_id) for row_id in row_ids]
+
+    decoders = [_KEY_DECODERS.get(key_type) for key_type in key_types]
+    return [
+        tuple(value if decode is None else decode(value) for decode, value in zip(decoders, row_id))
+        for row_id in row_ids
+    ]
+
+
+def _encode_row_id(row_id: Any) -> Tuple[Any, str]:
+    if isinstance(row_id, tuple):
+        values, key_types = zip(*(_encode_row_id(value) for value in row_id))
+        return list(values), "".join(key_types)
+
+    if isinstance(row_id, UUID):
+        return str(row_id), "u"
+
+    return row_id, "i" if isinstance(row_id, int) else "s"
+
+
+def _unpack_object(obj: Dict) -> Tuple:
+    row_ids = obj["row_ids"] if "row_ids" in obj else [obj["row_id"]]
+    if obj.get("key_types"):
+        row_ids = _decode_row_ids(row_ids, obj["key_types"])
+
+    row_data = [obj["data"]] if "data" in obj else None
+    return obj["event_id"], obj["event_type"], obj["schema_name"], obj["table_name"], row_ids, row_data
+
+
+def _unpack_packed(obj: Dict) -> Tuple:
+    return obj["i"], _ABBREVIATED_EVENT_TYPES[obj["o"]], obj["s"], obj["t"], obj["r"], None
+
+
+def _unpack_positional(obj: List) -> Tuple:
+    row_ids = obj[5]
+    if len(obj) > 6 and obj[6]:
+        row_ids = _decode_row_ids(row_ids, obj[6])
+
+    row_data = obj[7] if len(obj) > 7 else None
+    return obj[1], _ABBREVIATED_EVENT_TYPES[obj[2]], obj[3], obj[4], row_ids, row_data
+
+
+# Functions that unpack a decoded payload into its event ID, event type,
+# schema name, table name, row IDs and row data (or None), keyed by payload
+# version.
+_PAYLOAD_UNPACKERS: Dict[int, Callable[[Any], Tuple]] = {
+    1: _unpack_object,
+    2: _unpack_packed,
+    3: _unpack_positional,
+}
+
 
 class Event:
     """Represent a psycopg2-pgevents event.
 
+    Events are compact: they have no per-instance ``__dict__``, and the
+    schema, table and type strings of decoded events are interned, so that
+    buffered events share them. The event ID may be given as a string, in
+    which case it is only parsed into a UUID, or a tuple if it is of the form
+    "<major>:<minor>", the first time it is accessed.
+
+    Depending on the event ID strategy of the trigger function, the event ID
+    is either a UUID or a (major, minor) tuple of integers.
+
+    Events compare equal, and hash the same, when all of their attributes
+    are equal.
+
+    Events are pickled in their compact wire form (see `towire`), so that
+    shipping them to other processes is cheap.
+
     Attributes
     ----------
-    id: UUID
-        Event UUID.
+    id: UUID or tuple of int
+        Event ID.
     type: str
         PostGreSQL event type, one of 'INSERT', 'UPDATE', or 'DELETE'.
     schema_name: str
         Schema in which the event occurred.
     table_name: str
         Table in which event occurred.
-    row_id: str
-        Row ID of event. This attribute is a string so that it can
-        represent both regular id's and things like UUID's.
+    row_id: int, str, UUID or tuple
+        Row ID of event: the value of the table's key column, decoded to
+        the matching Python type, or a tuple of values for tables with
+        composite keys.
+    data: dict or None
+        Column values of the row, if the trigger sends row data: all of the
+        selected columns, or, for updates sent as diffs, those that changed.
+        None if the trigger only sends row IDs, or if the row's data did not
+        fit in the notification, in which case it must be read from the
+        table. Row data is not taken into account when comparing events.
+    source: str or None
+        Name of the connection on which the event was received, if it was
+        received through an EventMultiplexer; otherwise None. The source is
+        not taken into account when comparing events.
     """
 
-    id: str
+    __slots__ = ("_id", "type", "schema_name", "table_name", "row_id", "data", "source")
+
     type: str
     schema_name: str
     table_name: str
-    row_id: str
-
-    def __init__(self, id_: UUID, type_: str, schema_name: str, table_name: str, row_id: str) -> None:
+    row_id: Any
+    data: Optional[Dict[str, Any]]
+    source: Optional[str]
+
+    def __init__(
+        self,
+        id_: Union[EventId, str],
+        type_: str,
+        schema_name: str,
+        table_name: str,
+        row_id: Any,
+        data: Optional[Dict[str, Any]] = None,
+    ) -> None:
         """Initialize a new Event.
 
         Parameters
         ----------
-        id_: UUID
-            Event UUID.
+        id_: UUID, tuple of int or str
+            Event ID, or its string representation.
         type_: str
             PostGreSQL event type, one of 'INSERT', 'UPDATE', or 'DELETE'.
         schema_name: str
             Schema in which the event occurred.
         table_name: str
             Table in which event occurred.
-        row_id: str
-            Row ID of event. This attribute is a string so that it can
-            represent both regular id's and things like UUID's.
+        row_id: int, str, UUID or tuple
+            Row ID of event.
+        data: dict, optional
+            Column values of the row.
 
         Returns
         -------
         None
 
         """
-        self.id = id_
+        self._id = id_
         self.type = type_
         self.schema_name = schema_name
         self.table_name = table_name
         self.row_id = row_id
+        self.data = data
+        self.source = None
+
+    @property
+    def id(self) -> EventId:
+        id_ = self._id
+        if isinstance(id_, str):
+            id_ = self._id = _parse_id(id_)
+
+        return id_
+
+    @id.setter
+    def id(self, id_: Union[EventId, str]) -> None:
+        self._id = id_
+
+    def _key(self) -> tuple:
+        # Compare IDs in their string representation, so that comparing and
+        # hashing events does not parse their IDs.
+        id_ = self._id
+        id_ = id_.lower() if isinstance(id_, str) else _format_id(id_)
+
+        return (id_, self.type, self.schema_name, self.table_name, self.row_id)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Event):
+            return NotImplemented
+
+        return self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
 
     def __repr__(self):
         return "<Event id:{id_} type:{type_} table:{schema}.{table} row-id:{row_id}".format(
             id_=self.id, type_=self.type, schema=self.schema_name, table=self.table_name, row_id=self.row_id
         )
 
+    def __reduce__(self):
+        return (_event_fromwire, (self.towire(),))
+
+    def towire(self) -> tuple:
+        """Convert an Event into a compact tuple of builtin values, for inter-process communication.
+
+        UUIDs are converted to strings, which are much cheaper to pickle; the
+        event ID is only converted if it was already parsed.
+
+        Returns
+        -------
+        tuple
+            Wire form of the Event; see `fromwire`.
+
+        """
+        id_ = self._id
+        if isinstance(id_, UUID):
+            id_ = str(id_)
+
+        row_id = self.row_id
+        key_types = ""
+        if isinstance(row_id, UUID) or (isinstance(row_id, tuple) and len(row_id) > 1):
+            row_id, key_types = _encode_row_id(row_id)
+
+        return (id_, self.type, self.schema_name, self.table_name, row_id, key_types, self.data, self.source)
+
+    @classmethod
+    def fromwire(cls, wire: tuple) -> "Event":
+        """Create a new Event from its wire form.
+
+        Parameters
+        ----------
+        wire: tuple
+            Wire form of an Event, as returned by `towire`.
+
+        Returns
+        -------
+        Event
+            Event equal to the one converted.
+
+        """
+        id_, type_, schema_name, table_name, row_id, key_types, data, source = wire
+        if key_types:
+            row_id = _decode_row_ids([row_id], key_types)[0]
+
+        evt = cls(id_, intern(type_), intern(schema_name), intern(table_name), row_id, data)
+        evt.source = source
+        return evt
+
     @classmethod
     def fromjson(cls, json_string: str) -> "Event":
         """Create a new Event from a from a psycopg2-pgevent event JSON.
@@ -87,8 +407,104 @@ class Event:
             Event created from JSON deserialization.
 
         """
-        obj = json.loads(json_string)
-        return cls(UUID(obj["event_id"]), obj["event_type"], obj["schema_name"], obj["table_name"], obj["row_id"])
+        id_, type_, schema_name, table_name, row_ids, row_data = _unpack_object(_CODEC.loads(json_string))
+        return cls(id_, type_, schema_name, table_name, row_ids[0], row_data[0] if row_data else None)
+
+    @classmethod
+    def frompayload(cls, payload: str) -> List["Event"]:
+        """Create Events from a psycopg2-pgevent notification payload.
+
+        The payload format is identified by its version tag; the following
+        versions are understood:
+
+        1. Keyed objects: a JSON-serialized Event (see `tojson`), or, from
+           statement-level triggers, one with a "row_ids" list instead of a
+           single "row_id".
+        2. Packed objects, using abbreviated keys:
+
+           {"v": 2, "i": <event-id>, "o": <I|U|D>, "s": <schema>, "t": <table>, "r": [<row-id>, ...]}
+
+        3. Positional arrays (sent by the current trigger functions; see
+           `topayload`):
+
+           [3, <event-id>, <I|U|D>, <schema>, <table>, [<row-id>, ...](, <key-types>(, [<row-data>, ...]))]
+
+           Key types are only sent for tables with UUID or composite keys,
+           whose row IDs are decoded into UUIDs or tuples, or along with row
+           data, which holds an object (or null) per row ID.
+
+        Payloads carrying many row IDs are expanded into one Event per row.
+        If the payload's event ID is a UUID, all of the events share it. If it
+        is of the form "<major>:<minor>", the events are numbered
+        consecutively, starting from (major, minor).
+
+        Parameters
+        ----------
+        payload: str
+            Valid psycopg2-pgevent notification payload.
+
+        Returns
+        -------
+        list of Event
+            Events created from the payload, in row order.
+
+        """
+        obj = _CODEC.loads(payload)
+
+        if isinstance(obj, list):
+            version = obj[0]
+        else:
+            version = obj.get("v", 1)
+
+        unpack = _PAYLOAD_UNPACKERS.get(version)
+        if unpack is None:
+            raise ValueError('Unsupported payload version "{}"'.format(version))
+
+        id_, type_, schema_name, table_name, row_ids, row_data = unpack(obj)
+        type_ = intern(type_)
+        schema_name = intern(schema_name)
+        table_name = intern(table_name)
+
+        if ":" not in id_:
+            evts = [cls(id_, type_, schema_name, table_name, row_id) for row_id in row_ids]
+        else:
+            # "<major>:<minor>" IDs number the events of the payload consecutively
+            major, minor = _parse_id(id_)
+            evts = [
+                cls((major, minor + index), type_, schema_name, table_name, row_id)
+                for index, row_id in enumerate(row_ids)
+            ]
+
+        if row_data is not None:
+            for evt, data in zip(evts, row_data):
+                evt.data = data
+
+        return evts
+
+    def topayload(self) -> str:
+        """Serialize an Event into a (positional) notification payload.
+
+        Event types are abbreviated whatever their case, and decoded back in
+        upper case.
+
+        Returns
+        -------
+        str
+            Payload, in the format sent by the trigger functions.
+
+        """
+        event_type = _EVENT_TYPE_ABBREVIATIONS.get(self.type.upper())
+        if event_type is None:
+            raise ValueError('Invalid event type "{}"'.format(self.type))
+
+        row_id, key_types = _encode_row_id(self.row_id)
+        payload = [PAYLOAD_VERSION, _format_id(self.id), event_type, self.schema_name, self.table_name, [row_id]]
+        if self.data is not None:
+            payload.extend((key_types, [self.data]))
+        elif key_types == "u" or len(key_types) > 1:
+            payload.append(key_types)
+
+        return _CODEC.dumps(payload)
 
     def tojson(self) -> str:
         """Serialize an Event into JSON.
@@ -99,49 +515,164 @@ class Event:
             JSON-serialized Event.
 
         """
-        return json.dumps(
-            {
-                "event_id": str(self.id),
-                "event_type": self.type,
-                "schema_name": self.schema_name,
-                "table_name": self.table_name,
-                "row_id": self.row_id,
-            }
-        )
+        row_id, key_types = _encode_row_id(self.row_id)
+        obj = {
+            "event_id": _format_id(self.id),
+            "event_type": self.type,
+            "schema_name": self.schema_name,
+            "table_name": self.table_name,
+            "row_id": row_id,
+        }
+        if key_types == "u" or len(key_types) > 1:
+            obj["key_types"] = key_types
+        if self.data is not None:
+            obj["data"] = self.data
+
+        return _CODEC.dumps(obj)
+
+
+def _event_fromwire(wire: tuple) -> Event:
+    # Event.fromwire, as a module-level function that pickle can refer to
+    return Event.fromwire(wire)
+
+
+def event_channel(schema: Optional[str] = None, table: Optional[str] = None) -> str:
+    """Get the name of the channel on which events are sent.
+
+    Parameters
+    ----------
+    schema: str
+        Schema whose channel to get, for triggers installed with the "schema"
+        or "table" channel strategy. If None, the global channel is returned.
+    table: str
+        Table whose channel to get, for triggers installed with the "table"
+        channel strategy.
+
+    Returns
+    -------
+    str
+        Channel name. Names that would exceed PostGreSQL's identifier length
+        limit are replaced by a hash of the schema and table.
+
+    """
+    if schema is None:
+        if table is not None:
+            raise ValueError("A table channel requires a schema")
+        return GLOBAL_CHANNEL
+
+    channel = "pgevents:{}".format(schema if table is None else "{}.{}".format(schema, table))
+    if len(channel.encode()) > _MAX_CHANNEL_LENGTH:
+        channel = "pgevents:{}".format(md5(channel.encode()).hexdigest())
+
+    return channel
 
 
-def register_event_channel(connection: connection) -> None:
-    """Register psycopg2-pgevents event channel in the database.
+def _listen_statement(connection: connection, command: str, channels: Optional[Iterable[str]]) -> str:
+    if channels is None:
+        channels = [GLOBAL_CHANNEL]
+
+    return "".join("{} {};".format(command, quote_ident(channel, connection)) for channel in channels)
+
+
+def register_event_channel(connection: connection, channels: Optional[Iterable[str]] = None) -> None:
+    """Register psycopg2-pgevents event channels in the database.
+
+    All channels are registered with a single statement, outside of a
+    transaction, so that registration takes a single round trip and takes
+    effect immediately.
 
     Parameters
     ----------
     connection: psycopg2.extensions.connection
         Active connection to a PostGreSQL database.
+    channels: iterable of str
+        Names of the channels to register (see `event_channel`). Defaults to
+        the global channel.
 
     Returns
     -------
     None
 
     """
-    log("Registering psycopg2-pgevents channel...", logger_name=_LOGGER_NAME)
-    execute(connection, 'LISTEN "psycopg2_pgevents_channel";')
+    statement = _listen_statement(connection, "LISTEN", channels)
+    if not statement:
+        return
+
+    log("Registering psycopg2-pgevents channels...", logger_name=_LOGGER_NAME)
+    execute(connection, statement, autocommit=True)
 
 
-def unregister_event_channel(connection: connection) -> None:
-    """Un-register psycopg2-pgevents event channel from the database.
+def unregister_event_channel(connection: connection, channels: Optional[Iterable[str]] = None) -> None:
+    """Un-register psycopg2-pgevents event channels from the database.
 
     Parameters
     ----------
     connection: psycopg2.extensions.connection
         Active connection to a PostGreSQL database.
+    channels: iterable of str
+        Names of the channels to un-register (see `event_channel`). Defaults
+        to the global channel.
 
     Returns
     -------
     None
 
     """
-    log("Unregistering psycopg2-pgevents channel...", logger_name=_LOGGER_NAME)
-    execute(connection, 'UNLISTEN "psycopg2_pgevents_channel";')
+    statement = _listen_statement(connection, "UNLISTEN", channels)
+    if not statement:
+        return
+
+    log("Unregistering psycopg2-pgevents channels...", logger_name=_LOGGER_NAME)
+    execute(connection, statement, autocommit=True)
+
+
+def read_events(connection: connection) -> Iterator[Event]:
+    """Read events from the notifications already received by the connection.
+
+    Unlike `poll`, this method neither waits for nor reads new data from the
+    connection; it only consumes notifications that a previous call to the
+    connection's ``poll()`` method has queued in ``connection.notifies``.
+
+    Notifications are taken off of the connection a whole batch at a time, so
+    draining a large burst takes time linear in the size of the burst. If the
+    iterator is closed early, or a payload fails to decode, the notifications
+    that were not consumed are put back on the connection. Any container that
+    supports iteration, ``clear()``, ``append()`` and ``extend()`` (e.g. a
+    ``collections.deque``) may be assigned to ``connection.notifies``.
+
+    Parameters
+    ----------
+    connection: psycopg2.extensions.connection
+        Active connection to a PostGreSQL database.
+
+    Returns
+    -------
+    Iterator of Event
+        Events, in the order in which they were received.
+
+    """
+    # Notifications that arrive while events are being consumed (e.g. because
+    # the consumer runs a query on the connection) are picked up by the next
+    # iteration of the outer loop.
+    while connection.notifies:
+        notifies = list(connection.notifies)
+        connection.notifies.clear()
+
+        consumed = 0
+        try:
+            for notify in notifies:
+                consumed += 1
+                if debug_enabled():
+                    log("%s", notify, logger_name=_LOGGER_NAME)
+                yield from Event.frompayload(notify.payload)
+        finally:
+            if consumed < len(notifies):
+                # Put the rest of the batch back, ahead of the notifications
+                # that arrived in the meantime.
+                arrived = list(connection.notifies)
+                connection.notifies.clear()
+                connection.notifies.extend(notifies[consumed:])
+                connection.notifies.extend(arrived)
 
 
 def poll(connection: connection, timeout: float = 1.0) -> Iterable[Event]:
@@ -173,7 +704,7 @@ def poll(connection: connection, timeout: float = 1.0) -> Iterable[Event]:
     """
 
     if timeout > 0.0:
-        log("Polling for events (Blocking, {} seconds)...".format(timeout), logger_name=_LOGGER_NAME)
+        log("Polling for events (Blocking, %s seconds)...", timeout, logger_name=_LOGGER_NAME)
     else:
         log("Polling for events (Non-Blocking)...", logger_name=_LOGGER_NAME)
     if select.select([connection], [], [], timeout) == ([], [], []):
@@ -183,7 +714,4 @@ def poll(connection: connection, timeout: float = 1.0) -> Iterable[Event]:
         log("Events", logger_name=_LOGGER_NAME)
         log("------", logger_name=_LOGGER_NAME)
         connection.poll()
-        while connection.notifies:
-            event = connection.notifies.pop(0)
-            log(str(event), logger_name=_LOGGER_NAME)
-            yield Event.fromjson(event.payload)
+        yield from read_events(connection)
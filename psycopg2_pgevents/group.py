@@ -0,0 +1,239 @@
+"""This module provides functionality for processing events in parallel, without reordering changes to a row."""
+__all__ = ["ConsumerGroup", "shard"]
+
+
+import multiprocessing
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from psycopg2_pgevents.debug import log
+from psycopg2_pgevents.event import Event
+
+_LOGGER_NAME = "pgevents.group"
+
+# Number of seconds between checks that a worker is still alive, while
+# waiting for room in its queue.
+_PUT_INTERVAL = 0.1
+
+
+def shard(evt: Event, shards: int) -> int:
+    """Get the shard to which an event belongs.
+
+    Events on the same row always belong to the same shard.
+
+    Parameters
+    ----------
+    evt: Event
+        Event to shard.
+    shards: int
+        Number of shards.
+
+    Returns
+    -------
+    int
+        Shard index, from 0 to shards - 1.
+
+    """
+    return hash((evt.schema_name, evt.table_name, evt.row_id)) % shards
+
+
+def _work(index: int, events: Any, handler: Callable[[Event], None]) -> None:
+    """Handle batches of events until the stop sentinel (None) is received."""
+    while True:
+        batch = events.get()
+        if batch is None:
+            return
+
+        for evt in batch:
+            try:
+                handler(evt)
+            except Exception as e:
+                log(
+                    "Worker %s: %s: %s: %s",
+                    index,
+                    evt,
+                    e.__class__.__name__,
+                    e,
+                    category="error",
+                    logger_name=_LOGGER_NAME,
+                )
+
+
+class ConsumerGroup:
+    """Hand events to a group of workers, in parallel across rows and in order per row.
+
+    Events are sharded by their schema, table and row ID, and every shard is
+    handled by a worker of its own, so that the changes to a row are handled
+    in the order they were received, while changes to different rows are
+    handled in parallel. Workers are threads by default, which suits I/O-bound
+    handlers, or processes, which lets CPU-bound handlers use many cores; the
+    handler (and events) must then be picklable.
+
+    Each worker has a bounded queue of pending batches. Once it is full,
+    dispatching blocks until the worker catches up, so a slow worker slows
+    down the listener instead of building up an unbounded backlog;
+    notifications then wait on the database server.
+
+    Exceptions raised by the handler are logged, and do not stop the worker.
+
+    Examples
+    --------
+    >>> with ConsumerGroup(index_document, workers=8) as group:
+            group.run(stream)
+
+    """
+
+    def __init__(
+        self, handler: Callable[[Event], None], workers: int = 4, processes: bool = False, max_pending: int = 100,
+    ) -> None:
+        """Initialize a new ConsumerGroup, and start its workers.
+
+        Parameters
+        ----------
+        handler: callable
+            Function called with each event, by the worker of the event's
+            shard.
+        workers: int
+            Number of workers, and thus of shards.
+        processes: bool
+            Whether to run workers in processes instead of threads.
+        max_pending: int
+            Maximum number of batches of events pending per worker.
+
+        Returns
+        -------
+        None
+
+        """
+        if workers < 1:
+            raise ValueError("workers must be positive")
+
+        if max_pending < 1:
+            raise ValueError("max_pending must be positive")
+
+        self.handler = handler
+        self.processes = processes
+        self.max_pending = max_pending
+
+        if processes:
+            self._queues: List[Any] = [multiprocessing.Queue(max_pending) for _ in range(workers)]
+            self._workers: List[Any] = [
+                multiprocessing.Process(target=_work, args=(index, events, handler), daemon=True)
+                for index, events in enumerate(self._queues)
+            ]
+        else:
+            self._queues = [queue.Queue(max_pending) for _ in range(workers)]
+            self._workers = [
+                threading.Thread(target=_work, args=(index, events, handler), daemon=True)
+                for index, events in enumerate(self._queues)
+            ]
+
+        for worker in self._workers:
+            worker.start()
+
+        self._closed = False
+
+        log("Started %s workers (processes=%s)", workers, processes, logger_name=_LOGGER_NAME)
+
+    @property
+    def workers(self) -> int:
+        """Number of workers."""
+        return len(self._workers)
+
+    @property
+    def closed(self) -> bool:
+        """Whether or not the group has been closed."""
+        return self._closed
+
+    def _put(self, index: int, batch: Optional[List[Event]]) -> None:
+        """Queue a batch for a worker, waiting for room in its queue."""
+        events = self._queues[index]
+        while True:
+            try:
+                events.put(batch, timeout=_PUT_INTERVAL)
+                return
+            except queue.Full:
+                if not self._workers[index].is_alive():
+                    raise RuntimeError("Worker {} exited".format(index))
+
+    def dispatch(self, evts: Iterable[Event]) -> None:
+        """Hand events to the workers of their shards.
+
+        The events are split into one batch per shard, keeping their order,
+        and each batch is queued in one go. Blocks while the queue of any of
+        the shards is full.
+
+        Parameters
+        ----------
+        evts: iterable of Event
+            Events, in the order in which they were received.
+
+        Returns
+        -------
+        None
+
+        """
+        if self._closed:
+            raise ValueError("Consumer group is closed")
+
+        shards = len(self._workers)
+
+        batches: Dict[int, List[Event]] = {}
+        for evt in evts:
+            batches.setdefault(shard(evt, shards), []).append(evt)
+
+        for index, batch in batches.items():
+            self._put(index, batch)
+
+    def run(self, source) -> None:
+        """Dispatch the events of a stream until it is closed.
+
+        Parameters
+        ----------
+        source: EventStream, EventMultiplexer or OutboxConsumer
+            Stream of events, with a poll() method and a closed property.
+
+        Returns
+        -------
+        None
+
+        """
+        while not source.closed:
+            self.dispatch(source.poll())
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stop the workers, once they have handled every pending event.
+
+        Parameters
+        ----------
+        timeout: float
+            Number of seconds to wait for each worker to stop; if None, wait
+            for as long as it takes.
+
+        Returns
+        -------
+        None
+
+        """
+        if self._closed:
+            return
+
+        log("Stopping %s workers...", len(self._workers), logger_name=_LOGGER_NAME)
+        self._closed = True
+
+        for index in range(len(self._workers)):
+            try:
+                self._put(index, None)
+            except RuntimeError:
+                # The worker exited already
+                pass
+
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def __enter__(self) -> "ConsumerGroup":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
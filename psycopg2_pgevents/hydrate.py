@@ -0,0 +1,251 @@
+"""This module provides functionality for fetching the rows that events refer to."""
+__all__ = ["RowHydrator", "hydrate_events"]
+
+
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+from uuid import UUID
+
+from psycopg2.extensions import connection, quote_ident
+
+from psycopg2_pgevents.debug import log
+from psycopg2_pgevents.event import Event
+from psycopg2_pgevents.sql import execute, execute_prepared
+from psycopg2_pgevents.trigger import SELECT_TABLE_COLUMNS_STATEMENT
+
+_LOGGER_NAME = "pgevents.hydrate"
+
+# A fetched row, as a mapping of column names to values.
+Row = Dict[str, Any]
+
+SELECT_ROWS_STATEMENT = """
+SELECT {keys}, {columns} FROM {schema}.{table} WHERE {condition};
+"""
+
+# Condition selecting rows by the text representations of their key, for
+# single-column and composite keys. Keys are sent as text, and cast back to
+# the key column types so that the key's index can be used. Fetched rows are
+# matched to events on their keys encoded with to_json, like the triggers
+# encode row IDs, and decoded by psycopg2.
+SINGLE_KEY_CONDITION = "{key} = ANY(%s::text[]::{type}[])"
+COMPOSITE_KEY_CONDITION = "({keys}) IN (SELECT * FROM unnest({arrays}))"
+
+
+class _TableInfo(NamedTuple):
+    key: Tuple[str, ...]
+    key_types: Tuple[str, ...]
+    columns: Tuple[str, ...]
+
+
+def _key_text(value: Any) -> str:
+    """Format a row ID (element) as text that PostGreSQL can cast to the key column's type."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+
+    return str(value)
+
+
+def _key_value(value: Any) -> Any:
+    """Convert a row ID (element) to the value that its key column's to_json decodes to."""
+    return str(value) if isinstance(value, UUID) else value
+
+
+def _row_key(row_id: Any) -> Tuple[Any, ...]:
+    if isinstance(row_id, tuple):
+        return tuple(_key_value(value) for value in row_id)
+
+    return (_key_value(row_id),)
+
+
+class RowHydrator:
+    """Fetch the rows that events refer to, with one query per table.
+
+    Events are hydrated a window at a time: the events of a window are grouped
+    by table, the IDs of each table are deduplicated, and the rows of each
+    table are fetched with a single query on the table's key.
+
+    The key and columns of each table are read from the catalog the first
+    time the table is seen, and cached for the lifetime of the hydrator. Keys
+    default to the table's primary key or, for tables without one, the "id"
+    column, like the keys of the triggers (see install_trigger).
+
+    Examples
+    --------
+    >>> hydrator = RowHydrator(connection)
+    >>> for evt, row in hydrator.hydrate(poll(connection)):
+            print(evt.type, row)
+
+    """
+
+    def __init__(
+        self,
+        connection: connection,
+        columns: Optional[Iterable[str]] = None,
+        keys: Optional[Mapping[Tuple[str, str], Iterable[str]]] = None,
+    ) -> None:
+        """Initialize a new RowHydrator.
+
+        Parameters
+        ----------
+        connection: psycopg2.extensions.connection
+            Active connection to a PostGreSQL database, from which rows are
+            read.
+        columns: iterable of str
+            Columns to fetch; defaults to all columns of each table.
+        keys: mapping
+            Key columns, keyed by (schema, table), of tables whose triggers
+            were installed with an explicit key.
+
+        Returns
+        -------
+        None
+
+        """
+        self.connection = connection
+        self.columns = tuple(columns) if columns is not None else None
+        self.keys = {table: tuple(key) for table, key in (keys or {}).items()}
+
+        self._tables: Dict[Tuple[str, str], _TableInfo] = {}
+
+    def _load_tables(self, tables: List[Tuple[str, str]]) -> None:
+        """Read the keys and columns of tables from the catalog, with a single query."""
+        log("Reading the keys and columns of %s tables...", len(tables), logger_name=_LOGGER_NAME)
+
+        columns: List[Dict[str, str]] = [{} for _ in tables]
+        primary_keys: List[Dict[int, str]] = [{} for _ in tables]
+
+        result = execute_prepared(
+            self.connection,
+            "psycopg2_pgevents_select_columns",
+            SELECT_TABLE_COLUMNS_STATEMENT,
+            (
+                [
+                    "{}.{}".format(quote_ident(schema, self.connection), quote_ident(table, self.connection))
+                    for schema, table in tables
+                ],
+            ),
+        )
+        for ordinal, column, type_, primary_key_position in result or []:
+            columns[ordinal - 1][column] = type_
+            if primary_key_position is not None:
+                primary_keys[ordinal - 1][primary_key_position] = column
+
+        for index, table in enumerate(tables):
+            key = self.keys.get(table) or tuple(column for _, column in sorted(primary_keys[index].items())) or ("id",)
+
+            missing = [column for column in key if column not in columns[index]]
+            if missing:
+                raise ValueError("{}.{} has no key column(s) {}".format(*table, ", ".join(missing)))
+
+            self._tables[table] = _TableInfo(
+                key=key,
+                key_types=tuple(columns[index][column] for column in key),
+                columns=self.columns or tuple(columns[index]),
+            )
+
+    def _fetch_rows(self, table: Tuple[str, str], row_keys: Iterable[Tuple[Any, ...]]) -> Dict[Tuple[Any, ...], Row]:
+        """Fetch the rows of a table, given their keys."""
+        info = self._tables[table]
+        row_keys = list(row_keys)
+
+        keys = [quote_ident(column, self.connection) for column in info.key]
+        if len(keys) == 1:
+            condition = SINGLE_KEY_CONDITION.format(key=keys[0], type=info.key_types[0])
+        else:
+            condition = COMPOSITE_KEY_CONDITION.format(
+                keys=", ".join(keys), arrays=", ".join("%s::text[]::{}[]".format(type_) for type_ in info.key_types),
+            )
+
+        statement = SELECT_ROWS_STATEMENT.format(
+            keys=", ".join("to_json({})".format(key) for key in keys),
+            columns=", ".join(quote_ident(column, self.connection) for column in info.columns),
+            schema=quote_ident(table[0], self.connection),
+            table=quote_ident(table[1], self.connection),
+            condition=condition,
+        )
+        args = [[_key_text(row_key[index]) for row_key in row_keys] for index in range(len(keys))]
+
+        key_length = len(keys)
+        return {
+            tuple(row[:key_length]): dict(zip(info.columns, row[key_length:]))
+            for row in execute(self.connection, statement, args) or []
+        }
+
+    def hydrate(self, evts: Iterable[Event]) -> Iterator[Tuple[Event, Optional[Row]]]:
+        """Fetch the rows that a window of events refer to.
+
+        Rows are fetched with one query per table, for all of the table's
+        events at once; rows referred to by several events are fetched once.
+        Deleted rows are not fetched.
+
+        Parameters
+        ----------
+        evts: iterable of Event
+            Events to hydrate, typically the events returned by a single
+            call to poll.
+
+        Returns
+        -------
+        iterator of tuple
+            (Event, row) tuples, in the order of the events, where row is a
+            dict of column values, or None for deletes and for rows that no
+            longer exist.
+
+        """
+        evts = list(evts)
+
+        # Keys of the rows to fetch, per table, in order of appearance
+        row_keys: Dict[Tuple[str, str], Dict[Tuple[Any, ...], None]] = {}
+        for evt in evts:
+            if evt.type != "DELETE":
+                row_keys.setdefault((evt.schema_name, evt.table_name), {})[_row_key(evt.row_id)] = None
+
+        unknown = [table for table in row_keys if table not in self._tables]
+        if unknown:
+            self._load_tables(unknown)
+
+        rows: Dict[Tuple[str, str], Dict[Tuple[Any, ...], Row]] = {}
+        for table, keys in row_keys.items():
+            log("Fetching %s rows from %s.%s...", len(keys), *table, logger_name=_LOGGER_NAME)
+            rows[table] = self._fetch_rows(table, keys)
+
+        for evt in evts:
+            if evt.type == "DELETE":
+                yield evt, None
+            else:
+                yield evt, rows[(evt.schema_name, evt.table_name)].get(_row_key(evt.row_id))
+
+
+def hydrate_events(
+    connection: connection, evts: Iterable[Event], columns: Optional[Iterable[str]] = None
+) -> Iterator[Tuple[Event, Optional[Row]]]:
+    """Fetch the rows that a window of events refer to, with one query per table.
+
+    See RowHydrator, which should be used instead to hydrate many windows of
+    events, so that table keys are only read from the catalog once.
+
+    Parameters
+    ----------
+    connection: psycopg2.extensions.connection
+        Active connection to a PostGreSQL database, from which rows are read.
+    evts: iterable of Event
+        Events to hydrate.
+    columns: iterable of str
+        Columns to fetch; defaults to all columns of each table.
+
+    Returns
+    -------
+    iterator of tuple
+        (Event, row) tuples; see RowHydrator.hydrate.
+
+    """
+    return RowHydrator(connection, columns).hydrate(evts)
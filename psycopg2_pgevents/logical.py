@@ -0,0 +1,466 @@
+"""This module provides functionality for capturing events by logical decoding, instead of triggers."""
+__all__ = ["LogicalEventSource", "create_replication_slot", "drop_replication_slot"]
+
+
+import select
+import struct
+import time
+from sys import intern
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+from uuid import UUID
+
+from psycopg2.extensions import connection, quote_ident
+
+from psycopg2_pgevents.debug import log
+from psycopg2_pgevents.event import _CODECS, Event, get_codec
+
+_LOGGER_NAME = "pgevents.logical"
+
+# Output plugins whose changes may be decoded into events.
+PLUGINS = ("wal2json", "pgoutput")
+
+# Event types of decoded change actions; other actions (e.g. truncates) do
+# not generate events.
+_EVENT_TYPES = {"I": "INSERT", "U": "UPDATE", "D": "DELETE"}
+
+# Decoders of key values, given as text, keyed by column type name (wal2json)
+# or type OID (pgoutput). Values of all other types are kept as strings, like
+# the row IDs sent by the triggers.
+_KEY_DECODERS: Dict[Any, Callable[[str], Any]] = {
+    "smallint": int,
+    "integer": int,
+    "bigint": int,
+    "uuid": UUID,
+    21: int,
+    23: int,
+    20: int,
+    2950: UUID,
+}
+
+
+def _decode_key_value(type_: Any, value: Any) -> Any:
+    if value is None or isinstance(value, int):
+        return value
+
+    decode = _KEY_DECODERS.get(type_)
+    return value if decode is None else decode(value)
+
+
+def _row_id(values: List[Any]) -> Any:
+    return values[0] if len(values) == 1 else tuple(values)
+
+
+class _Wal2JsonDecoder:
+    """Decode the changes sent by the wal2json output plugin (format version 2)."""
+
+    def __init__(self, tables: Optional[List[Tuple[str, str]]]) -> None:
+        self.options = {"format-version": "2", "include-pk": "1", "include-transaction": "1"}
+        if tables:
+            # wal2json escapes commas and dots in table names with backslashes
+            self.options["add-tables"] = ",".join(
+                "{}.{}".format(*(name.replace(",", "\\,").replace(".", "\\.") for name in table)) for table in tables
+            )
+
+        self._begin = 0
+        self._ordinal = 0
+
+    def decode(self, data_start: int, payload: Any) -> List[Event]:
+        change = _CODECS[get_codec()].loads(payload)
+
+        action = change["action"]
+        if action == "B":
+            self._begin = data_start
+            self._ordinal = 0
+            return []
+
+        type_ = _EVENT_TYPES.get(action)
+        if type_ is None:
+            return []
+
+        # Deleted rows are only sent with their replica identity, which is
+        # their primary key by default
+        columns = change["identity"] if action == "D" else change["columns"]
+        values = {column["name"]: (column["type"], column["value"]) for column in columns}
+
+        if change.get("pk"):
+            key = [column["name"] for column in change["pk"]]
+        elif "id" in values:
+            key = ["id"]
+        else:
+            key = list(values)
+
+        row_id = _row_id([_decode_key_value(*values[column]) for column in key])
+
+        evt = Event((self._begin, self._ordinal), type_, intern(change["schema"]), intern(change["table"]), row_id)
+        self._ordinal += 1
+        return [evt]
+
+
+class _PgOutputDecoder:
+    """Decode the changes sent by the built-in pgoutput output plugin (protocol version 1)."""
+
+    def __init__(self, publication: str) -> None:
+        self.options = {"proto_version": "1", "publication_names": publication}
+
+        # Schema, table, key column indexes and key column type OIDs, per
+        # relation OID, as announced by relation messages.
+        self._relations: Dict[int, Tuple[str, str, List[int], List[int]]] = {}
+        self._begin = 0
+        self._ordinal = 0
+
+    @staticmethod
+    def _string(payload: bytes, offset: int) -> Tuple[str, int]:
+        end = payload.index(b"\0", offset)
+        return payload[offset:end].decode(), end + 1
+
+    @staticmethod
+    def _tuple(payload: bytes, offset: int) -> List[Optional[str]]:
+        (column_count,) = struct.unpack_from("!H", payload, offset)
+        offset += 2
+
+        values: List[Optional[str]] = []
+        for _ in range(column_count):
+            kind = payload[offset]
+            offset += 1
+            if kind == ord("t"):
+                (length,) = struct.unpack_from("!i", payload, offset)
+                start = offset + 4
+                end = start + length
+                values.append(payload[start:end].decode())
+                offset = end
+            else:
+                # Null, or unchanged TOASTed value
+                values.append(None)
+
+        return values
+
+    @staticmethod
+    def _skip_tuple(payload: bytes, offset: int) -> int:
+        (column_count,) = struct.unpack_from("!H", payload, offset)
+        offset += 2
+        for _ in range(column_count):
+            kind = payload[offset]
+            offset += 1
+            if kind == ord("t"):
+                (length,) = struct.unpack_from("!i", payload, offset)
+                offset += 4 + length
+
+        return offset
+
+    def _relation(self, payload: bytes) -> None:
+        (oid,) = struct.unpack_from("!I", payload, 1)
+        schema, offset = self._string(payload, 5)
+        table, offset = self._string(payload, offset)
+        (column_count,) = struct.unpack_from("!H", payload, offset + 1)
+        offset += 3
+
+        key_indexes = []
+        key_types = []
+        for index in range(column_count):
+            flags = payload[offset]
+            _name, offset = self._string(payload, offset + 1)
+            (type_oid,) = struct.unpack_from("!I", payload, offset)
+            offset += 8
+            if flags & 1:
+                key_indexes.append(index)
+                key_types.append(type_oid)
+
+        self._relations[oid] = (intern(schema or "pg_catalog"), intern(table), key_indexes, key_types)
+
+    def decode(self, data_start: int, payload: Any) -> List[Event]:
+        payload = bytes(payload)
+
+        action = chr(payload[0])
+        if action == "B":
+            self._begin = data_start
+            self._ordinal = 0
+            return []
+
+        if action == "R":
+            self._relation(payload)
+            return []
+
+        type_ = _EVENT_TYPES.get(action)
+        if type_ is None:
+            return []
+
+        (oid,) = struct.unpack_from("!I", payload, 1)
+        schema, table, key_indexes, key_types = self._relations[oid]
+
+        # Updates that change the key are sent with the old key ("K") or old
+        # row ("O") first; the event refers to the row's new key.
+        offset = 5
+        if action == "U" and payload[offset] in b"KO":
+            offset = self._skip_tuple(payload, offset + 1)
+        values = self._tuple(payload, offset + 1)
+
+        row_id = _row_id(
+            [_decode_key_value(type_oid, values[index]) for index, type_oid in zip(key_indexes, key_types)]
+        )
+
+        evt = Event((self._begin, self._ordinal), type_, schema, table, row_id)
+        self._ordinal += 1
+        return [evt]
+
+
+def create_replication_slot(connection: connection, slot_name: str, plugin: str = "wal2json") -> None:
+    """Create a logical replication slot from which to capture events.
+
+    The slot retains every change made from now on until it is acknowledged
+    (see LogicalEventSource.ack), so that no change is lost while no listener
+    is connected. Slots that are no longer read from must be dropped, or the
+    server will retain WAL indefinitely.
+
+    Parameters
+    ----------
+    connection: psycopg2.extras.LogicalReplicationConnection
+        Replication connection to a PostGreSQL database.
+    slot_name: str
+        Name of the slot.
+    plugin: str
+        Output plugin, one of "wal2json" or "pgoutput".
+
+    Returns
+    -------
+    None
+
+    """
+    if plugin not in PLUGINS:
+        raise ValueError('Invalid output plugin "{}"'.format(plugin))
+
+    log("Creating replication slot %s (plugin=%s)...", slot_name, plugin, logger_name=_LOGGER_NAME)
+
+    with connection.cursor() as cursor:
+        cursor.create_replication_slot(slot_name, output_plugin=plugin)
+
+
+def drop_replication_slot(connection: connection, slot_name: str) -> None:
+    """Drop a logical replication slot.
+
+    Parameters
+    ----------
+    connection: psycopg2.extras.LogicalReplicationConnection
+        Replication connection to a PostGreSQL database.
+    slot_name: str
+        Name of the slot.
+
+    Returns
+    -------
+    None
+
+    """
+    log("Dropping replication slot %s...", slot_name, logger_name=_LOGGER_NAME)
+
+    with connection.cursor() as cursor:
+        cursor.drop_replication_slot(slot_name)
+
+
+class LogicalEventSource:
+    """Stream events from a logical replication slot.
+
+    Unlike triggers, logical decoding adds no work to the transactions that
+    write to the watched tables: changes are read from the write-ahead log,
+    after they are committed. Changes are retained by the slot until they are
+    acknowledged, so a source that reconnects to the same slot catches up on
+    everything it missed.
+
+    Events are the same as those of `poll`, except that event IDs are
+    (position, ordinal) pairs, where position identifies the transaction
+    within the log and ordinal numbers the events of the transaction. Rows
+    are identified by their replica identity, which is their primary key by
+    default.
+
+    `ack` acknowledges the changes handed out so far: when iterating over the
+    source, up to the event last yielded; after `poll`, the whole batch. A
+    transaction that is only partly acknowledged is read again in full by
+    the next source on the same slot.
+
+    The slot may use either the wal2json output plugin, which must be
+    installed on the server, or the built-in pgoutput plugin, which reads the
+    tables of a publication (see CREATE PUBLICATION). Either requires the
+    server's wal_level to be "logical".
+
+    Examples
+    --------
+    >>> connection = psycopg2.connect(dsn, connection_factory=LogicalReplicationConnection)
+    >>> create_replication_slot(connection, "pgevents")
+    >>> with LogicalEventSource(connection, "pgevents") as source:
+            for evt in source:
+                print(evt)
+                source.ack()
+
+    """
+
+    def __init__(
+        self,
+        connection: connection,
+        slot_name: str,
+        plugin: str = "wal2json",
+        tables: Optional[Iterable[Tuple[str, str]]] = None,
+        publication: Optional[str] = None,
+        timeout: float = 1.0,
+        max_batch: int = 10000,
+    ) -> None:
+        """Initialize a new LogicalEventSource, and start replication.
+
+        Parameters
+        ----------
+        connection: psycopg2.extras.LogicalReplicationConnection
+            Replication connection to a PostGreSQL database.
+        slot_name: str
+            Name of the slot, which must already exist.
+        plugin: str
+            Output plugin of the slot, one of "wal2json" or "pgoutput".
+        tables: iterable of tuple of str
+            (schema, table) tuples of the tables whose changes generate events;
+            defaults to all tables. Only supported by wal2json.
+        publication: str
+            Name of the publication to read; required by pgoutput.
+        timeout: float
+            Number of seconds to block for events before checking whether the
+            source has been closed, when iterating over the source.
+        max_batch: int
+            Number of events after which a wakeup stops reading further
+            changes and hands the events to the caller.
+
+        Returns
+        -------
+        None
+
+        """
+        if plugin == "wal2json":
+            if publication is not None:
+                raise ValueError("wal2json does not support publications")
+            self._decoder: Any = _Wal2JsonDecoder(list(tables) if tables is not None else None)
+        elif plugin == "pgoutput":
+            if publication is None:
+                raise ValueError("pgoutput requires a publication")
+            if tables is not None:
+                raise ValueError("pgoutput reads the tables of its publication")
+            self._decoder = _PgOutputDecoder(quote_ident(publication, connection))
+        else:
+            raise ValueError('Invalid output plugin "{}"'.format(plugin))
+
+        self.connection = connection
+        self.slot_name = slot_name
+        self.timeout = timeout
+        self.max_batch = max_batch
+
+        self._cursor = connection.cursor()
+        self._cursor.start_replication(slot_name, decode=plugin == "wal2json", options=self._decoder.options)
+        self._position = 0
+        self._acknowledged = 0
+        self._closed = False
+
+        log("Streaming events from replication slot %s...", slot_name, logger_name=_LOGGER_NAME)
+
+    @property
+    def closed(self) -> bool:
+        """Whether or not the source has been closed."""
+        return self._closed
+
+    def poll(self, timeout: Optional[float] = None) -> List[Event]:
+        """Wait for changes and return the events of everything that is available.
+
+        Parameters
+        ----------
+        timeout: float
+            Number of seconds to block for changes before timing out.
+            Defaults to the source's timeout.
+
+        Returns
+        -------
+        list of Event
+            Events, in commit order; empty if the wait timed out.
+
+        """
+        events, _positions, position = self._read(timeout)
+        self._position = max(self._position, position)
+        return events
+
+    def _read(self, timeout: Optional[float]) -> Tuple[List[Event], List[int], int]:
+        """Wait for changes, and return their events along with the position of each and of the last message read."""
+        if timeout is None:
+            timeout = self.timeout
+
+        events: List[Event] = []
+        positions: List[int] = []
+        position = 0
+        deadline = None
+
+        while len(events) < self.max_batch:
+            message = self._cursor.read_message()
+            if message is None:
+                if events:
+                    break
+
+                # Messages that only carry transaction boundaries, or changes
+                # of other tables, do not end the wait
+                if deadline is None:
+                    deadline = time.monotonic() + timeout
+                remaining = deadline - time.monotonic()
+                if remaining <= 0.0 or select.select([self._cursor], [], [], remaining) == ([], [], []):
+                    break
+                continue
+
+            decoded = self._decoder.decode(message.data_start, message.payload)
+            events.extend(decoded)
+            positions.extend([message.data_start] * len(decoded))
+            position = message.data_start
+
+        return events, positions, position
+
+    def ack(self) -> None:
+        """Acknowledge every change handed out so far, so that the slot may release it.
+
+        Returns
+        -------
+        None
+
+        """
+        if self._position != self._acknowledged:
+            self._cursor.send_feedback(flush_lsn=self._position)
+            self._acknowledged = self._position
+
+    def __iter__(self) -> Iterator[Event]:
+        while not self._closed:
+            events, positions, position = self._read(None)
+            for evt, evt_position in zip(events, positions):
+                self._position = max(self._position, evt_position)
+                yield evt
+
+            # Every event of the batch has been handled, including those of
+            # its last transaction, whose commit may follow its last change
+            self._position = max(self._position, position)
+
+    def close(self) -> None:
+        """Stop streaming events.
+
+        The replication connection itself is left open, but can no longer be
+        used for anything else; close it to end replication.
+
+        Returns
+        -------
+        None
+
+        """
+        if self._closed:
+            return
+
+        log("Closing logical event source %s...", self.slot_name, logger_name=_LOGGER_NAME)
+        self._closed = True
+
+    def __enter__(self) -> "LogicalEventSource":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
@@ -0,0 +1,219 @@
+"""This module provides functionality for listening for events on many connections at once."""
+__all__ = ["EventMultiplexer"]
+
+
+import selectors
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from psycopg2.extensions import connection
+
+from psycopg2_pgevents.debug import log
+from psycopg2_pgevents.event import Event, read_events
+
+_LOGGER_NAME = "pgevents.multiplex"
+
+
+class EventMultiplexer:
+    """Stream events from many connections with a single thread.
+
+    All connections are registered with a single selector, so waiting for
+    events takes one system call no matter how many connections there are,
+    and each wakeup only reads from the connections that are actually ready.
+    Every event is tagged with the name of the connection it was received on
+    (see Event.source).
+
+    Connections may be added and removed at any time, including while
+    iterating over the multiplexer, but only from the thread that polls it.
+    The connections must already be registered to the event channel.
+
+    Examples
+    --------
+    >>> with EventMultiplexer() as mux:
+            mux.add(orders_connection, source="orders")
+            mux.add(users_connection, source="users")
+            for evt in mux:
+                print(evt.source, evt)
+
+    """
+
+    def __init__(self, connections: Iterable[connection] = (), timeout: float = 1.0, max_batch: int = 10000) -> None:
+        """Initialize a new EventMultiplexer.
+
+        Parameters
+        ----------
+        connections: iterable of psycopg2.extensions.connection
+            Active connections to PostGreSQL databases to add right away,
+            named after their DSN.
+        timeout: float
+            Number of seconds to block for events before checking whether the
+            multiplexer has been closed, when iterating over the multiplexer.
+        max_batch: int
+            Number of events after which a wakeup stops reading further data
+            from the connections and hands the events to the caller.
+
+        Returns
+        -------
+        None
+
+        """
+        self.timeout = timeout
+        self.max_batch = max_batch
+
+        self._selector = selectors.DefaultSelector()
+        self._sources: Dict[connection, str] = {}
+        self._pending: List[Event] = []
+        self._closed = False
+
+        for conn in connections:
+            self.add(conn)
+
+    @property
+    def closed(self) -> bool:
+        """Whether or not the multiplexer has been closed."""
+        return self._closed
+
+    @property
+    def connections(self) -> List[connection]:
+        """Connections currently being listened to, in the order they were added."""
+        return list(self._sources)
+
+    def add(self, connection: connection, source: Optional[str] = None) -> None:
+        """Start listening for events on a connection.
+
+        Parameters
+        ----------
+        connection: psycopg2.extensions.connection
+            Active connection to a PostGreSQL database.
+        source: str
+            Name with which to tag the connection's events. Defaults to the
+            connection's DSN.
+
+        Returns
+        -------
+        None
+
+        """
+        if connection in self._sources:
+            raise ValueError("Connection is already being listened to")
+
+        if source is None:
+            source = connection.dsn
+
+        log("Adding connection %s...", source, logger_name=_LOGGER_NAME)
+
+        self._selector.register(connection, selectors.EVENT_READ, source)
+        self._sources[connection] = source
+
+        # Notifications may already have been read off of the socket by an
+        # earlier call to the connection's poll(); the socket will not become
+        # readable for them again.
+        if connection.notifies:
+            self._pending.extend(self._read(connection, source))
+
+    def remove(self, connection: connection) -> None:
+        """Stop listening for events on a connection.
+
+        Events that were already received from the connection, but not yet
+        returned, are still returned. The connection itself is left open.
+
+        Parameters
+        ----------
+        connection: psycopg2.extensions.connection
+            Connection that is being listened to.
+
+        Returns
+        -------
+        None
+
+        """
+        source = self._sources.pop(connection, None)
+        if source is None:
+            raise ValueError("Connection is not being listened to")
+
+        log("Removing connection %s...", source, logger_name=_LOGGER_NAME)
+
+        self._selector.unregister(connection)
+
+    def poll(self, timeout: Optional[float] = None) -> List[Event]:
+        """Wait for events on any connection and return everything that is available.
+
+        If reading from a connection fails, the connection is removed before
+        the exception is raised, and events that were already read from other
+        connections are returned by the next call.
+
+        Parameters
+        ----------
+        timeout: float
+            Number of seconds to block for events before timing out. Defaults
+            to the multiplexer's timeout.
+
+        Returns
+        -------
+        list of Event
+            Events received, in order per connection; empty if the wait timed
+            out.
+
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        events = self._pending
+        self._pending = []
+        if events:
+            timeout = 0.0
+
+        try:
+            ready = self._selector.select(timeout)
+            while ready and len(events) < self.max_batch:
+                for key, _mask in ready:
+                    events.extend(self._read(key.fileobj, key.data, poll=True))
+                ready = self._selector.select(0.0)
+        except Exception:
+            self._pending = events
+            raise
+
+        return events
+
+    def _read(self, connection: connection, source: str, poll: bool = False) -> List[Event]:
+        try:
+            if poll:
+                connection.poll()
+            events = list(read_events(connection))
+        except Exception as e:
+            log("%s: %s: %s", source, e.__class__.__name__, e, category="error", logger_name=_LOGGER_NAME)
+            self.remove(connection)
+            raise
+
+        for event in events:
+            event.source = source
+
+        return events
+
+    def __iter__(self) -> Iterator[Event]:
+        while not self._closed:
+            yield from self.poll()
+
+    def close(self) -> None:
+        """Stop listening for events on all connections.
+
+        Iteration over the multiplexer ends once the events of the current
+        wakeup have been consumed. The connections themselves are left open.
+
+        Returns
+        -------
+        None
+
+        """
+        if self._closed:
+            return
+
+        log("Closing event multiplexer...", logger_name=_LOGGER_NAME)
+        self._closed = True
+        self._sources.clear()
+        self._selector.close()
+
+    def __enter__(self) -> "EventMultiplexer":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
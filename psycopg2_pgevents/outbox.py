@@ -0,0 +1,465 @@
+"""This module provides functionality for reading events from the durable outbox."""
+__all__ = [
+    "OutboxBatch",
+    "OutboxConsumer",
+    "acknowledge",
+    "maintain_outbox",
+    "outbox_position",
+    "read_outbox",
+]
+
+
+import select
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from psycopg2.extensions import connection
+
+from psycopg2_pgevents.debug import log
+from psycopg2_pgevents.event import (
+    Event,
+    register_event_channel,
+    unregister_event_channel,
+)
+from psycopg2_pgevents.sql import execute, execute_prepared
+
+_LOGGER_NAME = "pgevents.outbox"
+
+# Channel on which the trigger functions send a wakeup hint, with an empty
+# payload, whenever a transaction writes events to the outbox. Identical
+# notifications are folded by PostGreSQL, so a hint is sent once per
+# transaction.
+OUTBOX_CHANNEL = "psycopg2_pgevents_outbox"
+
+# Positions in the outbox are (transaction ID, sequence number) pairs. Events
+# are read in transaction ID order, and only once every transaction with a
+# lower ID has ended, so that events committed late by a long-running
+# transaction are never skipped over.
+Position = Tuple[int, int]
+
+# Position before the first event of the outbox.
+START_POSITION: Position = (0, 0)
+
+# Default number of transaction IDs covered by each outbox partition.
+DEFAULT_PARTITION_SIZE = 1000000
+
+# Default number of partitions to create ahead of the current transaction ID.
+DEFAULT_PARTITIONS_AHEAD = 4
+
+INSTALL_OUTBOX_STATEMENT = """
+CREATE TABLE IF NOT EXISTS public.pgevents_outbox (
+  txid bigint NOT NULL DEFAULT txid_current(),
+  seq bigserial NOT NULL,
+  payload text NOT NULL,
+  PRIMARY KEY (txid, seq)
+) PARTITION BY RANGE (txid);
+
+-- Catches events of transactions whose partition has not been created yet.
+CREATE TABLE IF NOT EXISTS public.pgevents_outbox_default PARTITION OF public.pgevents_outbox DEFAULT;
+
+CREATE TABLE IF NOT EXISTS public.pgevents_outbox_consumers (
+  consumer text PRIMARY KEY,
+  txid bigint NOT NULL,
+  seq bigint NOT NULL
+);
+
+-- Drop the partitions whose events every consumer has acknowledged, and
+-- create partitions ahead of the current transaction ID. Returns the number
+-- of partitions dropped.
+CREATE OR REPLACE FUNCTION public.psycopg2_pgevents_maintain_outbox(partition_size bigint, partitions_ahead integer)
+RETURNS integer AS $function$
+  DECLARE
+    horizon bigint = (SELECT min(txid) FROM public.pgevents_outbox_consumers);
+    first_partition bigint = txid_snapshot_xmax(txid_current_snapshot()) / partition_size;
+    outbox_partition record;
+    dropped integer = 0;
+  BEGIN
+    FOR outbox_partition IN
+      SELECT
+        c.oid::regclass AS name,
+        substring(pg_get_expr(c.relpartbound, c.oid) FROM 'TO \\(''?(\\d+)')::bigint AS upper_bound
+      FROM pg_catalog.pg_inherits i JOIN pg_catalog.pg_class c ON c.oid = i.inhrelid
+      WHERE i.inhparent = 'public.pgevents_outbox'::regclass
+    LOOP
+      IF (outbox_partition.upper_bound <= horizon) THEN
+        EXECUTE format('DROP TABLE %s', outbox_partition.name);
+        dropped = dropped + 1;
+      END IF;
+    END LOOP;
+    DELETE FROM public.pgevents_outbox_default WHERE txid < horizon;
+    -- Partitions may not overlap the events already caught by the default
+    -- partition.
+    first_partition = greatest(
+      first_partition, (SELECT max(txid) / partition_size + 1 FROM public.pgevents_outbox_default)
+    );
+    FOR ahead IN 0..partitions_ahead - 1 LOOP
+      EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS public.%I PARTITION OF public.pgevents_outbox FOR VALUES FROM (%s) TO (%s)',
+        'pgevents_outbox_' || (first_partition + ahead) * partition_size,
+        (first_partition + ahead) * partition_size,
+        (first_partition + ahead + 1) * partition_size
+      );
+    END LOOP;
+    RETURN dropped;
+  END;
+$function$
+LANGUAGE plpgsql;
+"""
+
+UNINSTALL_OUTBOX_STATEMENT = """
+DROP FUNCTION IF EXISTS public.psycopg2_pgevents_maintain_outbox(bigint, integer);
+DROP TABLE IF EXISTS public.pgevents_outbox_consumers;
+DROP TABLE IF EXISTS public.pgevents_outbox;
+"""
+
+# Only events of transactions that ended before every transaction that is
+# still in progress are read.
+SELECT_OUTBOX_STATEMENT = """
+SELECT
+    txid, seq, payload
+FROM
+    public.pgevents_outbox
+WHERE
+    (txid, seq) > ($1, $2) AND
+    txid < txid_snapshot_xmin(txid_current_snapshot())
+ORDER BY
+    txid, seq
+LIMIT $3;
+"""
+
+SELECT_POSITION_STATEMENT = """
+SELECT txid, seq FROM public.pgevents_outbox_consumers WHERE consumer = $1;
+"""
+
+UPSERT_POSITION_STATEMENT = """
+INSERT INTO public.pgevents_outbox_consumers(consumer, txid, seq) VALUES ($1, $2, $3)
+ON CONFLICT (consumer) DO UPDATE SET txid = excluded.txid, seq = excluded.seq
+WHERE (pgevents_outbox_consumers.txid, pgevents_outbox_consumers.seq) < (excluded.txid, excluded.seq);
+"""
+
+MAINTAIN_OUTBOX_STATEMENT = """
+SELECT public.psycopg2_pgevents_maintain_outbox(%s, %s);
+"""
+
+
+class OutboxBatch(NamedTuple):
+    """Events read from the outbox.
+
+    Attributes
+    ----------
+    position: tuple of int
+        Position of the last event read, from which to continue reading; the
+        position that was read from if no events were read.
+    events: list of Event
+        Events, in outbox order.
+    positions: list of tuple of int
+        Position up to which it is safe to acknowledge once each event has
+        been handled. Rows written by packed notifications hold several
+        events, so only the last event of a row moves past the row.
+    """
+
+    position: Position
+    events: List[Event]
+    positions: List[Position]
+
+
+def read_outbox(connection: connection, position: Position = START_POSITION, limit: int = 1000) -> OutboxBatch:
+    """Read a batch of events from the outbox.
+
+    Parameters
+    ----------
+    connection: psycopg2.extensions.connection
+        Active connection to a PostGreSQL database.
+    position: tuple of int
+        Position after which to read; defaults to the start of the outbox.
+    limit: int
+        Maximum number of outbox rows to read. Rows written by packed
+        notifications hold several events each.
+
+    Returns
+    -------
+    OutboxBatch
+        Events read, along with the position of the last of them.
+
+    """
+    if limit < 1:
+        raise ValueError("limit must be positive")
+
+    rows = execute_prepared(
+        connection, "psycopg2_pgevents_select_outbox", SELECT_OUTBOX_STATEMENT, (*position, limit), autocommit=True
+    )
+    if not rows:
+        return OutboxBatch(position, [], [])
+
+    log("Read %s outbox rows after %s:%s", len(rows), *position, logger_name=_LOGGER_NAME)
+
+    events: List[Event] = []
+    positions: List[Position] = []
+    for txid, seq, payload in rows:
+        row_events = Event.frompayload(payload)
+        if row_events:
+            events.extend(row_events)
+            positions.extend([position] * (len(row_events) - 1))
+            positions.append((txid, seq))
+        position = (txid, seq)
+
+    return OutboxBatch(position, events, positions)
+
+
+def outbox_position(connection: connection, consumer: str) -> Position:
+    """Get the position up to which a consumer has acknowledged events.
+
+    Parameters
+    ----------
+    connection: psycopg2.extensions.connection
+        Active connection to a PostGreSQL database.
+    consumer: str
+        Name of the consumer.
+
+    Returns
+    -------
+    tuple of int
+        Acknowledged position; the start of the outbox for unknown consumers.
+
+    """
+    result = execute_prepared(
+        connection, "psycopg2_pgevents_select_position", SELECT_POSITION_STATEMENT, (consumer,), autocommit=True
+    )
+    if not result:
+        return START_POSITION
+
+    txid, seq = result[0]
+    return txid, seq
+
+
+def acknowledge(connection: connection, consumer: str, position: Position) -> None:
+    """Acknowledge the events of the outbox up to a position.
+
+    Acknowledged positions never move backwards: acknowledging a position
+    before the consumer's current one has no effect.
+
+    Parameters
+    ----------
+    connection: psycopg2.extensions.connection
+        Active connection to a PostGreSQL database.
+    consumer: str
+        Name of the consumer.
+    position: tuple of int
+        Position of the last event handled, as returned by `read_outbox`.
+
+    Returns
+    -------
+    None
+
+    """
+    log("Acknowledging %s up to %s:%s", consumer, *position, logger_name=_LOGGER_NAME)
+
+    execute_prepared(
+        connection,
+        "psycopg2_pgevents_upsert_position",
+        UPSERT_POSITION_STATEMENT,
+        (consumer, *position),
+        autocommit=True,
+    )
+
+
+def maintain_outbox(
+    connection: connection,
+    partition_size: int = DEFAULT_PARTITION_SIZE,
+    partitions_ahead: int = DEFAULT_PARTITIONS_AHEAD,
+) -> int:
+    """Apply the outbox's retention, and prepare it for upcoming events.
+
+    The outbox is partitioned by transaction ID. Partitions whose events have
+    been acknowledged by every consumer are dropped as a whole, so cleanup
+    never has to delete rows one by one; nothing is dropped while no consumer
+    has acknowledged anything. Partitions are then created ahead of the
+    current transaction ID. Events of transactions beyond the last partition
+    are still captured, by a default partition, but should be avoided by
+    running maintenance periodically (e.g. from a consumer, or cron).
+
+    Parameters
+    ----------
+    connection: psycopg2.extensions.connection
+        Active connection to a PostGreSQL database.
+    partition_size: int
+        Number of transaction IDs covered by each partition. Must not change
+        for the lifetime of the outbox.
+    partitions_ahead: int
+        Number of partitions to keep ready ahead of the current transaction ID.
+
+    Returns
+    -------
+    int
+        Number of partitions dropped.
+
+    """
+    if partition_size < 1:
+        raise ValueError("partition_size must be positive")
+
+    if partitions_ahead < 1:
+        raise ValueError("partitions_ahead must be positive")
+
+    log("Maintaining outbox...", logger_name=_LOGGER_NAME)
+
+    result = execute(connection, MAINTAIN_OUTBOX_STATEMENT, (partition_size, partitions_ahead))
+    dropped = result[0][0] if result else 0
+
+    log("...%s partitions dropped", dropped, logger_name=_LOGGER_NAME)
+
+    return dropped
+
+
+class OutboxConsumer:
+    """Consume the events of the outbox, picking up where the consumer left off.
+
+    The consumer starts reading from the position it last acknowledged, and
+    reads events in large batches, waiting for the wakeup hints sent by the
+    trigger functions whenever it has caught up. Events are delivered at
+    least once: any that were read but not acknowledged are read again by
+    the next consumer of the same name.
+
+    `ack` acknowledges the events handed out so far: when iterating over the
+    consumer, up to the event last yielded; after `poll`, the whole batch.
+
+    The outbox holds the events of all tables, whatever the channel strategy
+    of their triggers. The consumer's connection should not be used to listen
+    for anything else, since hints are discarded as they are received.
+
+    Examples
+    --------
+    >>> with OutboxConsumer(connection, "search-indexer") as consumer:
+            for evt in consumer:
+                index(evt)
+                consumer.ack()
+
+    """
+
+    def __init__(self, connection: connection, consumer: str, batch_size: int = 1000, timeout: float = 1.0) -> None:
+        """Initialize a new OutboxConsumer.
+
+        Parameters
+        ----------
+        connection: psycopg2.extensions.connection
+            Active connection to a PostGreSQL database.
+        consumer: str
+            Name of the consumer, under which its position is acknowledged.
+        batch_size: int
+            Maximum number of outbox rows read at a time.
+        timeout: float
+            Number of seconds to wait for a wakeup hint before checking
+            whether the consumer has been closed, when iterating over the
+            consumer.
+
+        Returns
+        -------
+        None
+
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be positive")
+
+        self.connection = connection
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.timeout = timeout
+
+        register_event_channel(connection, [OUTBOX_CHANNEL])
+        # Position of the last event handed out, and position after which
+        # the next batch is read.
+        self.position = outbox_position(connection, consumer)
+        self._cursor = self.position
+        self._acknowledged = self.position
+        self._closed = False
+
+        log("Consuming outbox as %s from %s:%s...", consumer, *self.position, logger_name=_LOGGER_NAME)
+
+    @property
+    def closed(self) -> bool:
+        """Whether or not the consumer has been closed."""
+        return self._closed
+
+    def poll(self, timeout: Optional[float] = None) -> List[Event]:
+        """Read the next batch of events, waiting for one if the consumer has caught up.
+
+        Parameters
+        ----------
+        timeout: float
+            Number of seconds to wait for a wakeup hint if no events are
+            available. Defaults to the consumer's timeout.
+
+        Returns
+        -------
+        list of Event
+            Events read, in outbox order; empty if the wait timed out.
+
+        """
+        batch = self._read(timeout)
+        self.position = batch.position
+        return batch.events
+
+    def _read(self, timeout: Optional[float]) -> OutboxBatch:
+        """Read the batch after the cursor, waiting for one if the consumer has caught up."""
+        if timeout is None:
+            timeout = self.timeout
+
+        # Hints received so far are covered by the read that follows
+        self.connection.notifies.clear()
+
+        # Events held back behind a transaction that is still in progress are
+        # picked up by the read of a later call, once the wait has timed out.
+        batch = read_outbox(self.connection, self._cursor, self.batch_size)
+        if not batch.events and timeout > 0.0:
+            # Hints may have been received while reading
+            if not self.connection.notifies and select.select([self.connection], [], [], timeout) != ([], [], []):
+                self.connection.poll()
+
+            if self.connection.notifies:
+                self.connection.notifies.clear()
+                batch = read_outbox(self.connection, self._cursor, self.batch_size)
+
+        self._cursor = batch.position
+        return batch
+
+    def ack(self) -> None:
+        """Acknowledge every event handed out so far.
+
+        Returns
+        -------
+        None
+
+        """
+        if self.position != self._acknowledged:
+            acknowledge(self.connection, self.consumer, self.position)
+            self._acknowledged = self.position
+
+    def __iter__(self) -> Iterator[Event]:
+        try:
+            while not self._closed:
+                batch = self._read(None)
+                for evt, position in zip(batch.events, batch.positions):
+                    self.position = position
+                    yield evt
+        finally:
+            # Events of the batch that were not handed out are read again
+            self._cursor = self.position
+
+    def close(self) -> None:
+        """Stop consuming events, without acknowledging any.
+
+        Returns
+        -------
+        None
+
+        """
+        if self._closed:
+            return
+
+        log("Closing outbox consumer %s...", self.consumer, logger_name=_LOGGER_NAME)
+        self._closed = True
+        unregister_event_channel(self.connection, [OUTBOX_CHANNEL])
+
+    def __enter__(self) -> "OutboxConsumer":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
@@ -1,45 +1,66 @@
 """This module provides functionality for interacting directly with the database."""
-__all__ = ["execute"]
+__all__ = ["execute", "execute_prepared"]
 
 
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+from weakref import WeakKeyDictionary
 
-from psycopg2 import ProgrammingError
-from psycopg2.extensions import connection, cursor
+from psycopg2 import DatabaseError, ProgrammingError
+from psycopg2.errorcodes import (
+    DUPLICATE_PREPARED_STATEMENT,
+    INVALID_SQL_STATEMENT_NAME,
+)
+from psycopg2.extensions import STATUS_READY, connection, cursor
 
-from psycopg2_pgevents.debug import log
+from psycopg2_pgevents.debug import debug_enabled, log
 
 _LOGGER_NAME = "pgevents.sql"
 
+# Names of the statements that have been prepared on each connection.
+_PREPARED_STATEMENTS: "WeakKeyDictionary[connection, Set[str]]" = WeakKeyDictionary()
+
 
 class Psycopg2Cursor(cursor):
     def execute(self, query: str, args: Union[Dict, List, None] = None):
-        log("Query", logger_name=_LOGGER_NAME)
-        log("-----", logger_name=_LOGGER_NAME)
-        log(self.mogrify(query, args), logger_name=_LOGGER_NAME)
+        if debug_enabled():
+            log("Query", logger_name=_LOGGER_NAME)
+            log("-----", logger_name=_LOGGER_NAME)
+            log("%s", self.mogrify(query, args), logger_name=_LOGGER_NAME)
 
         try:
             super().execute(query, args)
         except Exception as e:
             log("Exception", category="error", logger_name=_LOGGER_NAME)
             log("---------", category="error", logger_name=_LOGGER_NAME)
-            log(
-                "{name}: {msg}".format(name=e.__class__.__name__, msg=str(e)),
-                category="error",
-                logger_name=_LOGGER_NAME,
-            )
+            log("%s: %s", e.__class__.__name__, e, category="error", logger_name=_LOGGER_NAME)
             raise
 
 
-def execute(connection: connection, statement: str) -> Optional[List[Tuple[str, ...]]]:
+def execute(
+    connection: connection, statement: str, args: Union[Dict, Sequence, None] = None, autocommit: Optional[bool] = None,
+) -> Optional[List[Tuple[str, ...]]]:
     """Execute PGSQL statement and fetches the statement response.
 
+    By default, the statement is run in a transaction of its own that is
+    committed before returning, unless the connection is in autocommit mode,
+    in which case the statement is simply sent to the server. Either way, a
+    statement made up of several SQL commands is executed atomically.
+
     Parameters
     ----------
     connection: psycopg2.extensions.connection
         Active connection to a PostGreSQL database.
     statement: str
         PGSQL statement to run against the database.
+    args: sequence or dict
+        Parameters to bind to the statement's placeholders (i.e. "%s" or
+        "%(name)s"), if any.
+    autocommit: bool
+        Whether or not to run the statement without an explicit transaction,
+        saving the BEGIN and COMMIT round trips. Defaults to the connection's
+        autocommit mode. If True for a connection that is not in autocommit
+        mode, the connection is switched to autocommit mode for the duration
+        of the statement, unless a transaction is already in progress.
 
     Returns
     -------
@@ -48,7 +69,18 @@ def execute(connection: connection, statement: str) -> Optional[List[Tuple[str,
         each tuple item roughly corresponds to a column. For instance, while a raw SELECT response might include
         the table headers, psycopg2 returns only the rows that matched. If no response was given, None is returned.
     """
-    response = list()  # type: List
+    if autocommit is None:
+        autocommit = connection.autocommit
+
+    if autocommit and connection.autocommit:
+        return _execute(connection, statement, args)
+
+    if autocommit and connection.status == STATUS_READY:
+        connection.autocommit = True
+        try:
+            return _execute(connection, statement, args)
+        finally:
+            connection.autocommit = False
 
     # See the following link for reasoning behind both with statements:
     #   http://initd.org/psycopg/docs/usage.html#with-statement
@@ -58,29 +90,111 @@ def execute(connection: connection, statement: str) -> Optional[List[Tuple[str,
     # PostGreSQL's autocommit isolation-level, since the transaction is
     # properly completed for each statement.
     with connection:
-        with connection.cursor(cursor_factory=Psycopg2Cursor) as cursor:
-            cursor.execute(statement)
-            connection.commit()
-
-            # Get response
-            try:
-                response = cursor.fetchall()
-                if not response:
-                    # Empty response list
-                    log("<No Response>", logger_name=_LOGGER_NAME)
-                    return None
-            except ProgrammingError as e:
-                if e.args and e.args[0] == "no results to fetch":
-                    # No response available (i.e. no response given)
-                    log("<No Response>", logger_name=_LOGGER_NAME)
-                    return None
-
-                # Some other programming error; re-raise
-                raise e
+        return _execute(connection, statement, args)
+
+
+def _execute(
+    connection: connection, statement: str, args: Union[Dict, Sequence, None]
+) -> Optional[List[Tuple[str, ...]]]:
+    response = list()  # type: List
 
+    with connection.cursor(cursor_factory=Psycopg2Cursor) as cursor:
+        cursor.execute(statement, args)
+
+        # Get response
+        try:
+            response = cursor.fetchall()
+            if not response:
+                # Empty response list
+                log("<No Response>", logger_name=_LOGGER_NAME)
+                return None
+        except ProgrammingError as e:
+            if e.args and e.args[0] == "no results to fetch":
+                # No response available (i.e. no response given)
+                log("<No Response>", logger_name=_LOGGER_NAME)
+                return None
+
+            # Some other programming error; re-raise
+            raise e
+
+        if debug_enabled():
             log("Response", logger_name=_LOGGER_NAME)
             log("--------", logger_name=_LOGGER_NAME)
             for line in response:
-                log(str(line), logger_name=_LOGGER_NAME)
+                log("%s", line, logger_name=_LOGGER_NAME)
+
+    return response
+
+
+def execute_prepared(
+    connection: connection, name: str, statement: str, args: Sequence = (), autocommit: Optional[bool] = None
+) -> Optional[List[Tuple[str, ...]]]:
+    """Execute a server-side prepared statement and fetch the statement response.
+
+    The statement is prepared the first time it is executed on a connection,
+    in the same round trip as its first execution. The statement stays
+    prepared even if that first execution fails. Every later execution on
+    the same connection only sends its name and parameters, so that the
+    server does not have to parse and plan the statement again.
+
+    Parameters
+    ----------
+    connection: psycopg2.extensions.connection
+        Active connection to a PostGreSQL database.
+    name: str
+        Name of the prepared statement; must be unique for each statement.
+    statement: str
+        PGSQL statement to prepare, with parameter placeholders of the form
+        "$1", "$2", etc.
+    args: sequence
+        Parameters to bind to the statement's placeholders.
+    autocommit: bool
+        See `execute`.
+
+    Returns
+    -------
+    response: list or None
+        See `execute`.
+
+    """
+    prepared = _PREPARED_STATEMENTS.setdefault(connection, set())
+
+    execute_statement = "EXECUTE {}".format(name)
+    if args:
+        execute_statement += "({})".format(", ".join(["%s"] * len(args)))
+
+    if name in prepared:
+        try:
+            return execute(connection, execute_statement, args, autocommit=autocommit)
+        except DatabaseError as e:
+            if e.pgcode != INVALID_SQL_STATEMENT_NAME:
+                raise
+
+        # The prepared statement was deallocated behind our back (e.g. by a
+        # connection pooler running DISCARD ALL); prepare it again.
+        log("Statement %s was deallocated; preparing again...", name, logger_name=_LOGGER_NAME)
+        prepared.discard(name)
+
+    log("Preparing statement %s...", name, logger_name=_LOGGER_NAME)
+
+    prepare_statement = "PREPARE {} AS {}".format(name, statement.strip().rstrip(";"))
+    if args:
+        prepare_statement = prepare_statement.replace("%", "%%")
+
+    try:
+        response = execute(
+            connection, "{};\n{};".format(prepare_statement, execute_statement), args, autocommit=autocommit
+        )
+    except DatabaseError as e:
+        if e.pgcode != DUPLICATE_PREPARED_STATEMENT:
+            raise
+
+        # A previous first execution failed after the statement was prepared,
+        # which the server does not undo; execute the existing statement.
+        log("Statement %s was already prepared; executing...", name, logger_name=_LOGGER_NAME)
+        prepared.add(name)
+        return execute(connection, execute_statement, args, autocommit=autocommit)
+
+    prepared.add(name)
 
     return response
@@ -0,0 +1,175 @@
+"""This module provides functionality for continuously streaming events."""
+__all__ = ["EventStream", "listen_forever"]
+
+
+import selectors
+from typing import Iterable, Iterator, List, Optional
+
+from psycopg2.extensions import connection
+
+from psycopg2_pgevents.debug import log
+from psycopg2_pgevents.event import (
+    Event,
+    read_events,
+    register_event_channel,
+    unregister_event_channel,
+)
+
+_LOGGER_NAME = "pgevents.stream"
+
+
+class EventStream:
+    """Continuously stream events from a connection.
+
+    Unlike `poll`, which waits for a single batch of events and then returns,
+    an EventStream keeps a single selector registered with the connection for
+    its whole lifetime. Each time the connection becomes readable, everything
+    that is available is read and decoded before waiting again, so bursts of
+    notifications are handled in as few wakeups as possible.
+
+    The connection must already be registered to the event channel (see
+    `listen_forever` for a variant that handles registration).
+
+    Examples
+    --------
+    >>> with EventStream(connection) as stream:
+            for evt in stream:
+                print(evt)
+
+    """
+
+    def __init__(self, connection: connection, timeout: float = 1.0, max_batch: int = 10000) -> None:
+        """Initialize a new EventStream.
+
+        Parameters
+        ----------
+        connection: psycopg2.extensions.connection
+            Active connection to a PostGreSQL database.
+        timeout: float
+            Number of seconds to block for events before checking whether the
+            stream has been closed, when iterating over the stream.
+        max_batch: int
+            Number of events after which a wakeup stops reading further data
+            from the connection and hands the events to the caller.
+
+        Returns
+        -------
+        None
+
+        """
+        self.connection = connection
+        self.timeout = timeout
+        self.max_batch = max_batch
+
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(connection, selectors.EVENT_READ)
+        self._closed = False
+
+        log("Streaming events...", logger_name=_LOGGER_NAME)
+
+    @property
+    def closed(self) -> bool:
+        """Whether or not the stream has been closed."""
+        return self._closed
+
+    def poll(self, timeout: Optional[float] = None) -> List[Event]:
+        """Wait for events and return everything that is available.
+
+        Parameters
+        ----------
+        timeout: float
+            Number of seconds to block for events before timing out. Defaults
+            to the stream's timeout.
+
+        Returns
+        -------
+        list of Event
+            Events received, in order; empty if the wait timed out.
+
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        events: List[Event] = []
+
+        # Notifications may already have been read off of the socket by an
+        # earlier call to the connection's poll().
+        if self.connection.notifies:
+            events.extend(read_events(self.connection))
+            timeout = 0.0
+
+        ready = self._selector.select(timeout)
+        while ready and len(events) < self.max_batch:
+            self.connection.poll()
+            events.extend(read_events(self.connection))
+            ready = self._selector.select(0.0)
+
+        return events
+
+    def __iter__(self) -> Iterator[Event]:
+        while not self._closed:
+            yield from self.poll()
+
+    def close(self) -> None:
+        """Stop streaming events.
+
+        Iteration over the stream ends once the events of the current wakeup
+        have been consumed. The connection itself is left open.
+
+        Returns
+        -------
+        None
+
+        """
+        if self._closed:
+            return
+
+        log("Closing event stream...", logger_name=_LOGGER_NAME)
+        self._closed = True
+        self._selector.close()
+
+    def __enter__(self) -> "EventStream":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+def listen_forever(
+    connection: connection, timeout: float = 1.0, channels: Optional[Iterable[str]] = None
+) -> Iterator[Event]:
+    """Register event channels and yield events until the caller stops.
+
+    The event channels are unregistered when the generator is closed (e.g. when
+    the caller breaks out of the loop, or the generator is garbage-collected).
+
+    Parameters
+    ----------
+    connection: psycopg2.extensions.connection
+        Active connection to a PostGreSQL database.
+    timeout: float
+        Number of seconds to block for events per wakeup.
+    channels: iterable of str
+        Names of the channels to register (see `event_channel`). Defaults to
+        the global channel.
+
+    Returns
+    -------
+    Iterator of Event
+        Events, in the order in which they were received.
+
+    Examples
+    --------
+    >>> for evt in listen_forever(connection):
+            print(evt)
+
+    """
+    if channels is not None:
+        channels = list(channels)
+
+    register_event_channel(connection, channels)
+    try:
+        with EventStream(connection, timeout=timeout) as stream:
+            yield from stream
+    finally:
+        unregister_event_channel(connection, channels)
@@ -2,47 +2,505 @@
 __all__ = [
     "install_trigger",
     "install_trigger_function",
+    "install_triggers",
+    "invalidate_trigger_cache",
+    "set_trigger_cache_ttl",
     "trigger_function_installed",
     "trigger_installed",
+    "triggers_installed",
     "uninstall_trigger",
     "uninstall_trigger_function",
+    "uninstall_triggers",
 ]
 
 
-from psycopg2 import ProgrammingError
-from psycopg2.extensions import connection
+import time
+from typing import (
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+from weakref import WeakKeyDictionary
+
+from psycopg2.extensions import (
+    QuotedString,
+    connection,
+    encodings,
+    quote_ident,
+)
 
 from psycopg2_pgevents.debug import log
-from psycopg2_pgevents.sql import execute
+from psycopg2_pgevents.event import event_channel
+from psycopg2_pgevents.outbox import (
+    DEFAULT_PARTITION_SIZE,
+    DEFAULT_PARTITIONS_AHEAD,
+    INSTALL_OUTBOX_STATEMENT,
+    OUTBOX_CHANNEL,
+    UNINSTALL_OUTBOX_STATEMENT,
+)
+from psycopg2_pgevents.sql import execute, execute_prepared
 
 _LOGGER_NAME = "pgevents.trigger"
 
+# Tables may be given either by name, or as (schema, table) tuples.
+TableSpec = Union[str, Tuple[str, str]]
 
-INSTALL_TRIGGER_FUNCTION_STATEMENT = """
+# Default number of seconds for which cached trigger state is used.
+DEFAULT_TRIGGER_CACHE_TTL = 60.0
+
+# Number of seconds for which cached trigger state is used; None caches it
+# until it is invalidated.
+_TRIGGER_CACHE_TTL: Optional[float] = DEFAULT_TRIGGER_CACHE_TTL
+
+# Cached trigger state per connection, as the monotonic time at which it was
+# loaded and the (schema, table) tuples that have a trigger installed.
+_TRIGGER_CACHE: "WeakKeyDictionary[connection, Tuple[float, FrozenSet[Tuple[str, str]]]]" = WeakKeyDictionary()
+
+
+# Statements that install psycopg2_pgevents_next_event_id(event_count), which
+# returns the ID of the first of event_count consecutive events, keyed by event
+# ID strategy. IDs of the form "<major>:<minor>" stand for the first of the
+# IDs (major, minor), (major, minor + 1), ..., (major, minor + event_count - 1).
+INSTALL_EVENT_ID_FUNCTION_STATEMENTS = {
+    "uuid": """
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+CREATE OR REPLACE FUNCTION public.psycopg2_pgevents_next_event_id(event_count integer)
+RETURNS text AS $function$
+  SELECT public.uuid_generate_v4()::text;
+$function$
+LANGUAGE sql VOLATILE;
+""",
+    "sequence": """
+CREATE SEQUENCE IF NOT EXISTS public.psycopg2_pgevents_event_id_seq;
+
+CREATE OR REPLACE FUNCTION public.psycopg2_pgevents_next_event_id(event_count integer)
+RETURNS text AS $function$
+  SELECT nextval('public.psycopg2_pgevents_event_id_seq') || ':0';
+$function$
+LANGUAGE sql VOLATILE;
+""",
+    "txid": """
+CREATE OR REPLACE FUNCTION public.psycopg2_pgevents_next_event_id(event_count integer)
+RETURNS text AS $function$
+  DECLARE
+    ordinal bigint = coalesce(nullif(current_setting('psycopg2_pgevents.ordinal', true), ''), '0')::bigint;
+  BEGIN
+    PERFORM set_config('psycopg2_pgevents.ordinal', (ordinal + event_count)::text, true);
+    RETURN txid_current() || ':' || ordinal;
+  END;
+$function$
+LANGUAGE plpgsql VOLATILE;
+""",
+}
+
+# Statements that install psycopg2_pgevents_publish(channel, payload), through
+# which the trigger functions send every payload, keyed by whether or not
+# events are written to the outbox.
+INSTALL_PUBLISH_FUNCTION_STATEMENTS = {
+    False: """
+CREATE OR REPLACE FUNCTION public.psycopg2_pgevents_publish(channel text, payload text)
+RETURNS void AS $function$
+  SELECT pg_notify(channel, payload);
+$function$
+LANGUAGE sql VOLATILE;
+""",
+    # Payloads are written to the outbox, and only a hint (with an empty
+    # payload, so that PostGreSQL folds the hints of a transaction into one) is
+    # sent as a notification.
+    True: INSTALL_OUTBOX_STATEMENT
+    + """
+CREATE OR REPLACE FUNCTION public.psycopg2_pgevents_publish(channel text, payload text)
+RETURNS void AS $function$
+  INSERT INTO public.pgevents_outbox(payload) VALUES (payload);
+  SELECT pg_notify('{outbox_channel}', '');
+$function$
+LANGUAGE sql VOLATILE;
+
+SELECT public.psycopg2_pgevents_maintain_outbox({partition_size}, {partitions_ahead});
+""".format(
+        outbox_channel=OUTBOX_CHANNEL, partition_size=DEFAULT_PARTITION_SIZE, partitions_ahead=DEFAULT_PARTITIONS_AHEAD,
+    ),
+}
+
+INSTALL_TRIGGER_FUNCTION_STATEMENT = """
 SET search_path = public, pg_catalog;
 
+-- Payloads are positional JSON arrays, tagged with the payload format version
+-- (see psycopg2_pgevents.event.Event.frompayload):
+--   [3, <event-id>, <I|U|D>, <schema>, <table>, [<row-id>, ...](, <key-types>(, [<row-data>, ...]))]
+--
+-- Row IDs are the JSON-encoded values of the table's key columns; composite
+-- keys are encoded as JSON arrays. Key types, one letter per key column, are
+-- only sent for keys that the listener cannot decode from JSON alone, or
+-- along with row data.
+--
+-- Row data, if requested, is a JSON object of column values per row, or null
+-- for rows whose data does not fit in a notification.
+--
+-- Triggers take the following arguments, all of which are optional:
+--   0. Channel on which to send notifications (default: the global channel).
+--   1. Condition that updated rows must meet to generate events, in terms of
+--      their old (o) and new (n) versions (statement-level triggers only).
+--   2. Comma-separated names of the key columns (default: id).
+--   3. Key types.
+--   4. Row data to send: none (empty; the default), row or diff.
+--   5. Comma-separated names of the columns of which to send data (default:
+--      all columns).
+
+-- Encode the key of a row, given as JSON, for a payload.
+CREATE OR REPLACE FUNCTION psycopg2_pgevents_encode_key(row_data json, key_columns text)
+RETURNS text AS $function$
+  SELECT CASE
+    WHEN strpos(key_columns, ',') = 0 THEN (row_data -> key_columns)::text
+    ELSE '[' || (
+      SELECT string_agg((row_data -> key_column)::text, ',' ORDER BY ordinal)
+      FROM unnest(string_to_array(key_columns, ',')) WITH ORDINALITY AS key_column_names(key_column, ordinal)
+    ) || ']'
+  END;
+$function$
+LANGUAGE sql IMMUTABLE;
+
+-- Encode the data of a row, given its new and old versions as JSON, for a
+-- payload. Diffs only hold the columns of updated rows that changed.
+CREATE OR REPLACE FUNCTION psycopg2_pgevents_encode_data(
+  new_row json, old_row json, data_mode text, data_columns text
+)
+RETURNS text AS $function$
+  SELECT '{' || coalesce(string_agg(to_json(key)::text || ':' || value::text, ',' ORDER BY ordinal), '') || '}'
+  FROM json_each(coalesce(new_row, old_row)) WITH ORDINALITY AS row_columns(key, value, ordinal)
+  WHERE
+    (data_columns = '' OR key = ANY(string_to_array(data_columns, ','))) AND
+    (data_mode <> 'diff' OR old_row IS NULL OR new_row IS NULL OR value::text IS DISTINCT FROM (old_row -> key)::text);
+$function$
+LANGUAGE sql IMMUTABLE;
+
 CREATE OR REPLACE FUNCTION psycopg2_pgevents_create_event()
 RETURNS TRIGGER AS $function$
   DECLARE
-    row_id integer;
+    key_columns text = coalesce(TG_ARGV[2], 'id');
+    data_mode text = coalesce(TG_ARGV[4], '');
+    row_id text;
+    row_data text;
+    new_row json;
+    old_row json;
   BEGIN
     IF (TG_OP = 'DELETE') THEN
-      row_id = OLD.id;
+      IF (key_columns = 'id') THEN
+        row_id = to_json(OLD.id)::text;
+      ELSE
+        row_id = psycopg2_pgevents_encode_key(to_json(OLD), key_columns);
+      END IF;
     ELSE
-      row_id = NEW.id;
+      IF (key_columns = 'id') THEN
+        row_id = to_json(NEW.id)::text;
+      ELSE
+        row_id = psycopg2_pgevents_encode_key(to_json(NEW), key_columns);
+      END IF;
     END IF;
-    PERFORM pg_notify(
-     'psycopg2_pgevents_channel',
-      json_build_object(
-        'event_id', uuid_generate_v4(),
-        'event_type', TG_OP,
-        'schema_name', TG_TABLE_SCHEMA,
-        'table_name', TG_TABLE_NAME,
-        'row_id', row_id
-      )::text
+    IF (data_mode = '') THEN
+      PERFORM psycopg2_pgevents_publish(
+        coalesce(TG_ARGV[0], 'psycopg2_pgevents_channel'),
+        format(
+          '[3,"%s","%s",%s,%s,[%s]%s]',
+          psycopg2_pgevents_next_event_id(1),
+          left(TG_OP, 1),
+          to_json(TG_TABLE_SCHEMA),
+          to_json(TG_TABLE_NAME),
+          row_id,
+          CASE WHEN coalesce(TG_ARGV[3], '') = '' THEN '' ELSE ',"' || TG_ARGV[3] || '"' END
+        )
+      );
+      RETURN NULL;
+    END IF;
+    IF (TG_OP <> 'DELETE') THEN
+      new_row = to_json(NEW);
+    END IF;
+    IF (TG_OP <> 'INSERT') THEN
+      old_row = to_json(OLD);
+    END IF;
+    row_data = psycopg2_pgevents_fit_data(
+      row_id,
+      psycopg2_pgevents_encode_data(new_row, old_row, data_mode, coalesce(TG_ARGV[5], '')),
+      TG_TABLE_SCHEMA,
+      TG_TABLE_NAME
+    );
+    PERFORM psycopg2_pgevents_send_events(
+      coalesce(TG_ARGV[0], 'psycopg2_pgevents_channel'),
+      TG_OP,
+      TG_TABLE_SCHEMA,
+      TG_TABLE_NAME,
+      row_id,
+      coalesce(TG_ARGV[3], ''),
+      row_data
+    );
+    RETURN NULL;
+  END;
+$function$
+LANGUAGE plpgsql;
+
+-- Send a single notification carrying the IDs, and optionally the data, of
+-- one or more rows that were affected by the same operation on the same
+-- table. row_ids and row_data are comma-separated lists of encoded row IDs
+-- and row data; row_data is NULL if no data is sent.
+DROP FUNCTION IF EXISTS psycopg2_pgevents_send_events(text, text, text, text);
+DROP FUNCTION IF EXISTS psycopg2_pgevents_send_events(text, text, text, text, text);
+DROP FUNCTION IF EXISTS psycopg2_pgevents_send_events(text, text, text, text, text, text);
+CREATE OR REPLACE FUNCTION psycopg2_pgevents_send_events(
+  channel text, event_type text, schema_name text, table_name text, row_ids text, key_types text, row_data text
+)
+RETURNS void AS $function$
+  BEGIN
+    PERFORM psycopg2_pgevents_publish(
+      channel,
+      format(
+        '[3,"%s","%s",%s,%s,[%s]%s]',
+        psycopg2_pgevents_next_event_id(
+          CASE WHEN strpos(row_ids, ',') = 0 THEN 1 ELSE json_array_length(('[' || row_ids || ']')::json) END
+        ),
+        left(event_type, 1),
+        to_json(schema_name),
+        to_json(table_name),
+        row_ids,
+        CASE
+          WHEN row_data IS NOT NULL THEN ',"' || key_types || '",[' || row_data || ']'
+          WHEN key_types = '' THEN ''
+          ELSE ',"' || key_types || '"'
+        END
+      )
+    );
+  END;
+$function$
+LANGUAGE plpgsql;
+
+-- Number of bytes of row IDs and data that may be packed into a single notification,
+-- leaving room for the rest of the payload under the 8000-byte NOTIFY limit.
+-- Rows are only packed into a notification if they fit within the budget, so
+-- the margin only has to cover the event ID, event type and key types.
+CREATE OR REPLACE FUNCTION psycopg2_pgevents_payload_budget(schema_name text, table_name text)
+RETURNS integer AS $function$
+  SELECT 7800 - octet_length(to_json(schema_name)::text) - octet_length(to_json(table_name)::text);
+$function$
+LANGUAGE sql IMMUTABLE;
+
+-- Data of a row to send along with its ID: the encoded data, or null if it
+-- would not fit in a notification on its own.
+CREATE OR REPLACE FUNCTION psycopg2_pgevents_fit_data(row_id text, row_data text, schema_name text, table_name text)
+RETURNS text AS $function$
+  SELECT CASE
+    WHEN octet_length(row_id) + octet_length(row_data) > psycopg2_pgevents_payload_budget(schema_name, table_name)
+    THEN 'null'
+    ELSE row_data
+  END;
+$function$
+LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION psycopg2_pgevents_create_statement_event()
+RETURNS TRIGGER AS $function$
+  DECLARE
+    key_columns text[] = string_to_array(coalesce(TG_ARGV[2], 'id'), ',');
+    data_mode text = coalesce(TG_ARGV[4], '');
+    budget integer = psycopg2_pgevents_payload_budget(TG_TABLE_SCHEMA, TG_TABLE_NAME);
+    key_row text = CASE WHEN TG_OP = 'DELETE' THEN 'o' ELSE 'n' END;
+    key_expression text;
+    new_row text = 'NULL';
+    old_row text = 'NULL';
+    affected_rows text;
+    row_id text;
+    row_ids text;
+    row_datum text;
+    row_data text;
+    packed_length integer = 0;
+    row_length integer;
+  BEGIN
+    -- NULL key columns are encoded as JSON nulls, like
+    -- psycopg2_pgevents_encode_key() encodes them.
+    key_expression = (
+      SELECT string_agg(
+        format('coalesce(to_json(%s.%I)::text, ''null'')', key_row, key_column),
+        ' || '','' || ' ORDER BY ordinal
+      )
+      FROM unnest(key_columns) WITH ORDINALITY AS key_column_names(key_column, ordinal)
     );
+    IF (array_length(key_columns, 1) > 1) THEN
+      key_expression = format('''['' || %s || '']''', key_expression);
+    END IF;
+    IF (TG_OP = 'DELETE') THEN
+      affected_rows = 'psycopg2_pgevents_old_rows AS o';
+      old_row = 'to_json(o)';
+    ELSIF (TG_OP = 'UPDATE' AND (coalesce(TG_ARGV[1], '') <> '' OR data_mode = 'diff')) THEN
+      -- Only updated rows that meet the trigger's condition generate events.
+      -- The old and new versions of the rows are paired by position, as
+      -- both transition tables hold the rows in the order they were
+      -- updated, so that updates of the key itself are not lost.
+      affected_rows = format(
+        '(SELECT n, row_number() OVER () AS ordinal FROM psycopg2_pgevents_new_rows AS n) AS numbered_new_rows'
+        ' JOIN (SELECT o, row_number() OVER () AS ordinal FROM psycopg2_pgevents_old_rows AS o) AS numbered_old_rows'
+        ' USING (ordinal)'
+        ' CROSS JOIN LATERAL (SELECT (numbered_new_rows.n).*) AS n'
+        ' CROSS JOIN LATERAL (SELECT (numbered_old_rows.o).*) AS o'
+        ' WHERE %s',
+        coalesce(nullif(TG_ARGV[1], ''), 'true')
+      );
+      new_row = 'to_json(n)';
+      old_row = 'to_json(o)';
+    ELSE
+      affected_rows = 'psycopg2_pgevents_new_rows AS n';
+      new_row = 'to_json(n)';
+    END IF;
+    -- Rows are packed into notifications one at a time, and a notification
+    -- is sent before the next row would take it over the payload budget.
+    FOR row_id, row_datum IN EXECUTE format(
+      'SELECT %s, CASE WHEN $1 <> '''' THEN'
+      '  psycopg2_pgevents_fit_data(%s, psycopg2_pgevents_encode_data(%s, %s, $1, $2), $3, $4)'
+      ' END FROM %s',
+      key_expression,
+      key_expression,
+      new_row,
+      old_row,
+      affected_rows
+    ) USING data_mode, coalesce(TG_ARGV[5], ''), TG_TABLE_SCHEMA, TG_TABLE_NAME
+    LOOP
+      row_length = octet_length(row_id) + coalesce(octet_length(row_datum) + 1, 0) + 1;
+      IF (packed_length > 0 AND packed_length + row_length > budget) THEN
+        PERFORM psycopg2_pgevents_send_events(
+          coalesce(TG_ARGV[0], 'psycopg2_pgevents_channel'),
+          TG_OP,
+          TG_TABLE_SCHEMA,
+          TG_TABLE_NAME,
+          row_ids,
+          coalesce(TG_ARGV[3], ''),
+          row_data
+        );
+        row_ids = NULL;
+        row_data = NULL;
+        packed_length = 0;
+      END IF;
+      row_ids = concat_ws(',', row_ids, row_id);
+      row_data = concat_ws(',', row_data, row_datum);
+      packed_length = packed_length + row_length;
+    END LOOP;
+    IF (row_ids IS NOT NULL) THEN
+      PERFORM psycopg2_pgevents_send_events(
+        coalesce(TG_ARGV[0], 'psycopg2_pgevents_channel'),
+        TG_OP,
+        TG_TABLE_SCHEMA,
+        TG_TABLE_NAME,
+        row_ids,
+        coalesce(TG_ARGV[3], ''),
+        row_data
+      );
+    END IF;
+    RETURN NULL;
+  END;
+$function$
+LANGUAGE plpgsql;
+
+-- Send any row IDs (and data) buffered by psycopg2_pgevents_buffer_event().
+-- The buffer is kept in transaction-local settings, so it is discarded along
+-- with the changes it describes if the (sub)transaction is rolled back.
+CREATE OR REPLACE FUNCTION psycopg2_pgevents_flush_events()
+RETURNS void AS $function$
+  DECLARE
+    row_ids text = coalesce(current_setting('psycopg2_pgevents.buffer', true), '');
+  BEGIN
+    IF (row_ids <> '') THEN
+      PERFORM psycopg2_pgevents_send_events(
+        current_setting('psycopg2_pgevents.buffer_channel'),
+        current_setting('psycopg2_pgevents.buffer_event_type'),
+        current_setting('psycopg2_pgevents.buffer_schema_name'),
+        current_setting('psycopg2_pgevents.buffer_table_name'),
+        row_ids,
+        current_setting('psycopg2_pgevents.buffer_key_types'),
+        nullif(current_setting('psycopg2_pgevents.buffer_data', true), '')
+      );
+      PERFORM set_config('psycopg2_pgevents.buffer', '', true);
+    END IF;
+  END;
+$function$
+LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION psycopg2_pgevents_buffer_event()
+RETURNS TRIGGER AS $function$
+  DECLARE
+    key_columns text = coalesce(TG_ARGV[2], 'id');
+    data_mode text = coalesce(TG_ARGV[4], '');
+    row_id text;
+    row_ids text = coalesce(current_setting('psycopg2_pgevents.buffer', true), '');
+    row_datum text = '';
+    row_data text = '';
+    new_row json;
+    old_row json;
+    buffer_key text = TG_OP || ' ' || TG_RELID;
+  BEGIN
+    IF (TG_OP = 'DELETE') THEN
+      IF (key_columns = 'id') THEN
+        row_id = to_json(OLD.id)::text;
+      ELSE
+        row_id = psycopg2_pgevents_encode_key(to_json(OLD), key_columns);
+      END IF;
+    ELSE
+      IF (key_columns = 'id') THEN
+        row_id = to_json(NEW.id)::text;
+      ELSE
+        row_id = psycopg2_pgevents_encode_key(to_json(NEW), key_columns);
+      END IF;
+    END IF;
+    IF (data_mode <> '') THEN
+      IF (TG_OP <> 'DELETE') THEN
+        new_row = to_json(NEW);
+      END IF;
+      IF (TG_OP <> 'INSERT') THEN
+        old_row = to_json(OLD);
+      END IF;
+      row_datum = psycopg2_pgevents_fit_data(
+        row_id,
+        psycopg2_pgevents_encode_data(new_row, old_row, data_mode, coalesce(TG_ARGV[5], '')),
+        TG_TABLE_SCHEMA,
+        TG_TABLE_NAME
+      );
+    END IF;
+    IF (row_ids <> '') THEN
+      row_data = current_setting('psycopg2_pgevents.buffer_data');
+      IF (
+        current_setting('psycopg2_pgevents.buffer_key') <> buffer_key OR
+        octet_length(row_ids) + octet_length(row_id) + octet_length(row_data) + octet_length(row_datum) + 2 >
+          psycopg2_pgevents_payload_budget(TG_TABLE_SCHEMA, TG_TABLE_NAME)
+      ) THEN
+        PERFORM psycopg2_pgevents_flush_events();
+        row_ids = '';
+      END IF;
+    END IF;
+    IF (row_ids = '') THEN
+      PERFORM set_config('psycopg2_pgevents.buffer_key', buffer_key, true);
+      PERFORM set_config('psycopg2_pgevents.buffer_channel', coalesce(TG_ARGV[0], 'psycopg2_pgevents_channel'), true);
+      PERFORM set_config('psycopg2_pgevents.buffer_event_type', TG_OP, true);
+      PERFORM set_config('psycopg2_pgevents.buffer_schema_name', TG_TABLE_SCHEMA, true);
+      PERFORM set_config('psycopg2_pgevents.buffer_table_name', TG_TABLE_NAME, true);
+      PERFORM set_config('psycopg2_pgevents.buffer_key_types', coalesce(TG_ARGV[3], ''), true);
+      PERFORM set_config('psycopg2_pgevents.buffer', row_id, true);
+      PERFORM set_config('psycopg2_pgevents.buffer_data', row_datum, true);
+    ELSE
+      PERFORM set_config('psycopg2_pgevents.buffer', row_ids || ',' || row_id, true);
+      IF (data_mode <> '') THEN
+        PERFORM set_config('psycopg2_pgevents.buffer_data', row_data || ',' || row_datum, true);
+      END IF;
+    END IF;
+    RETURN NULL;
+  END;
+$function$
+LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION psycopg2_pgevents_flush_event_buffer()
+RETURNS TRIGGER AS $function$
+  BEGIN
+    PERFORM psycopg2_pgevents_flush_events();
     RETURN NULL;
   END;
 $function$
@@ -51,39 +509,622 @@ LANGUAGE plpgsql;
 SET search_path = "$user", public;
 """
 
-UNINSTALL_TRIGGER_FUNCTION_STATEMENT = """
+UNINSTALL_TRIGGER_FUNCTION_STATEMENT = (
+    """
+DROP FUNCTION IF EXISTS public.psycopg2_pgevents_flush_event_buffer() {modifier};
+DROP FUNCTION IF EXISTS public.psycopg2_pgevents_buffer_event() {modifier};
+DROP FUNCTION IF EXISTS public.psycopg2_pgevents_create_statement_event() {modifier};
 DROP FUNCTION IF EXISTS public.psycopg2_pgevents_create_event() {modifier};
+DROP FUNCTION IF EXISTS public.psycopg2_pgevents_flush_events();
+DROP FUNCTION IF EXISTS public.psycopg2_pgevents_fit_data(text, text, text, text);
+DROP FUNCTION IF EXISTS public.psycopg2_pgevents_payload_budget(text, text);
+DROP FUNCTION IF EXISTS public.psycopg2_pgevents_send_events(text, text, text, text);
+DROP FUNCTION IF EXISTS public.psycopg2_pgevents_send_events(text, text, text, text, text);
+DROP FUNCTION IF EXISTS public.psycopg2_pgevents_send_events(text, text, text, text, text, text);
+DROP FUNCTION IF EXISTS public.psycopg2_pgevents_send_events(text, text, text, text, text, text, text);
+DROP FUNCTION IF EXISTS public.psycopg2_pgevents_encode_data(json, json, text, text);
+DROP FUNCTION IF EXISTS public.psycopg2_pgevents_encode_key(json, text);
+DROP FUNCTION IF EXISTS public.psycopg2_pgevents_next_event_id(integer);
+DROP FUNCTION IF EXISTS public.psycopg2_pgevents_publish(text, text);
+DROP SEQUENCE IF EXISTS public.psycopg2_pgevents_event_id_seq;
+"""
+    + UNINSTALL_OUTBOX_STATEMENT
+)
+
+UNINSTALL_TRIGGER_STATEMENT = """
+DROP TRIGGER IF EXISTS psycopg2_pgevents_trigger ON {schema}.{table};
+DROP TRIGGER IF EXISTS psycopg2_pgevents_trigger_insert ON {schema}.{table};
+DROP TRIGGER IF EXISTS psycopg2_pgevents_trigger_update ON {schema}.{table};
+DROP TRIGGER IF EXISTS psycopg2_pgevents_trigger_delete ON {schema}.{table};
+DROP TRIGGER IF EXISTS psycopg2_pgevents_trigger_flush ON {schema}.{table};
 """
 
 INSTALL_TRIGGER_STATEMENT = """
 SET search_path = {schema}, pg_catalog;
 
 DROP TRIGGER IF EXISTS psycopg2_pgevents_trigger ON {schema}.{table};
+DROP TRIGGER IF EXISTS psycopg2_pgevents_trigger_insert ON {schema}.{table};
+DROP TRIGGER IF EXISTS psycopg2_pgevents_trigger_update ON {schema}.{table};
+DROP TRIGGER IF EXISTS psycopg2_pgevents_trigger_delete ON {schema}.{table};
+DROP TRIGGER IF EXISTS psycopg2_pgevents_trigger_flush ON {schema}.{table};
+{triggers}
+SET search_path = "$user", public;
+"""
 
-CREATE TRIGGER psycopg2_pgevents_trigger
-AFTER INSERT OR UPDATE OR DELETE ON {schema}.{table}
-FOR EACH ROW
-EXECUTE PROCEDURE public.psycopg2_pgevents_create_event();
+CREATE_ROW_TRIGGER_STATEMENT = """
+CREATE TRIGGER {name}
+AFTER {events} ON {schema}.{table}
+FOR EACH ROW{condition}
+EXECUTE PROCEDURE public.{function}({arguments});
+"""
 
-SET search_path = "$user", public;
+CREATE_STATEMENT_TRIGGER_STATEMENT = """
+CREATE TRIGGER {name}
+AFTER {events} ON {schema}.{table}{referencing}
+FOR EACH STATEMENT
+EXECUTE PROCEDURE public.{function}({arguments});
 """
 
-UNINSTALL_TRIGGER_STATEMENT = """
-DROP TRIGGER IF EXISTS psycopg2_pgevents_trigger ON {schema}.{table};
+# Key types of key column types, for row IDs that cannot be decoded from JSON
+# alone; the key type of all other column types is "s".
+_KEY_TYPES = {"uuid": "u", "smallint": "i", "integer": "i", "bigint": "i"}
+
+# Kinds of row data that triggers may send along with row IDs.
+DATA_MODES = ("row", "diff")
+
+# Trigger operations, in the order in which they are listed in triggers.
+OPERATIONS = ("INSERT", "UPDATE", "DELETE")
+
+# Transition tables, per operation, read by statement-level triggers.
+_TRANSITION_TABLES = {
+    "INSERT": " REFERENCING NEW TABLE AS psycopg2_pgevents_new_rows",
+    "UPDATE": " REFERENCING NEW TABLE AS psycopg2_pgevents_new_rows",
+    "DELETE": " REFERENCING OLD TABLE AS psycopg2_pgevents_old_rows",
+}
+
+# Transition tables of statement-level UPDATE triggers that filter rows.
+_FILTERED_UPDATE_TRANSITION_TABLES = (
+    " REFERENCING OLD TABLE AS psycopg2_pgevents_old_rows NEW TABLE AS psycopg2_pgevents_new_rows"
+)
+
+
+class _TriggerOptions(NamedTuple):
+    mode: str
+    channel: str
+    operations: Tuple[str, ...]
+    columns: Tuple[str, ...]
+    changes_only: bool
+    key: Tuple[str, ...]
+    data: str
+    data_columns: Tuple[str, ...]
+
+
+def _quote_literal(connection: connection, literal: str) -> str:
+    quoted = QuotedString(literal)
+    quoted.prepare(connection)
+    return quoted.getquoted().decode(encodings[connection.encoding])
+
+
+def _update_condition(connection: connection, options: _TriggerOptions, old: str, new: str) -> str:
+    """Build the condition that an updated row must meet to generate an event.
+
+    Parameters
+    ----------
+    connection: psycopg2.extensions.connection
+        Active connection to a PostGreSQL database, used to quote column
+        names.
+    options: _TriggerOptions
+        Trigger options.
+    old: str
+        Name by which to refer to the old version of the row.
+    new: str
+        Name by which to refer to the new version of the row.
+
+    Returns
+    -------
+    str
+        PGSQL condition; empty if all updated rows generate events.
+
+    """
+    if options.columns:
+        old_columns = ", ".join("{}.{}".format(old, quote_ident(column, connection)) for column in options.columns)
+        new_columns = ", ".join("{}.{}".format(new, quote_ident(column, connection)) for column in options.columns)
+        return "ROW({}) IS DISTINCT FROM ROW({})".format(old_columns, new_columns)
+
+    if options.changes_only:
+        return "{}.* IS DISTINCT FROM {}.*".format(old, new)
+
+    return ""
+
+
+def _trigger_events(connection: connection, operations: Iterable[str], options: _TriggerOptions) -> str:
+    events = []
+    for operation in operations:
+        if operation == "UPDATE" and options.columns:
+            operation += " OF " + ", ".join(quote_ident(column, connection) for column in options.columns)
+        events.append(operation)
+
+    return " OR ".join(events)
+
+
+def _row_triggers(
+    connection: connection, function: str, schema: str, table: str, arguments: str, options: _TriggerOptions
+) -> str:
+    """Build the statements that create row-level triggers for the given options.
+
+    Updates are handled by a trigger of their own if only changed rows
+    generate events, since the trigger's condition cannot refer to the old
+    version of inserted rows, nor to the new version of deleted rows.
+
+    Parameters
+    ----------
+    connection: psycopg2.extensions.connection
+        Active connection to a PostGreSQL database, used to quote column
+        names.
+    function: str
+        Name of the trigger function.
+    schema: str
+        Schema to which the table belongs.
+    table: str
+        Table for which the triggers should be created.
+    arguments: str
+        Trigger function arguments.
+    options: _TriggerOptions
+        Trigger options.
+
+    Returns
+    -------
+    str
+        PGSQL statements.
+
+    """
+    operations = list(options.operations)
+    triggers = []
+
+    if options.changes_only and "UPDATE" in operations:
+        operations.remove("UPDATE")
+        triggers.append(
+            CREATE_ROW_TRIGGER_STATEMENT.format(
+                name="psycopg2_pgevents_trigger_update",
+                events=_trigger_events(connection, ["UPDATE"], options),
+                schema=schema,
+                table=table,
+                condition="\nWHEN ({})".format(_update_condition(connection, options, "OLD", "NEW")),
+                function=function,
+                arguments=arguments,
+            )
+        )
+
+    if operations:
+        triggers.insert(
+            0,
+            CREATE_ROW_TRIGGER_STATEMENT.format(
+                name="psycopg2_pgevents_trigger",
+                events=_trigger_events(connection, operations, options),
+                schema=schema,
+                table=table,
+                condition="",
+                function=function,
+                arguments=arguments,
+            ),
+        )
+
+    return "".join(triggers)
+
+
+def _install_row_triggers(
+    connection: connection, schema: str, table: str, arguments: str, options: _TriggerOptions
+) -> str:
+    return _row_triggers(connection, "psycopg2_pgevents_create_event", schema, table, arguments, options)
+
+
+# Buffered mode flushes the buffer with a statement-level trigger, at the end
+# of every statement. Deferred constraint triggers fire at commit, but they
+# are row-level, and would queue one event per affected row until then.
+def _install_buffered_triggers(
+    connection: connection, schema: str, table: str, arguments: str, options: _TriggerOptions
+) -> str:
+    return _row_triggers(connection, "psycopg2_pgevents_buffer_event", schema, table, arguments, options) + (
+        CREATE_STATEMENT_TRIGGER_STATEMENT.format(
+            name="psycopg2_pgevents_trigger_flush",
+            events=_trigger_events(connection, options.operations, options),
+            schema=schema,
+            table=table,
+            referencing="",
+            function="psycopg2_pgevents_flush_event_buffer",
+            arguments="",
+        )
+    )
+
+
+# Transition tables may only be used with single-event triggers, so
+# statement-level mode installs one trigger per event type. Neither may they
+# be used with column lists, nor may statement-level triggers have conditions,
+# so updates are instead filtered by psycopg2_pgevents_create_statement_event(),
+# which compares the old and new versions of each row.
+def _install_statement_triggers(
+    connection: connection, schema: str, table: str, arguments: str, options: _TriggerOptions
+) -> str:
+    triggers = []
+    for operation in options.operations:
+        referencing = _TRANSITION_TABLES[operation]
+        if operation == "UPDATE" and (options.columns or options.changes_only or options.data == "diff"):
+            referencing = _FILTERED_UPDATE_TRANSITION_TABLES
+
+        triggers.append(
+            CREATE_STATEMENT_TRIGGER_STATEMENT.format(
+                name="psycopg2_pgevents_trigger_{}".format(operation.lower()),
+                events=operation,
+                schema=schema,
+                table=table,
+                referencing="\n" + referencing.lstrip(),
+                function="psycopg2_pgevents_create_statement_event",
+                arguments=arguments,
+            )
+        )
+
+    return "".join(triggers)
+
+
+# Channel name per channel strategy, given the schema and table of a trigger.
+CHANNEL_STRATEGIES: Dict[str, Callable[[str, str], str]] = {
+    "global": lambda schema, table: event_channel(),
+    "schema": lambda schema, table: event_channel(schema),
+    "table": event_channel,
+}
+
+# Builders of the statements that create triggers, per trigger mode.
+TRIGGER_MODES: Dict[str, Callable[[connection, str, str, str, _TriggerOptions], str]] = {
+    "row": _install_row_triggers,
+    "buffered": _install_buffered_triggers,
+    "statement": _install_statement_triggers,
+}
+
+SELECT_TRIGGER_FUNCTION_STATEMENT = """
+SELECT
+    p.oid
+FROM
+    pg_catalog.pg_proc p
+    JOIN pg_catalog.pg_namespace n ON n.oid = p.pronamespace
+WHERE
+    n.nspname = $1 AND
+    p.proname = $2;
 """
 
-SELECT_TRIGGER_STATEMENT = """
+SELECT_TABLE_COLUMNS_STATEMENT = """
 SELECT
-    *
+    t.ordinal, a.attname, format_type(a.atttypid, NULL), array_position(i.indkey::int2[], a.attnum)
 FROM
-    information_schema.triggers
+    unnest($1::text[]) WITH ORDINALITY AS t(name, ordinal)
+    JOIN pg_catalog.pg_attribute a ON a.attrelid = t.name::regclass AND a.attnum > 0 AND NOT a.attisdropped
+    LEFT JOIN pg_catalog.pg_index i ON i.indrelid = a.attrelid AND i.indisprimary
+ORDER BY
+    t.ordinal, a.attnum;
+"""
+
+SELECT_INSTALLED_TRIGGERS_STATEMENT = """
+SELECT
+    DISTINCT n.nspname, c.relname
+FROM
+    pg_catalog.pg_trigger t
+    JOIN pg_catalog.pg_class c ON c.oid = t.tgrelid
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
 WHERE
-    event_object_schema = '{schema}' AND
-    event_object_table = '{table}' AND
-    trigger_name = 'psycopg2_pgevents_trigger';
+    t.tgname IN (
+        'psycopg2_pgevents_trigger',
+        'psycopg2_pgevents_trigger_insert',
+        'psycopg2_pgevents_trigger_update',
+        'psycopg2_pgevents_trigger_delete',
+        'psycopg2_pgevents_trigger_flush'
+    );
 """
 
 
+def _trigger_options(
+    mode: str,
+    channel: str,
+    operations: Iterable[str],
+    columns: Optional[Iterable[str]],
+    changes_only: bool,
+    key: Optional[Iterable[str]],
+    data: Optional[str],
+    data_columns: Optional[Iterable[str]],
+) -> _TriggerOptions:
+    """Validate and normalize the options of a trigger installation.
+
+    Parameters
+    ----------
+    mode: str
+        Trigger granularity.
+    channel: str
+        Channel strategy.
+    operations: iterable of str
+        Operations that generate events.
+    columns: iterable of str
+        Columns whose update generates events.
+    changes_only: bool
+        Whether or not only updates that change rows generate events.
+    key: iterable of str
+        Key columns; if None, the primary key is used.
+    data: str
+        Row data to send along with row IDs, if any.
+    data_columns: iterable of str
+        Columns of which to send data; if None, all columns.
+
+    Returns
+    -------
+    _TriggerOptions
+        Trigger options.
+
+    """
+    if mode not in TRIGGER_MODES:
+        raise ValueError('Invalid trigger mode "{}"'.format(mode))
+
+    if channel not in CHANNEL_STRATEGIES:
+        raise ValueError('Invalid channel strategy "{}"'.format(channel))
+
+    operations = {operation.upper() for operation in operations}
+    if not operations or not operations.issubset(OPERATIONS):
+        raise ValueError("operations must be a non-empty subset of {}".format(", ".join(OPERATIONS)))
+
+    columns = tuple(columns or ())
+    if columns and "UPDATE" not in operations:
+        raise ValueError("columns require the UPDATE operation")
+
+    key = tuple(key or ())
+    if any("," in column for column in key):
+        raise ValueError("Key column names may not contain commas")
+
+    if data is not None and data not in DATA_MODES:
+        raise ValueError('Invalid data mode "{}"'.format(data))
+
+    data_columns = tuple(data_columns or ())
+    if data_columns and data is None:
+        raise ValueError("data_columns require a data mode")
+
+    if any("," in column for column in data_columns):
+        raise ValueError("Data column names may not contain commas")
+
+    return _TriggerOptions(
+        mode=mode,
+        channel=channel,
+        operations=tuple(operation for operation in OPERATIONS if operation in operations),
+        columns=columns,
+        changes_only=changes_only,
+        key=key,
+        data=data or "",
+        data_columns=data_columns,
+    )
+
+
+def _table_keys(
+    connection: connection, tables: List[Tuple[str, str]], key: Tuple[str, ...]
+) -> Dict[Tuple[str, str], List[Tuple[str, str]]]:
+    """Get the key columns of tables, along with their key types.
+
+    The columns of all tables are read with a single catalog query.
+
+    Parameters
+    ----------
+    connection: psycopg2.extensions.connection
+        Active connection to a PostGreSQL database.
+    tables: list of tuple of str
+        (schema, table) tuples.
+    key: tuple of str
+        Key columns; if empty, the primary key of each table is used, or the
+        "id" column of tables without a primary key.
+
+    Returns
+    -------
+    dict
+        Mapping of (schema, table) to a list of (column, key type) tuples.
+
+    """
+    if not tables:
+        return {}
+
+    columns: Dict[int, Dict[str, str]] = {index: {} for index in range(len(tables))}
+    primary_keys: Dict[int, Dict[int, str]] = {index: {} for index in range(len(tables))}
+
+    result = execute_prepared(
+        connection,
+        "psycopg2_pgevents_select_columns",
+        SELECT_TABLE_COLUMNS_STATEMENT,
+        (["{}.{}".format(schema, table) for schema, table in tables],),
+        autocommit=True,
+    )
+    for ordinal, column, type_, primary_key_position in result or []:
+        columns[ordinal - 1][column] = _KEY_TYPES.get(type_, "s")
+        if primary_key_position is not None:
+            primary_keys[ordinal - 1][primary_key_position] = column
+
+    keys = {}
+    for index, table in enumerate(tables):
+        table_key = key or [column for _, column in sorted(primary_keys[index].items())] or ["id"]
+
+        missing = [column for column in table_key if column not in columns[index]]
+        if missing:
+            raise ValueError("{}.{} has no key column(s) {}".format(*table, ", ".join(missing)))
+
+        keys[table] = [(column, columns[index][column]) for column in table_key]
+
+    return keys
+
+
+def _install_trigger_statement(
+    connection: connection, schema: str, table: str, options: _TriggerOptions, key: List[Tuple[str, str]]
+) -> str:
+    """Build the statement that installs a trigger against a table.
+
+    The trigger functions take the following arguments:
+
+    0. Channel on which to send notifications.
+    1. Condition that updated rows must meet to generate events, in terms of
+       the old (o) and new (n) versions of each row; only used by
+       statement-level triggers.
+    2. Comma-separated key columns.
+    3. Key types, one letter per key column, if row IDs cannot be decoded
+       from JSON alone (see psycopg2_pgevents.event.Event.frompayload).
+    4. Row data to send along with row IDs: empty, "row" or "diff".
+    5. Comma-separated columns of which to send data; empty for all columns.
+
+    Parameters
+    ----------
+    connection: psycopg2.extensions.connection
+        Active connection to a PostGreSQL database, used to quote the
+        trigger function arguments.
+    schema: str
+        Schema to which the table belongs.
+    table: str
+        Table for which the trigger should be installed.
+    options: _TriggerOptions
+        Trigger options.
+    key: list of tuple of str
+        Key columns, along with their key types.
+
+    Returns
+    -------
+    str
+        PGSQL statement.
+
+    """
+    key_types = "".join(key_type for _, key_type in key)
+    if len(key) == 1 and key_types != "u":
+        key_types = ""
+
+    arguments = [
+        CHANNEL_STRATEGIES[options.channel](schema, table),
+        _update_condition(connection, options, "o", "n"),
+        ",".join(column for column, _ in key),
+        key_types,
+        options.data,
+        ",".join(options.data_columns),
+    ]
+    arguments = ", ".join(_quote_literal(connection, argument) for argument in arguments)
+
+    return INSTALL_TRIGGER_STATEMENT.format(
+        schema=schema, table=table, triggers=TRIGGER_MODES[options.mode](connection, schema, table, arguments, options)
+    )
+
+
+def _normalize_tables(tables: Iterable[TableSpec], schema: str) -> List[Tuple[str, str]]:
+    """Resolve tables to unique (schema, table) tuples, preserving order.
+
+    Parameters
+    ----------
+    tables: iterable of str or tuple of str
+        Table names, or (schema, table) tuples.
+    schema: str
+        Schema to which tables given by name belong.
+
+    Returns
+    -------
+    list of tuple of str
+        (schema, table) tuples.
+
+    """
+    normalized: Dict[Tuple[str, str], None] = {}
+    for table in tables:
+        if isinstance(table, str):
+            table = (schema, table)
+        normalized[tuple(table)] = None
+
+    return list(normalized)
+
+
+def _installed_triggers(connection: connection, cached: bool = True) -> FrozenSet[Tuple[str, str]]:
+    """Get every table that has a psycopg2-pgevents trigger installed.
+
+    The result is cached per connection; see `set_trigger_cache_ttl`.
+
+    Parameters
+    ----------
+    connection: psycopg2.extensions.connection
+        Active connection to a PostGreSQL database.
+    cached: bool
+        Whether or not cached state may be used; if False, the state is
+        loaded from the catalog, and the cache refreshed.
+
+    Returns
+    -------
+    frozenset of tuple of str
+        (schema, table) tuples.
+
+    """
+    now = time.monotonic()
+
+    cache = _TRIGGER_CACHE.get(connection) if cached else None
+    if cache is not None:
+        loaded_at, installed = cache
+        if _TRIGGER_CACHE_TTL is None or now - loaded_at < _TRIGGER_CACHE_TTL:
+            return installed
+
+    log("Loading trigger state...", logger_name=_LOGGER_NAME)
+
+    installed = frozenset(
+        (schema, table)
+        for schema, table in execute_prepared(
+            connection, "psycopg2_pgevents_select_triggers", SELECT_INSTALLED_TRIGGERS_STATEMENT, autocommit=True
+        )
+        or []
+    )
+    if _TRIGGER_CACHE_TTL != 0:
+        _TRIGGER_CACHE[connection] = (now, installed)
+
+    return installed
+
+
+def set_trigger_cache_ttl(ttl: Optional[float]) -> None:
+    """Set how long trigger state is cached for.
+
+    `trigger_installed` and `triggers_installed` load the state of all
+    psycopg2-pgevents triggers at once and cache it per connection. The cache
+    of a connection is invalidated whenever triggers are installed or
+    uninstalled through it, but changes made through other connections are
+    only picked up once the cached state expires. Installing triggers never
+    relies on cached state.
+
+    Parameters
+    ----------
+    ttl: float or None
+        Number of seconds for which cached trigger state is used (60 by
+        default). If None, cached state does not expire until it is
+        invalidated; if 0, trigger state is not cached at all.
+
+    Returns
+    -------
+    None
+
+    """
+    global _TRIGGER_CACHE_TTL
+
+    if ttl is not None and ttl < 0:
+        raise ValueError("ttl must not be negative")
+
+    _TRIGGER_CACHE_TTL = ttl
+    _TRIGGER_CACHE.clear()
+
+
+def invalidate_trigger_cache(connection: Optional[connection] = None) -> None:
+    """Discard cached trigger state.
+
+    Parameters
+    ----------
+    connection: psycopg2.extensions.connection
+        Connection whose cached trigger state should be discarded. If None,
+        the cached trigger state of all connections is discarded.
+
+    Returns
+    -------
+    None
+
+    """
+    if connection is None:
+        _TRIGGER_CACHE.clear()
+    else:
+        _TRIGGER_CACHE.pop(connection, None)
+
+
 def trigger_function_installed(connection: connection):
     """Test whether or not the psycopg2-pgevents trigger function is installed.
 
@@ -98,35 +1139,27 @@ def trigger_function_installed(connection: connection):
         True if the trigger function is installed, otherwise False.
 
     """
-    installed = False
-
     log("Checking if trigger function installed...", logger_name=_LOGGER_NAME)
 
-    try:
-        execute(connection, "SELECT pg_get_functiondef('public.psycopg2_pgevents_create_event'::regproc);")
-        installed = True
-    except ProgrammingError as e:
-        if e.args:
-            error_stdout = e.args[0].splitlines()
-            error = error_stdout.pop(0)
-            if error.endswith("does not exist"):
-                # Trigger function not installed
-                pass
-            else:
-                # Some other exception; re-raise
-                raise e
-        else:
-            # Some other exception; re-raise
-            raise e
-
-    log("...{}installed".format("" if installed else "NOT "), logger_name=_LOGGER_NAME)
+    result = execute_prepared(
+        connection,
+        "psycopg2_pgevents_select_function",
+        SELECT_TRIGGER_FUNCTION_STATEMENT,
+        ("public", "psycopg2_pgevents_create_event"),
+        autocommit=True,
+    )
+    installed = bool(result)
+
+    log("...%sinstalled", "" if installed else "NOT ", logger_name=_LOGGER_NAME)
 
     return installed
 
 
-def trigger_installed(connection: connection, table: str, schema: str = "public"):
+def trigger_installed(connection: connection, table: str, schema: str = "public", cached: bool = True):
     """Test whether or not a psycopg2-pgevents trigger is installed for a table.
 
+    Trigger state is cached; see `set_trigger_cache_ttl`.
+
     Parameters
     ----------
     connection: psycopg2.extensions.connection
@@ -135,6 +1168,9 @@ def trigger_installed(connection: connection, table: str, schema: str = "public"
         Table whose trigger-existence will be checked.
     schema: str
         Schema to which the table belongs.
+    cached: bool
+        Whether or not cached trigger state may be used; if False, the state
+        is read from the database.
 
     Returns
     -------
@@ -142,24 +1178,42 @@ def trigger_installed(connection: connection, table: str, schema: str = "public"
         True if the trigger is installed, otherwise False.
 
     """
-    installed = False
-
-    log("Checking if {}.{} trigger installed...".format(schema, table), logger_name=_LOGGER_NAME)
-
-    statement = SELECT_TRIGGER_STATEMENT.format(table=table, schema=schema)
+    log("Checking if %s.%s trigger installed...", schema, table, logger_name=_LOGGER_NAME)
 
-    result = execute(connection, statement)
-    if result:
-        installed = True
+    installed = (schema, table) in _installed_triggers(connection, cached)
 
-    log("...{}installed".format("" if installed else "NOT "), logger_name=_LOGGER_NAME)
+    log("...%sinstalled", "" if installed else "NOT ", logger_name=_LOGGER_NAME)
 
     return installed
 
 
-def install_trigger_function(connection: connection, overwrite: bool = False) -> None:
+def install_trigger_function(
+    connection: connection, overwrite: bool = False, id_strategy: str = "uuid", outbox: bool = False
+) -> None:
     """Install the psycopg2-pgevents trigger function against the database.
 
+    The event ID strategy determines how the trigger function identifies
+    events:
+
+    - "uuid" (the default) generates a random UUID per notification. This
+      requires the "uuid-ossp" extension, which is created if necessary.
+    - "sequence" draws one value per notification from a dedicated sequence.
+    - "txid" combines the ID of the writing transaction with an ordinal that
+      counts the events of the transaction, so that the events of a
+      transaction are numbered in the order they occurred.
+
+    With the "sequence" and "txid" strategies, every event gets a distinct
+    Event.id, which is a (major, minor) tuple of integers; this makes IDs
+    sortable and suitable for de-duplication. Neither strategy requires an
+    extension.
+
+    In outbox mode, the trigger functions write events to the partitioned
+    "pgevents_outbox" table instead of sending them as notifications, and
+    only send a wakeup hint on the outbox channel. Events are then read with
+    `OutboxConsumer` (or `read_outbox`), so that listeners that disconnect
+    catch up from where they left off instead of losing events. Outbox mode
+    requires PostGreSQL 11 or newer; see `maintain_outbox` for retention.
+
     Parameters
     ----------
     connection: psycopg2.extensions.connection
@@ -167,21 +1221,37 @@ def install_trigger_function(connection: connection, overwrite: bool = False) ->
     overwrite: bool
         Whether or not to overwrite existing installation of psycopg2-pgevents
         trigger function, if existing installation is found.
+    id_strategy: str
+        Event ID strategy, one of "uuid", "sequence" or "txid".
+    outbox: bool
+        Whether or not to write events to the outbox.
 
     Returns
     -------
     None
 
     """
+    if id_strategy not in INSTALL_EVENT_ID_FUNCTION_STATEMENTS:
+        raise ValueError('Invalid event ID strategy "{}"'.format(id_strategy))
+
     prior_install = False
 
     if not overwrite:
         prior_install = trigger_function_installed(connection)
 
     if not prior_install:
-        log("Installing trigger function...", logger_name=_LOGGER_NAME)
-
-        execute(connection, INSTALL_TRIGGER_FUNCTION_STATEMENT)
+        log(
+            "Installing trigger function (id_strategy=%s, outbox=%s)...", id_strategy, outbox, logger_name=_LOGGER_NAME,
+        )
+
+        # The statement is atomic even outside of an explicit transaction, as
+        # PostGreSQL runs a multi-command statement in a single transaction.
+        statement = (
+            INSTALL_EVENT_ID_FUNCTION_STATEMENTS[id_strategy]
+            + INSTALL_PUBLISH_FUNCTION_STATEMENTS[outbox]
+            + INSTALL_TRIGGER_FUNCTION_STATEMENT
+        )
+        execute(connection, statement, autocommit=True)
     else:
         log("Trigger function already installed; skipping...", logger_name=_LOGGER_NAME)
 
@@ -207,15 +1277,72 @@ def uninstall_trigger_function(connection: connection, force: bool = False) -> N
     if force:
         modifier = "CASCADE"
 
-    log("Uninstalling trigger function (cascade={})...".format(force), logger_name=_LOGGER_NAME)
+    log("Uninstalling trigger function (cascade=%s)...", force, logger_name=_LOGGER_NAME)
 
     statement = UNINSTALL_TRIGGER_FUNCTION_STATEMENT.format(modifier=modifier)
-    execute(connection, statement)
-
-
-def install_trigger(connection: connection, table: str, schema: str = "public", overwrite: bool = False) -> None:
+    try:
+        execute(connection, statement)
+    finally:
+        invalidate_trigger_cache(connection)
+
+
+def install_trigger(
+    connection: connection,
+    table: str,
+    schema: str = "public",
+    overwrite: bool = False,
+    mode: str = "row",
+    channel: str = "global",
+    operations: Iterable[str] = OPERATIONS,
+    columns: Optional[Iterable[str]] = None,
+    changes_only: bool = False,
+    key: Optional[Iterable[str]] = None,
+    data: Optional[str] = None,
+    data_columns: Optional[Iterable[str]] = None,
+) -> None:
     """Install a psycopg2-pgevents trigger against a table.
 
+    In "row" mode (the default), the trigger fires once per affected row and
+    sends one notification per row.
+
+    In "buffered" mode, the trigger still fires once per affected row, but
+    only appends the row's ID to a transaction-local buffer. The buffer is
+    sent as packed notifications, each holding as many row IDs as fit under
+    the NOTIFY payload limit, whenever it fills up and at the end of every
+    statement. Buffers are not held until commit: the only triggers fired at
+    commit are deferred constraint triggers, which are row-level, so
+    flushing at commit would queue one more trigger event per affected row
+    for the rest of the transaction.
+
+    In "statement" mode, the trigger fires once per statement and reads the
+    affected rows from the statement's transition tables, sending packed
+    notifications in the same way. This avoids per-row trigger overhead
+    altogether for bulk writes. Statement mode requires PostGreSQL 10 or newer.
+
+    Packed notifications are expanded back into one Event per row by `poll`;
+    see `install_trigger_function` for how their event IDs are assigned.
+
+    The channel strategy determines the channel on which notifications are
+    sent: the single "global" channel (the default), a channel per "schema",
+    or a channel per "table" (see `event_channel`). Listeners registered to
+    per-schema or per-table channels are only sent the notifications they
+    are interested in.
+
+    Events may be further filtered by the database, so that they are never
+    sent at all: only the given operations generate events, updates may be
+    restricted to those of specific columns, and updates that do not change
+    anything (e.g. "touch" updates) may be skipped. In "statement" mode,
+    PostGreSQL does not support column lists, so updated rows are instead
+    compared column by column, and only generate events if the given
+    columns changed.
+
+    Rows are identified by their key, which may be made up of any number of
+    columns of any type (see Event.row_id).
+
+    Events may carry the data of the rows they describe (see Event.data),
+    sparing listeners a query per event. Rows whose data does not fit in a
+    notification are sent without it.
+
     Parameters
     ----------
     connection: psycopg2.extensions.connection
@@ -227,24 +1354,51 @@ def install_trigger(connection: connection, table: str, schema: str = "public",
     overwrite: bool
         Whether or not to overwrite existing installation of trigger for the
         given table, if existing installation is found.
+    mode: str
+        Trigger granularity, one of "row", "buffered" or "statement".
+    channel: str
+        Channel strategy, one of "global", "schema" or "table".
+    operations: iterable of str
+        Operations that generate events, any of "INSERT", "UPDATE" and
+        "DELETE".
+    columns: iterable of str
+        If given, only updates of these columns generate events.
+    changes_only: bool
+        Whether or not only updates that actually change rows (or, if
+        columns are given, those columns) generate events.
+    key: iterable of str
+        Columns that identify rows. Defaults to the table's primary key or,
+        for tables without a primary key, the "id" column.
+    data: str
+        Row data to send along with row IDs: "row" for the values of the
+        row's columns, or "diff" for those of the columns that an update
+        changed. If None, only row IDs are sent.
+    data_columns: iterable of str
+        Columns of which to send data; defaults to all columns.
 
     Returns
     -------
     None
 
     """
+    options = _trigger_options(mode, channel, operations, columns, changes_only, key, data, data_columns)
+
     prior_install = False
 
     if not overwrite:
-        prior_install = trigger_installed(connection, table, schema)
+        prior_install = trigger_installed(connection, table, schema, cached=False)
 
     if not prior_install:
-        log("Installing {}.{} trigger...".format(schema, table), logger_name=_LOGGER_NAME)
-
-        statement = INSTALL_TRIGGER_STATEMENT.format(schema=schema, table=table)
-        execute(connection, statement)
+        log("Installing %s.%s trigger (mode=%s, channel=%s)...", schema, table, mode, channel, logger_name=_LOGGER_NAME)
+
+        table_key = _table_keys(connection, [(schema, table)], options.key)[(schema, table)]
+        statement = _install_trigger_statement(connection, schema, table, options, table_key)
+        try:
+            execute(connection, statement)
+        finally:
+            invalidate_trigger_cache(connection)
     else:
-        log("{}.{} trigger already installed; skipping...".format(schema, table), logger_name=_LOGGER_NAME)
+        log("%s.%s trigger already installed; skipping...", schema, table, logger_name=_LOGGER_NAME)
 
 
 def uninstall_trigger(connection: connection, table: str, schema: str = "public") -> None:
@@ -264,7 +1418,186 @@ def uninstall_trigger(connection: connection, table: str, schema: str = "public"
     None
 
     """
-    log("Uninstalling {}.{} trigger...".format(schema, table), logger_name=_LOGGER_NAME)
+    log("Uninstalling %s.%s trigger...", schema, table, logger_name=_LOGGER_NAME)
 
     statement = UNINSTALL_TRIGGER_STATEMENT.format(schema=schema, table=table)
-    execute(connection, statement)
+    try:
+        execute(connection, statement)
+    finally:
+        invalidate_trigger_cache(connection)
+
+
+def triggers_installed(
+    connection: connection, tables: Iterable[TableSpec], schema: str = "public", cached: bool = True
+) -> Dict[Tuple[str, str], bool]:
+    """Test whether or not psycopg2-pgevents triggers are installed for many tables.
+
+    The state of all tables is read with a single catalog query, and cached;
+    see `set_trigger_cache_ttl`.
+
+    Parameters
+    ----------
+    connection: psycopg2.extensions.connection
+        Active connection to a PostGreSQL database.
+    tables: iterable of str or tuple of str
+        Tables whose trigger-existence will be checked, either by name or as
+        (schema, table) tuples.
+    schema: str
+        Schema to which tables given by name belong.
+    cached: bool
+        Whether or not cached trigger state may be used; if False, the state
+        is read from the database.
+
+    Returns
+    -------
+    dict
+        Mapping of (schema, table) to True if the trigger is installed,
+        otherwise False.
+
+    """
+    tables = _normalize_tables(tables, schema)
+
+    log("Checking if triggers installed for %s tables...", len(tables), logger_name=_LOGGER_NAME)
+
+    installed = _installed_triggers(connection, cached)
+
+    return {table: table in installed for table in tables}
+
+
+def install_triggers(
+    connection: connection,
+    tables: Iterable[TableSpec],
+    schema: str = "public",
+    overwrite: bool = False,
+    mode: str = "row",
+    channel: str = "global",
+    operations: Iterable[str] = OPERATIONS,
+    columns: Optional[Iterable[str]] = None,
+    changes_only: bool = False,
+    key: Optional[Iterable[str]] = None,
+    data: Optional[str] = None,
+    data_columns: Optional[Iterable[str]] = None,
+) -> Dict[Tuple[str, str], bool]:
+    """Install psycopg2-pgevents triggers against many tables.
+
+    Existing installations are detected with a single catalog query, and all
+    triggers are then installed in a single transaction, so either all of
+    them are installed or none are. See `install_trigger` for the available
+    modes and channel strategies.
+
+    Parameters
+    ----------
+    connection: psycopg2.extensions.connection
+        Active connection to a PostGreSQL database.
+    tables: iterable of str or tuple of str
+        Tables for which triggers should be installed, either by name or as
+        (schema, table) tuples.
+    schema: str
+        Schema to which tables given by name belong.
+    overwrite: bool
+        Whether or not to overwrite existing installations of triggers, if
+        existing installations are found.
+    mode: str
+        Trigger granularity, one of "row", "buffered" or "statement".
+    channel: str
+        Channel strategy, one of "global", "schema" or "table".
+    operations: iterable of str
+        Operations that generate events, any of "INSERT", "UPDATE" and
+        "DELETE".
+    columns: iterable of str
+        If given, only updates of these columns generate events.
+    changes_only: bool
+        Whether or not only updates that actually change rows (or, if
+        columns are given, those columns) generate events.
+    key: iterable of str
+        Columns that identify rows. Defaults to the table's primary key or,
+        for tables without a primary key, the "id" column.
+    data: str
+        Row data to send along with row IDs: "row" for the values of the
+        row's columns, or "diff" for those of the columns that an update
+        changed. If None, only row IDs are sent.
+    data_columns: iterable of str
+        Columns of which to send data; defaults to all columns.
+
+    Returns
+    -------
+    dict
+        Mapping of (schema, table) to True if the trigger was installed, or
+        False if an existing installation was kept.
+
+    """
+    options = _trigger_options(mode, channel, operations, columns, changes_only, key, data, data_columns)
+
+    tables = _normalize_tables(tables, schema)
+
+    prior_installs: FrozenSet[Tuple[str, str]] = frozenset()
+
+    if not overwrite:
+        prior_installs = _installed_triggers(connection, cached=False)
+
+    result = {table: table not in prior_installs for table in tables}
+
+    install = [table for table in tables if result[table]]
+    if install:
+        log("Installing triggers for %s tables (mode=%s)...", len(install), mode, logger_name=_LOGGER_NAME)
+
+        keys = _table_keys(connection, install, options.key)
+        statement = "".join(
+            _install_trigger_statement(connection, table_schema, table, options, keys[(table_schema, table)])
+            for table_schema, table in install
+        )
+        try:
+            execute(connection, statement)
+        finally:
+            invalidate_trigger_cache(connection)
+
+    if len(install) < len(tables):
+        log("%s triggers already installed; skipping...", len(tables) - len(install), logger_name=_LOGGER_NAME)
+
+    return result
+
+
+def uninstall_triggers(
+    connection: connection, tables: Iterable[TableSpec], schema: str = "public"
+) -> Dict[Tuple[str, str], bool]:
+    """Uninstall psycopg2-pgevents triggers from many tables.
+
+    Installed triggers are detected with a single catalog query, and are then
+    all uninstalled in a single transaction.
+
+    Parameters
+    ----------
+    connection: psycopg2.extensions.connection
+        Active connection to a PostGreSQL database.
+    tables: iterable of str or tuple of str
+        Tables for which triggers should be uninstalled, either by name or as
+        (schema, table) tuples.
+    schema: str
+        Schema to which tables given by name belong.
+
+    Returns
+    -------
+    dict
+        Mapping of (schema, table) to True if a trigger was uninstalled, or
+        False if no trigger was installed.
+
+    """
+    tables = _normalize_tables(tables, schema)
+
+    installed = _installed_triggers(connection, cached=False)
+
+    result = {table: table in installed for table in tables}
+
+    uninstall = [table for table in tables if result[table]]
+    if uninstall:
+        log("Uninstalling triggers for %s tables...", len(uninstall), logger_name=_LOGGER_NAME)
+
+        statement = "".join(
+            UNINSTALL_TRIGGER_STATEMENT.format(schema=table_schema, table=table) for table_schema, table in uninstall
+        )
+        try:
+            execute(connection, statement)
+        finally:
+            invalidate_trigger_cache(connection)
+
+    return result
@@ -0,0 +1,55 @@
+import queue
+
+from psycopg2_pgevents.event import Event
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeSource:
+    """Stand-in for an EventStream, returning a predefined sequence of polls."""
+
+    def __init__(self, polls):
+        self._polls = list(polls)
+        self.timeouts = []
+
+    @property
+    def closed(self):
+        return not self._polls
+
+    def poll(self, timeout=None):
+        self.timeouts.append(timeout)
+        return self._polls.pop(0)
+
+
+class QueueSource:
+    """Stand-in for an EventStream, returning the batches put in its queue.
+
+    Unlike `FakeSource`, it can be polled from another thread, and it raises
+    the exceptions put in its queue.
+    """
+
+    def __init__(self, batches=()):
+        self.batches = queue.Queue()
+        self.closed = False
+        for batch in batches:
+            self.batches.put(batch)
+
+    def poll(self, timeout=None):
+        try:
+            batch = self.batches.get(timeout=0.01)
+        except queue.Empty:
+            return []
+
+        if isinstance(batch, Exception):
+            raise batch
+        return batch
+
+
+def make_event(row_id, minor=0, type_="UPDATE", table="settings"):
+    return Event((1, minor), type_, "public", table, row_id)
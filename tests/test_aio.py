@@ -0,0 +1,104 @@
+import asyncio
+
+from psycopg2 import InterfaceError, OperationalError
+from pytest import fixture, mark, raises
+
+from psycopg2_pgevents.aio import AsyncEventListener
+from psycopg2_pgevents.event import register_event_channel
+from psycopg2_pgevents.sql import execute
+from psycopg2_pgevents.trigger import install_trigger, install_trigger_function
+
+
+@fixture
+def event_channel_registered(connection):
+    register_event_channel(connection)
+
+
+@fixture
+def triggers_installed(connection):
+    install_trigger_function(connection)
+    install_trigger(connection, "settings")
+
+
+async def _collect(listener, count, timeout=5.0):
+    evts = []
+    while len(evts) < count:
+        evts.append(await asyncio.wait_for(listener.__anext__(), timeout))
+    return evts
+
+
+class TestAio:
+    def test_invalid_max_pending(self, connection):
+        with raises(ValueError):
+            AsyncEventListener(connection, max_pending=0)
+
+    @mark.usefixtures("triggers_installed", "event_channel_registered")
+    def test_listener_events(self, connection, client):
+        async def run():
+            async with AsyncEventListener(connection) as listener:
+                execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1);")
+                execute(client, "UPDATE public.settings SET value = 2;")
+                return await _collect(listener, 2)
+
+        evts = asyncio.run(run())
+
+        assert [evt.type for evt in evts] == ["INSERT", "UPDATE"]
+        assert [evt.table_name for evt in evts] == ["settings", "settings"]
+
+    @mark.usefixtures("triggers_installed", "event_channel_registered")
+    def test_listener_backpressure(self, connection, client):
+        async def run():
+            async with AsyncEventListener(connection, max_pending=2) as listener:
+                execute(
+                    client, "INSERT INTO public.settings(key, value) SELECT 'foo', n FROM generate_series(1, 5) AS n;"
+                )
+
+                # Wait for the listener to fill its buffer and stop reading
+                for _ in range(50):
+                    if not listener.reading:
+                        break
+                    await asyncio.sleep(0.1)
+                paused = not listener.reading
+
+                evts = await _collect(listener, 5)
+                return paused, evts
+
+        paused, evts = asyncio.run(run())
+
+        assert paused
+        assert [evt.row_id for evt in evts] == [1, 2, 3, 4, 5]
+
+    @mark.usefixtures("triggers_installed", "event_channel_registered")
+    def test_listener_close(self, connection):
+        async def run():
+            listener = AsyncEventListener(connection)
+            listener.start()
+            asyncio.get_running_loop().call_later(0.1, listener.close)
+            return [evt async for evt in listener]
+
+        evts = asyncio.run(asyncio.wait_for(run(), 5.0))
+
+        assert evts == []
+
+    def test_listener_close_before_start(self, connection):
+        async def run():
+            listener = AsyncEventListener(connection)
+            listener.close()
+            evts = [evt async for evt in listener]
+            return evts, listener.reading, asyncio.get_running_loop().remove_reader(connection.fileno())
+
+        evts, reading, reader_removed = asyncio.run(asyncio.wait_for(run(), 5.0))
+
+        assert evts == []
+        assert not reading
+        assert not reader_removed
+
+    @mark.usefixtures("triggers_installed", "event_channel_registered")
+    def test_listener_connection_error(self, connection, client):
+        async def run():
+            async with AsyncEventListener(connection) as listener:
+                execute(client, "SELECT pg_terminate_backend(%s);", (connection.get_backend_pid(),))
+                return await asyncio.wait_for(listener.__anext__(), 5.0)
+
+        with raises((OperationalError, InterfaceError)):
+            asyncio.run(run())
@@ -0,0 +1,154 @@
+import time
+
+from pytest import mark, raises
+
+from psycopg2_pgevents import buffer as buffer_module
+from psycopg2_pgevents.buffer import EventBuffer
+from tests.helpers import QueueSource, make_event
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def _drain(buffer):
+    evts = []
+    while True:
+        batch = buffer.poll(timeout=0.1)
+        if not batch:
+            return evts
+        evts.extend(batch)
+
+
+class TestBuffer:
+    def test_poll(self):
+        source = QueueSource([[make_event(1), make_event(2)], [make_event(3)]])
+
+        with EventBuffer(source, max_batch=2) as buffer:
+            _wait_for(lambda: buffer.stats.received == 3)
+
+            assert [evt.row_id for evt in buffer.poll()] == [1, 2]
+            assert [evt.row_id for evt in buffer.poll()] == [3]
+            assert buffer.poll(timeout=0.01) == []
+
+    def test_block(self):
+        source = QueueSource([[make_event(row_id) for row_id in range(5)]])
+
+        with EventBuffer(source, capacity=2) as buffer:
+            _wait_for(lambda: len(buffer) == 2)
+            time.sleep(0.05)
+
+            assert buffer.stats.depth == 2
+            assert [evt.row_id for evt in _drain(buffer)] == [0, 1, 2, 3, 4]
+            assert buffer.stats.dropped == 0
+
+    def test_drop_oldest(self):
+        source = QueueSource([[make_event(row_id) for row_id in range(5)], [make_event(5)]])
+
+        with EventBuffer(source, capacity=3, overflow="drop_oldest") as buffer:
+            _wait_for(lambda: buffer.stats.received == 6)
+
+            assert buffer.stats.dropped == 3
+            assert [evt.row_id for evt in buffer.poll()] == [3, 4, 5]
+
+    def test_coalesce(self):
+        source = QueueSource(
+            [
+                [
+                    make_event(1, type_="INSERT"),
+                    make_event(2),
+                    make_event(1, type_="UPDATE"),
+                    make_event(2),
+                    make_event(3),
+                    make_event(2, type_="DELETE"),
+                ]
+            ]
+        )
+
+        with EventBuffer(source, capacity=4, overflow="coalesce") as buffer:
+            _wait_for(lambda: buffer.stats.received == 6)
+
+            assert buffer.stats.coalesced == 3
+            assert buffer.stats.dropped == 0
+            assert [(evt.row_id, evt.type) for evt in buffer.poll()] == [(1, "INSERT"), (3, "UPDATE"), (2, "DELETE")]
+
+    def test_coalesce_distinct_rows(self):
+        source = QueueSource([[make_event(row_id) for row_id in range(5)]])
+
+        with EventBuffer(source, capacity=3, overflow="coalesce") as buffer:
+            _wait_for(lambda: buffer.stats.received == 5)
+
+            assert buffer.stats.dropped == 2
+            assert [evt.row_id for evt in buffer.poll()] == [2, 3, 4]
+
+    def test_coalesce_warning_rate_limited(self, monkeypatch):
+        warnings = []
+
+        def recording_log(message, *args, category="info", **kwargs):
+            if category == "warning":
+                warnings.append(message % args)
+
+        monkeypatch.setattr(buffer_module, "log", recording_log)
+        source = QueueSource([[make_event(row_id)] for row_id in range(20)])
+
+        with EventBuffer(source, capacity=3, overflow="coalesce") as buffer:
+            _wait_for(lambda: buffer.stats.received == 20)
+
+            assert buffer.stats.dropped == 17
+            assert len(warnings) == 1
+
+    def test_spill(self, tmp_path):
+        source = QueueSource([[make_event(row_id, minor=row_id) for row_id in range(5)], [make_event(5, minor=5)]])
+
+        with EventBuffer(source, capacity=2, overflow="spill", spill_dir=str(tmp_path), max_batch=3) as buffer:
+            _wait_for(lambda: buffer.stats.received == 6)
+
+            assert buffer.stats.depth == 2
+            assert buffer.stats.spilled == 4
+            assert len(list(tmp_path.iterdir())) <= 1
+
+            evts = _drain(buffer)
+
+            assert [evt.id for evt in evts] == [(1, minor) for minor in range(6)]
+            assert buffer.stats.spilled == 0
+            assert buffer._read_offset == buffer._write_offset == 0
+
+    def test_source_closed(self):
+        source = QueueSource([[make_event(1)]])
+
+        with EventBuffer(source) as buffer:
+            _wait_for(lambda: buffer.stats.received == 1)
+            source.closed = True
+
+            assert [evt.row_id for evt in buffer] == [1]
+            assert buffer.closed
+
+    def test_source_error(self):
+        source = QueueSource([[make_event(1)], RuntimeError("boom")])
+
+        with EventBuffer(source) as buffer:
+            assert [evt.row_id for evt in buffer.poll()] == [1]
+
+            with raises(RuntimeError):
+                buffer.poll()
+
+    def test_close(self):
+        source = QueueSource([[make_event(row_id) for row_id in range(5)]])
+
+        buffer = EventBuffer(source, capacity=2)
+        _wait_for(lambda: len(buffer) == 2)
+        buffer.close()
+
+        assert buffer.closed
+        assert len(buffer) == 0
+        assert not source.closed
+
+    @mark.parametrize(
+        "options", [{"capacity": 0}, {"overflow": "ignore"}, {"spill_dir": "/tmp"}, {"max_batch": 0}],
+    )
+    def test_invalid_options(self, options):
+        with raises(ValueError):
+            EventBuffer(QueueSource(), **options)
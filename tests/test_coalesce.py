@@ -0,0 +1,140 @@
+from pytest import mark, raises
+
+from psycopg2_pgevents.coalesce import EventCoalescer, coalesce
+from tests.helpers import FakeClock, FakeSource, make_event
+
+
+class TestCoalesce:
+    @mark.parametrize(
+        "types, expected",
+        [
+            (["UPDATE", "UPDATE", "UPDATE"], "UPDATE"),
+            (["INSERT", "UPDATE"], "INSERT"),
+            (["UPDATE", "DELETE"], "DELETE"),
+            (["DELETE", "INSERT"], "UPDATE"),
+            (["INSERT", "DELETE"], None),
+            (["INSERT", "DELETE", "INSERT"], "INSERT"),
+        ],
+    )
+    def test_merge_types(self, types, expected):
+        coalescer = EventCoalescer(window=0)
+
+        coalescer.add(make_event(1, minor, type_=type_) for minor, type_ in enumerate(types))
+
+        assert [evt.type for evt in coalescer.flush()] == ([expected] if expected else [])
+
+    def test_merge_leaves_events_untouched(self):
+        evts = [make_event(1, 0, type_="INSERT"), make_event(1, 1, type_="UPDATE")]
+        coalescer = EventCoalescer(window=0)
+
+        coalescer.add(evts)
+
+        assert [evt.type for evt in coalescer.flush()] == ["INSERT"]
+        assert [evt.type for evt in evts] == ["INSERT", "UPDATE"]
+
+    def test_merge_data(self):
+        evts = [make_event(1, 0, type_="INSERT"), make_event(1, 1, type_="UPDATE"), make_event(1, 2, type_="UPDATE")]
+        evts[0].data = {"key": "foo", "value": 1}
+        evts[1].data = {"value": 2}
+        evts[2].data = {"key": "bar"}
+        coalescer = EventCoalescer(window=0)
+
+        coalescer.add(evts)
+
+        assert [(evt.type, evt.id, evt.data) for evt in coalescer.flush()] == [
+            ("INSERT", (1, 2), {"key": "bar", "value": 2})
+        ]
+        assert evts[2].data == {"key": "bar"}
+
+    def test_keeps_latest_event(self):
+        coalescer = EventCoalescer(window=0)
+
+        coalescer.add(
+            [make_event(1, 0, type_="UPDATE"), make_event(2, 1, type_="UPDATE"), make_event(1, 2, type_="UPDATE")]
+        )
+        coalescer.add([make_event(1, 3, type_="UPDATE", table="orders")])
+
+        assert [(evt.table_name, evt.row_id, evt.id) for evt in coalescer.flush()] == [
+            ("settings", 2, (1, 1)),
+            ("settings", 1, (1, 2)),
+            ("orders", 1, (1, 3)),
+        ]
+
+    def test_time_window(self):
+        clock = FakeClock()
+        coalescer = EventCoalescer(window=1.0, clock=clock)
+
+        coalescer.add([make_event(1, type_="UPDATE")])
+        clock.now = 0.5
+        coalescer.add([make_event(1, type_="UPDATE")])
+
+        assert not coalescer.ready
+        assert coalescer.flush() == []
+        assert coalescer.timeout() == 0.5
+
+        clock.now = 1.0
+
+        assert coalescer.ready
+        assert len(coalescer.flush()) == 1
+        assert coalescer.timeout() is None
+
+    def test_count_window(self):
+        coalescer = EventCoalescer(window=60, count=3, clock=FakeClock())
+
+        coalescer.add([make_event(1, type_="UPDATE"), make_event(1, type_="UPDATE")])
+        ready_after_two = coalescer.ready
+        coalescer.add([make_event(1, type_="UPDATE")])
+
+        assert not ready_after_two
+        assert coalescer.ready
+        assert len(coalescer.flush()) == 1
+
+    def test_bounded_batches(self):
+        coalescer = EventCoalescer(window=0, max_batch=2)
+
+        coalescer.add(make_event(row_id, type_="INSERT") for row_id in range(5))
+
+        assert [[evt.row_id for evt in coalescer.flush()] for _ in range(3)] == [[0, 1], [2, 3], [4]]
+        assert not coalescer.ready
+
+    def test_cancelled_window(self):
+        clock = FakeClock()
+        coalescer = EventCoalescer(window=1.0, clock=clock)
+
+        coalescer.add([make_event(1, type_="INSERT"), make_event(1, type_="DELETE")])
+        clock.now = 5.0
+        coalescer.add([make_event(2, type_="UPDATE")])
+
+        assert coalescer.timeout() == 1.0
+        assert not coalescer.ready
+
+    def test_force_flush(self):
+        coalescer = EventCoalescer(window=60, clock=FakeClock())
+
+        coalescer.add([make_event(1, type_="UPDATE")])
+
+        assert [evt.row_id for evt in coalescer.flush(force=True)] == [1]
+
+    @mark.parametrize("options", [{"window": -1}, {"count": 0}, {"max_batch": 0}])
+    def test_invalid_options(self, options):
+        with raises(ValueError):
+            EventCoalescer(**options)
+
+    def test_coalesce_stream(self):
+        source = FakeSource(
+            [
+                [make_event(1, type_="INSERT"), make_event(1, type_="UPDATE"), make_event(2, type_="UPDATE")],
+                [],
+                [make_event(2, type_="UPDATE"), make_event(3, type_="DELETE")],
+            ]
+        )
+
+        batches = list(coalesce(source, window=0, max_batch=1))
+
+        assert [[(evt.type, evt.row_id) for evt in batch] for batch in batches] == [
+            [("INSERT", 1)],
+            [("UPDATE", 2)],
+            [("UPDATE", 2)],
+            [("DELETE", 3)],
+        ]
+        assert source.timeouts == [None, None, None]
@@ -1,3 +1,5 @@
+import logging
+
 from pytest import raises
 
 from psycopg2_pgevents import debug
@@ -65,3 +67,49 @@ class TestDebug:
 
         assert len(logs) == 1
         assert ("test", "INFO", "foo") == logs.pop()
+
+    def test_debug_enabled(self):
+        set_debug(True)
+        assert debug.debug_enabled()
+
+        set_debug(False)
+        assert not debug.debug_enabled()
+
+    def test_log_debug_disabled_skips_logger(self, monkeypatch):
+        set_debug(False)
+
+        def _fail(name):
+            raise AssertionError("logger requested while debug disabled")
+
+        monkeypatch.setattr(debug, "_get_logger", _fail)
+
+        log("foo %s", "bar")
+
+    def test_log_configures_logger_once(self, log_capture):
+        log("foo", logger_name="test.once")
+        log("bar", logger_name="test.once")
+
+        logger = logging.getLogger("test.once")
+
+        assert len(logger.handlers) == 1
+        assert len(log_capture.actual()) == 2
+
+    def test_log_stdout_no_duplicates(self, log_capture, capsys):
+        log("parent", logger_name="test.stdout")
+        log("child", logger_name="test.stdout.child")
+
+        lines = capsys.readouterr().out.splitlines()
+
+        assert len(lines) == 2
+        assert lines[0].endswith("[test.stdout]: parent")
+        assert lines[1].endswith("[test.stdout.child]: child")
+
+    def test_set_debug_updates_logger_levels(self, log_capture):
+        log("foo", logger_name="test.level")
+        logger = logging.getLogger("test.level")
+
+        assert logger.level == logging.INFO
+
+        set_debug(False)
+
+        assert logger.level > logging.CRITICAL
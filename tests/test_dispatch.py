@@ -0,0 +1,161 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from pytest import mark, raises
+
+from psycopg2_pgevents.dispatch import BatchDispatcher
+from tests.helpers import FakeClock, FakeSource, make_event
+
+_HANDLED = multiprocessing.Queue()
+
+
+def _record(batch):
+    _HANDLED.put([(evt.row_id, evt.id) for evt in batch])
+
+
+def _crash(batch):
+    os._exit(1)
+
+
+class TestDispatch:
+    def test_process_pool(self):
+        evts = [make_event(minor % 7, minor) for minor in range(100)]
+
+        with BatchDispatcher(_record, workers=2, batch_size=10) as dispatcher:
+            dispatcher.dispatch(evts)
+
+        handled = []
+        while len(handled) < len(evts):
+            handled.extend(_HANDLED.get(timeout=5))
+
+        assert sorted(handled) == sorted((evt.row_id, evt.id) for evt in evts)
+        for row_id in range(7):
+            minors = [id_[1] for handled_row_id, id_ in handled if handled_row_id == row_id]
+            assert minors == sorted(minors)
+
+    def test_batch_size(self):
+        batches = []
+
+        with ThreadPoolExecutor(2) as executor:
+            with BatchDispatcher(batches.append, workers=1, batch_size=3, linger=60, executor=executor) as dispatcher:
+                dispatcher.dispatch(make_event(row_id) for row_id in range(7))
+
+        assert [[evt.row_id for evt in batch] for batch in batches] == [[0, 1, 2], [3, 4, 5], [6]]
+
+    def test_linger(self):
+        clock = FakeClock()
+        batches = []
+
+        with ThreadPoolExecutor(1) as executor:
+            dispatcher = BatchDispatcher(batches.append, workers=1, linger=1.0, executor=executor, clock=clock)
+            dispatcher.dispatch([make_event(1)])
+            timeout = dispatcher.timeout()
+
+            clock.now = 1.0
+            dispatcher.dispatch([])
+            dispatcher.flush()
+
+            assert timeout == 1.0
+            assert dispatcher.timeout() is None
+            assert [[evt.row_id for evt in batch] for batch in batches] == [[1]]
+
+    def test_one_batch_in_flight_per_shard(self):
+        release = threading.Event()
+        batches = []
+
+        def handler(batch):
+            release.wait()
+            batches.append([evt.id[1] for evt in batch])
+
+        with ThreadPoolExecutor(4) as executor:
+            with BatchDispatcher(handler, workers=1, batch_size=1, linger=60, executor=executor) as dispatcher:
+                dispatcher.dispatch(make_event(1, minor) for minor in range(3))
+                release.set()
+
+        assert batches == [[0], [1], [2]]
+
+    def test_backpressure(self):
+        release = threading.Event()
+
+        with ThreadPoolExecutor(1) as executor:
+            dispatcher = BatchDispatcher(
+                lambda batch: release.wait(), workers=1, batch_size=1, max_pending=1, executor=executor
+            )
+
+            # The first batch is in flight, the second waits
+            dispatcher.dispatch([make_event(1), make_event(2)])
+
+            blocked = threading.Thread(target=dispatcher.dispatch, args=([make_event(3)],))
+            blocked.start()
+            blocked.join(0.3)
+            was_blocked = blocked.is_alive()
+
+            release.set()
+            blocked.join(5)
+            dispatcher.close()
+
+        assert was_blocked
+        assert not blocked.is_alive()
+
+    def test_batch_stats(self):
+        stats = []
+
+        with ThreadPoolExecutor(1) as executor:
+            with BatchDispatcher(
+                lambda batch: None, workers=1, batch_size=2, on_batch=stats.append, executor=executor
+            ) as dispatcher:
+                dispatcher.dispatch(make_event(row_id) for row_id in range(4))
+
+        assert [(stat.shard, stat.size) for stat in stats] == [(0, 2), (0, 2)]
+        assert all(stat.latency >= stat.lingered + stat.queued for stat in stats)
+
+    def test_handler_error(self):
+        def handler(batch):
+            raise RuntimeError("boom")
+
+        with ThreadPoolExecutor(1) as executor:
+            dispatcher = BatchDispatcher(handler, workers=1, batch_size=1, executor=executor)
+            dispatcher.dispatch([make_event(1)])
+
+            with raises(RuntimeError):
+                dispatcher.flush()
+
+            dispatcher.close()
+
+    def test_worker_crash(self):
+        errors = []
+
+        def run():
+            dispatcher = BatchDispatcher(_crash, workers=1, batch_size=1)
+            dispatcher.dispatch(make_event(1, minor) for minor in range(3))
+            try:
+                dispatcher.close()
+            except BrokenProcessPool as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(10)
+
+        assert not thread.is_alive()
+        assert len(errors) == 1
+
+    def test_run_source(self):
+        batches = []
+        source = FakeSource([[make_event(1, 0), make_event(2, 1)], [], [make_event(1, 2)]])
+
+        with ThreadPoolExecutor(1) as executor:
+            with BatchDispatcher(batches.append, workers=1, linger=60, executor=executor) as dispatcher:
+                dispatcher.run(source)
+
+        assert source.timeouts[0] is None
+        assert source.timeouts[1] > 0
+        assert [[evt.id[1] for evt in batch] for batch in batches] == [[0, 1, 2]]
+
+    @mark.parametrize("options", [{"workers": 0}, {"batch_size": 0}, {"linger": -1}, {"max_pending": 0}])
+    def test_invalid_options(self, options):
+        with raises(ValueError):
+            BatchDispatcher(print, **options)
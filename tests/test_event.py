@@ -1,7 +1,14 @@
 import json
+import pickle
+import select
+import time
+import tracemalloc
+from collections import deque
+from types import SimpleNamespace
 from uuid import UUID
 
-from pytest import fixture, mark
+from psycopg2.extensions import Notify
+from pytest import fixture, mark, raises, skip
 
 from psycopg2_pgevents import event
 from psycopg2_pgevents.sql import execute
@@ -20,6 +27,45 @@ def triggers_installed(connection):
     install_trigger(connection, "orders", schema="pointofsale")
 
 
+@fixture
+def statement_triggers_installed(connection):
+    install_trigger_function(connection)
+    install_trigger(connection, "settings", mode="statement")
+
+
+@fixture
+def buffered_triggers_installed(connection):
+    install_trigger_function(connection)
+    install_trigger(connection, "settings", mode="buffered")
+    install_trigger(connection, "orders", schema="pointofsale", mode="buffered")
+
+
+def _wait_for_notifies(connection, count, timeout=5.0):
+    """Collect at least count raw notifications from the connection."""
+    notifies = []
+    deadline = time.monotonic() + timeout
+    while len(notifies) < count and time.monotonic() < deadline:
+        if select.select([connection], [], [], 0.1) != ([], [], []):
+            connection.poll()
+            notifies.extend(connection.notifies)
+            del connection.notifies[:]
+    return notifies
+
+
+def _poll_events(connection, count, timeout=5.0):
+    """Poll until at least count events have been received or timeout expires."""
+    evts = []
+    deadline = time.monotonic() + timeout
+    while len(evts) < count and time.monotonic() < deadline:
+        evts.extend(event.poll(connection, timeout=0.1))
+    return evts
+
+
+def _notify(row_id, event_type="INSERT"):
+    payload = event.Event("c2d29867-3d0b-d497-9191-18a9d8ee7830", event_type, "public", "widget", row_id).tojson()
+    return Notify(0, "psycopg2_pgevents_channel", payload)
+
+
 class TestEvent:
     def test_event_fromjson(self):
         json_string = """
@@ -39,6 +85,157 @@ class TestEvent:
         assert evt.table_name == "widget"
         assert evt.row_id == "1"
 
+    def test_event_frompayload_row(self):
+        payload = """
+        {
+            "event_id": "c2d29867-3d0b-d497-9191-18a9d8ee7830",
+            "event_type": "INSERT",
+            "schema_name": "public",
+            "table_name": "widget",
+            "row_id": 1
+        }
+        """
+
+        evts = event.Event.frompayload(payload)
+
+        assert len(evts) == 1
+        assert evts[0].id == UUID("c2d29867-3d0b-d497-9191-18a9d8ee7830")
+        assert evts[0].row_id == 1
+
+    def test_event_frompayload_statement(self):
+        payload = """
+        {
+            "event_id": "c2d29867-3d0b-d497-9191-18a9d8ee7830",
+            "event_type": "UPDATE",
+            "schema_name": "public",
+            "table_name": "widget",
+            "row_ids": [1, 2, 3]
+        }
+        """
+
+        evts = event.Event.frompayload(payload)
+
+        assert [evt.row_id for evt in evts] == [1, 2, 3]
+        for evt in evts:
+            assert evt.id == UUID("c2d29867-3d0b-d497-9191-18a9d8ee7830")
+            assert evt.type == "UPDATE"
+            assert evt.schema_name == "public"
+            assert evt.table_name == "widget"
+
+    def test_event_frompayload_packed(self):
+        payload = """
+        {
+            "v": 2,
+            "i": "c2d29867-3d0b-d497-9191-18a9d8ee7830",
+            "o": "D",
+            "s": "public",
+            "t": "widget",
+            "r": [4, 5]
+        }
+        """
+
+        evts = event.Event.frompayload(payload)
+
+        assert [evt.row_id for evt in evts] == [4, 5]
+        for evt in evts:
+            assert evt.id == UUID("c2d29867-3d0b-d497-9191-18a9d8ee7830")
+            assert evt.type == "DELETE"
+            assert evt.schema_name == "public"
+            assert evt.table_name == "widget"
+
+    def test_event_frompayload_positional(self):
+        payload = '[3, "c2d29867-3d0b-d497-9191-18a9d8ee7830", "U", "public", "widget", [7, 8]]'
+
+        evts = event.Event.frompayload(payload)
+
+        assert [evt.row_id for evt in evts] == [7, 8]
+        for evt in evts:
+            assert evt.id == UUID("c2d29867-3d0b-d497-9191-18a9d8ee7830")
+            assert evt.type == "UPDATE"
+            assert evt.schema_name == "public"
+            assert evt.table_name == "widget"
+
+    def test_event_frompayload_sortable_id(self):
+        payload = '[3, "5301:2", "I", "public", "widget", [7, 8, 9]]'
+
+        evts = event.Event.frompayload(payload)
+
+        assert [evt.id for evt in evts] == [(5301, 2), (5301, 3), (5301, 4)]
+        assert [evt.row_id for evt in evts] == [7, 8, 9]
+
+    def test_event_topayload_sortable_id(self):
+        evt = event.Event((5301, 2), "INSERT", "public", "widget", 7)
+
+        assert json.loads(evt.topayload())[1] == "5301:2"
+        assert json.loads(evt.tojson())["event_id"] == "5301:2"
+        assert event.Event.frompayload(evt.topayload()) == [evt]
+
+    def test_event_topayload_lowercase_type(self):
+        evt = event.Event("c2d29867-3d0b-d497-9191-18a9d8ee7830", "insert", "public", "widget", 1)
+
+        assert [evt.type for evt in event.Event.frompayload(evt.topayload())] == ["INSERT"]
+
+    def test_event_topayload_invalid_type(self):
+        evt = event.Event("c2d29867-3d0b-d497-9191-18a9d8ee7830", "TRUNCATE", "public", "widget", 1)
+
+        with raises(ValueError):
+            evt.topayload()
+
+    def test_event_frompayload_unsupported_version(self):
+        with raises(ValueError):
+            event.Event.frompayload('[99, "c2d29867-3d0b-d497-9191-18a9d8ee7830"]')
+
+    def test_event_topayload(self):
+        evt = event.Event("c2d29867-3d0b-d497-9191-18a9d8ee7830", "DELETE", "public", "widget", 1)
+
+        payload = evt.topayload()
+
+        assert json.loads(payload) == [3, "c2d29867-3d0b-d497-9191-18a9d8ee7830", "D", "public", "widget", [1]]
+        assert event.Event.frompayload(payload) == [evt]
+
+    @mark.parametrize("codec", ["json", "orjson", "ujson"])
+    def test_codecs(self, codec):
+        if codec not in event._CODECS:
+            skip("{} is not installed".format(codec))
+
+        previous = event.get_codec()
+        event.set_codec(codec)
+        try:
+            evt = event.Event("c2d29867-3d0b-d497-9191-18a9d8ee7830", "INSERT", "public", "widget", 1)
+
+            assert event.get_codec() == codec
+            assert event.Event.frompayload(evt.topayload()) == [evt]
+            assert event.Event.fromjson(evt.tojson()) == evt
+        finally:
+            event.set_codec(previous)
+
+    def test_register_codec(self):
+        calls = []
+
+        def loads(payload):
+            calls.append("loads")
+            return json.loads(payload)
+
+        def dumps(obj):
+            calls.append("dumps")
+            return json.dumps(obj)
+
+        previous = event.get_codec()
+        event.register_codec("custom", loads, dumps)
+        event.set_codec("custom")
+        try:
+            evt = event.Event("c2d29867-3d0b-d497-9191-18a9d8ee7830", "INSERT", "public", "widget", 1)
+            event.Event.frompayload(evt.topayload())
+        finally:
+            event.set_codec(previous)
+            del event._CODECS["custom"]
+
+        assert calls == ["dumps", "loads"]
+
+    def test_set_unknown_codec(self):
+        with raises(ValueError):
+            event.set_codec("xml")
+
     def test_event_tojson(self):
         evt = event.Event("c2d29867-3d0b-d497-9191-18a9d8ee7830", "insert", "public", "widget", "1")
 
@@ -50,6 +247,162 @@ class TestEvent:
         assert json_dict["table_name"] == evt.table_name
         assert json_dict["row_id"] == evt.row_id
 
+    @mark.parametrize("id_", [(5, 2), (22000000, 0), UUID("c2d29867-3d0b-d497-9191-18a9d8ee7830")])
+    def test_event_json_round_trip(self, id_):
+        evt = event.Event(id_, "UPDATE", "public", "widget", 1)
+
+        copy = event.Event.fromjson(evt.tojson())
+
+        assert copy.id == id_
+        assert copy == evt
+
+    def test_read_events(self):
+        connection = SimpleNamespace(notifies=[_notify(row_id) for row_id in range(1000)])
+
+        evts = list(event.read_events(connection))
+
+        assert [evt.row_id for evt in evts] == list(range(1000))
+        assert connection.notifies == []
+
+    def test_read_events_deque(self):
+        connection = SimpleNamespace(notifies=deque(_notify(row_id) for row_id in range(3)))
+
+        evts = list(event.read_events(connection))
+
+        assert [evt.row_id for evt in evts] == [0, 1, 2]
+        assert isinstance(connection.notifies, deque)
+        assert len(connection.notifies) == 0
+
+    def test_read_events_arriving_during_iteration(self):
+        connection = SimpleNamespace(notifies=[_notify(0), _notify(1)])
+
+        row_ids = []
+        for evt in event.read_events(connection):
+            row_ids.append(evt.row_id)
+            if evt.row_id == 0:
+                connection.notifies.append(_notify(2))
+
+        assert row_ids == [0, 1, 2]
+
+    def test_read_events_stopped_early(self):
+        connection = SimpleNamespace(notifies=[_notify(row_id) for row_id in range(5)])
+
+        for evt in event.read_events(connection):
+            connection.notifies.append(_notify(5))
+            break
+
+        assert evt.row_id == 0
+        assert [evt.row_id for evt in event.read_events(connection)] == [1, 2, 3, 4, 5]
+
+    def test_read_events_invalid_payload(self):
+        notifies = [_notify(0), Notify(0, "psycopg2_pgevents_channel", "{"), _notify(2)]
+        connection = SimpleNamespace(notifies=deque(notifies))
+
+        row_ids = []
+        with raises(ValueError):
+            for evt in event.read_events(connection):
+                row_ids.append(evt.row_id)
+
+        assert row_ids == [0]
+        assert list(connection.notifies) == notifies[2:]
+
+    def test_event_compact(self):
+        evt = event.Event("c2d29867-3d0b-d497-9191-18a9d8ee7830", "INSERT", "public", "widget", 1)
+
+        assert not hasattr(evt, "__dict__")
+
+    def test_event_lazy_id(self):
+        evt = event.Event.fromjson(_notify(1).payload)
+
+        assert isinstance(evt._id, str)
+        assert evt.id == UUID("c2d29867-3d0b-d497-9191-18a9d8ee7830")
+        assert isinstance(evt._id, UUID)
+
+    def test_event_equality(self):
+        evt1 = event.Event("c2d29867-3d0b-d497-9191-18a9d8ee7830", "INSERT", "public", "widget", 1)
+        evt2 = event.Event(UUID("c2d29867-3d0b-d497-9191-18a9d8ee7830"), "INSERT", "public", "widget", 1)
+        evt3 = event.Event("c2d29867-3d0b-d497-9191-18a9d8ee7830", "INSERT", "public", "widget", 2)
+
+        assert evt1 == evt2
+        assert hash(evt1) == hash(evt2)
+        assert evt1 != evt3
+        assert len({evt1, evt2, evt3}) == 2
+
+    @mark.parametrize(
+        "row_id",
+        [
+            1,
+            "foo",
+            UUID("c2d29867-3d0b-d497-9191-18a9d8ee7830"),
+            ("acme", UUID("c2d29867-3d0b-d497-9191-18a9d8ee7830")),
+        ],
+    )
+    def test_event_wire(self, row_id):
+        evt = event.Event((1, 2), "UPDATE", "public", "widget", row_id, {"name": "foo"})
+        evt.source = "primary"
+
+        wire = evt.towire()
+        copy = event.Event.fromwire(wire)
+
+        assert all(type(value) in (int, str, tuple, list, dict) for value in wire if value is not None)
+        assert copy == evt
+        assert copy.data == evt.data
+        assert copy.source == "primary"
+
+    def test_event_pickle(self):
+        evt = event.Event("c2d29867-3d0b-d497-9191-18a9d8ee7830", "INSERT", "public", "widget", 1)
+
+        copy = pickle.loads(pickle.dumps(evt))
+
+        assert copy == evt
+        assert copy.type is evt.type
+
+    def test_event_interned_strings(self):
+        evt1, evt2 = [evt for notify in (_notify(1), _notify(2)) for evt in event.Event.frompayload(notify.payload)]
+
+        assert evt1.type is evt2.type
+        assert evt1.schema_name is evt2.schema_name
+        assert evt1.table_name is evt2.table_name
+
+    def test_event_memory(self, record_property):
+        payloads = [_notify(row_id).payload for row_id in range(10000)]
+
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            evts = [evt for payload in payloads for evt in event.Event.frompayload(payload)]
+            after = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+        bytes_per_event = (after - before) / len(evts)
+        record_property("bytes_per_event", bytes_per_event)
+
+        # Event object plus its (unparsed) ID string and list slot, with room
+        # for differences between Python versions
+        assert bytes_per_event < 500
+
+    def test_event_decode_time(self, record_property):
+        payloads = [_notify(row_id).payload for row_id in range(10000)]
+
+        start = time.perf_counter()
+        evts = [evt for payload in payloads for evt in event.Event.frompayload(payload)]
+        seconds_per_event = (time.perf_counter() - start) / len(evts)
+        record_property("decode_seconds_per_event", seconds_per_event)
+
+        # Timing depends on the machine; only the measurement is reported
+        assert len(evts) == len(payloads)
+
+    def test_event_compare_unparsed_id(self):
+        evt1 = event.Event("C2D29867-3D0B-D497-9191-18A9D8EE7830", "INSERT", "public", "widget", 1)
+        evt2 = event.Event(UUID("c2d29867-3d0b-d497-9191-18a9d8ee7830"), "INSERT", "public", "widget", 1)
+        evt3 = event.Event("5301:2", "INSERT", "public", "widget", 1)
+
+        assert evt1 == evt2
+        assert hash(evt1) == hash(evt2)
+        assert evt3 == event.Event((5301, 2), "INSERT", "public", "widget", 1)
+        assert isinstance(evt1._id, str)
+
     def test_register_event_channel(self, connection):
         channel_registered = False
 
@@ -160,3 +513,414 @@ class TestEvent:
         assert evt.type == "INSERT"
         assert evt.schema_name == "pointofsale"
         assert evt.table_name == "orders"
+
+    @mark.usefixtures("statement_triggers_installed", "event_channel_registered")
+    def test_poll_statement_trigger_bulk_events(self, connection, client):
+        execute(client, "INSERT INTO public.settings(key, value) SELECT 'foo', n FROM generate_series(1, 1200) AS n;")
+
+        evts = _poll_events(connection, 1200)
+
+        assert len(evts) == 1200
+        assert len({evt.row_id for evt in evts}) == 1200
+        assert {evt.type for evt in evts} == {"INSERT"}
+
+        execute(client, "UPDATE public.settings SET value = 0 WHERE value <= 10;")
+        execute(client, "DELETE FROM public.settings;")
+
+        evts = _poll_events(connection, 1210)
+
+        assert len(evts) == 1210
+        assert [evt.type for evt in evts[:10]] == ["UPDATE"] * 10
+        assert {evt.type for evt in evts[10:]} == {"DELETE"}
+
+    @mark.usefixtures("statement_triggers_installed", "event_channel_registered")
+    def test_poll_statement_trigger_no_rows(self, connection, client):
+        execute(client, "UPDATE public.settings SET value = 0 WHERE id = -1;")
+
+        evts = [evt for evt in event.poll(connection)]
+
+        assert len(evts) == 0
+
+    @mark.usefixtures("statement_triggers_installed", "event_channel_registered")
+    def test_statement_trigger_payload_limit(self, connection, client):
+        execute(client, "INSERT INTO public.settings(key, value) SELECT 'foo', n FROM generate_series(1, 5000) AS n;")
+
+        notifies = _wait_for_notifies(connection, 4)
+
+        assert len(notifies) == 4
+        for notify in notifies:
+            assert len(notify.payload.encode()) < 8000
+
+        row_ids = [evt.row_id for notify in notifies for evt in event.Event.frompayload(notify.payload)]
+        assert sorted(row_ids) == list(range(1, 5001))
+
+    @mark.usefixtures("buffered_triggers_installed", "event_channel_registered")
+    def test_buffered_trigger_payload_limit(self, connection, client):
+        execute(client, "INSERT INTO public.settings(key, value) SELECT 'foo', n FROM generate_series(1, 5000) AS n;")
+
+        notifies = _wait_for_notifies(connection, 4)
+
+        assert len(notifies) == 4
+        for notify in notifies:
+            assert len(notify.payload.encode()) < 8000
+
+        evts = [evt for notify in notifies for evt in event.Event.frompayload(notify.payload)]
+        assert [evt.row_id for evt in evts] == list(range(1, 5001))
+        assert {evt.type for evt in evts} == {"INSERT"}
+
+    @mark.usefixtures("buffered_triggers_installed", "event_channel_registered")
+    def test_poll_buffered_trigger_events(self, connection, client):
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1), ('bar', 2);")
+        execute(client, "INSERT INTO pointofsale.orders(description) VALUES('baz');")
+
+        evts = _poll_events(connection, 3)
+
+        assert [(evt.type, evt.table_name, evt.row_id) for evt in evts] == [
+            ("INSERT", "settings", 1),
+            ("INSERT", "settings", 2),
+            ("INSERT", "orders", 1),
+        ]
+
+    @mark.usefixtures("buffered_triggers_installed", "event_channel_registered")
+    def test_poll_buffered_trigger_transaction(self, connection, client):
+        client.autocommit = False
+        with client.cursor() as cursor:
+            cursor.execute("INSERT INTO public.settings(key, value) VALUES('foo', 1), ('bar', 2);")
+            cursor.execute("UPDATE public.settings SET value = 3;")
+            cursor.execute("SAVEPOINT before_delete;")
+            cursor.execute("DELETE FROM public.settings;")
+            cursor.execute("ROLLBACK TO SAVEPOINT before_delete;")
+            cursor.execute("DELETE FROM public.settings WHERE id = 1;")
+        client.commit()
+
+        evts = _poll_events(connection, 5)
+
+        assert [(evt.type, evt.row_id) for evt in evts] == [
+            ("INSERT", 1),
+            ("INSERT", 2),
+            ("UPDATE", 1),
+            ("UPDATE", 2),
+            ("DELETE", 1),
+        ]
+
+    @mark.usefixtures("triggers_installed", "event_channel_registered")
+    def test_trigger_payload_version(self, connection, client):
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1);")
+
+        notifies = _wait_for_notifies(connection, 1)
+
+        assert len(notifies) == 1
+        assert json.loads(notifies[0].payload)[0] == event.PAYLOAD_VERSION
+
+    @mark.parametrize("mode", ["row", "statement", "buffered"])
+    @mark.usefixtures("event_channel_registered")
+    def test_poll_txid_strategy_events(self, connection, client, mode):
+        install_trigger_function(connection, id_strategy="txid")
+        install_trigger(connection, "settings", mode=mode)
+
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1), ('bar', 2), ('baz', 3);")
+        execute(client, "DELETE FROM public.settings WHERE key = 'foo';")
+
+        evts = _poll_events(connection, 4)
+
+        assert [(evt.type, evt.row_id) for evt in evts] == [("INSERT", 1), ("INSERT", 2), ("INSERT", 3), ("DELETE", 1)]
+        insert_txid = evts[0].id[0]
+        assert [evt.id for evt in evts[:3]] == [(insert_txid, 0), (insert_txid, 1), (insert_txid, 2)]
+        assert evts[3].id[0] > insert_txid
+        assert evts[3].id[1] == 0
+
+    @mark.usefixtures("event_channel_registered")
+    def test_poll_sequence_strategy_events(self, connection, client):
+        install_trigger_function(connection, id_strategy="sequence")
+        install_trigger(connection, "settings")
+
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1), ('bar', 2);")
+
+        evts = _poll_events(connection, 2)
+
+        assert [evt.id for evt in evts] == [(1, 0), (2, 0)]
+        assert evts == sorted(evts, key=lambda evt: evt.id)
+
+    def test_event_channel(self):
+        assert event.event_channel() == "psycopg2_pgevents_channel"
+        assert event.event_channel("pointofsale") == "pgevents:pointofsale"
+        assert event.event_channel("pointofsale", "orders") == "pgevents:pointofsale.orders"
+
+    def test_event_channel_long_name(self):
+        channel = event.event_channel("a" * 63, "b" * 63)
+
+        assert channel.startswith("pgevents:")
+        assert len(channel) <= 63
+        assert channel == event.event_channel("a" * 63, "b" * 63)
+        assert channel != event.event_channel("a" * 63, "c" * 63)
+
+    def test_event_channel_table_without_schema(self):
+        with raises(ValueError):
+            event.event_channel(table="orders")
+
+    def test_register_event_channels(self, connection):
+        channels = [event.event_channel("public", "settings"), event.event_channel("pointofsale")]
+
+        event.register_event_channel(connection, channels)
+        registered = sorted(row[0] for row in execute(connection, "SELECT pg_listening_channels();"))
+        event.unregister_event_channel(connection, channels[:1])
+        remaining = [row[0] for row in execute(connection, "SELECT pg_listening_channels();")]
+
+        assert registered == ["pgevents:pointofsale", "pgevents:public.settings"]
+        assert remaining == ["pgevents:pointofsale"]
+
+    @mark.parametrize("mode", ["row", "statement", "buffered"])
+    def test_poll_table_channel(self, connection, client, mode):
+        install_trigger_function(connection)
+        install_trigger(connection, "settings", mode=mode, channel="table")
+        install_trigger(connection, "orders", schema="pointofsale", mode=mode, channel="table")
+        event.register_event_channel(connection, [event.event_channel("pointofsale", "orders")])
+
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1);")
+        execute(client, "INSERT INTO pointofsale.orders(description) VALUES('bar');")
+
+        evts = _poll_events(connection, 2, timeout=1.0)
+
+        assert [(evt.schema_name, evt.table_name, evt.row_id) for evt in evts] == [("pointofsale", "orders", 1)]
+
+    def test_poll_schema_channel(self, connection, client):
+        install_trigger_function(connection)
+        install_trigger(connection, "settings", channel="schema")
+        install_trigger(connection, "orders", schema="pointofsale", channel="schema")
+        event.register_event_channel(connection, [event.event_channel("public")])
+
+        execute(client, "INSERT INTO pointofsale.orders(description) VALUES('bar');")
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1);")
+
+        evts = _poll_events(connection, 2, timeout=1.0)
+
+        assert [(evt.schema_name, evt.table_name, evt.row_id) for evt in evts] == [("public", "settings", 1)]
+
+    @mark.usefixtures("event_channel_registered")
+    def test_poll_trigger_without_channel_argument(self, connection, client):
+        install_trigger_function(connection)
+        execute(
+            connection,
+            "CREATE TRIGGER psycopg2_pgevents_trigger AFTER INSERT ON public.settings "
+            "FOR EACH ROW EXECUTE PROCEDURE public.psycopg2_pgevents_create_event();",
+        )
+
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1);")
+
+        evts = _poll_events(connection, 1)
+
+        assert [(evt.table_name, evt.row_id) for evt in evts] == [("settings", 1)]
+
+    @mark.parametrize("mode", ["row", "statement", "buffered"])
+    @mark.usefixtures("event_channel_registered")
+    def test_poll_operations_filter(self, connection, client, mode):
+        install_trigger_function(connection)
+        install_trigger(connection, "settings", mode=mode, operations=["DELETE"])
+
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1), ('bar', 2);")
+        execute(client, "UPDATE public.settings SET value = 3;")
+        execute(client, "DELETE FROM public.settings WHERE key = 'bar';")
+
+        evts = _poll_events(connection, 2, timeout=1.0)
+
+        assert [(evt.type, evt.row_id) for evt in evts] == [("DELETE", 2)]
+
+    @mark.parametrize("mode", ["row", "statement", "buffered"])
+    @mark.usefixtures("event_channel_registered")
+    def test_poll_columns_filter(self, connection, client, mode):
+        install_trigger_function(connection)
+        install_trigger(connection, "settings", mode=mode, operations=["UPDATE"], columns=["value"])
+
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1), ('bar', 2);")
+        execute(client, "UPDATE public.settings SET key = 'baz';")
+        execute(client, "UPDATE public.settings SET value = 3 WHERE key = 'baz' AND value = 2;")
+
+        evts = _poll_events(connection, 2, timeout=1.0)
+
+        assert [(evt.type, evt.row_id) for evt in evts] == [("UPDATE", 2)]
+
+    @mark.parametrize("mode", ["row", "statement", "buffered"])
+    @mark.usefixtures("event_channel_registered")
+    def test_poll_changes_only(self, connection, client, mode):
+        install_trigger_function(connection)
+        install_trigger(connection, "settings", mode=mode, changes_only=True)
+
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1), ('bar', 2);")
+        execute(client, "UPDATE public.settings SET value = value;")
+        execute(client, "UPDATE public.settings SET value = 3 WHERE key = 'bar';")
+        execute(client, "DELETE FROM public.settings WHERE key = 'foo';")
+
+        evts = _poll_events(connection, 5, timeout=1.0)
+
+        assert [(evt.type, evt.row_id) for evt in evts] == [
+            ("INSERT", 1),
+            ("INSERT", 2),
+            ("UPDATE", 2),
+            ("DELETE", 1),
+        ]
+
+    @mark.parametrize("mode", ["row", "statement", "buffered"])
+    @mark.parametrize("options", [{"changes_only": True}, {"data": "diff"}])
+    @mark.usefixtures("event_channel_registered")
+    def test_poll_key_update(self, connection, client, mode, options):
+        install_trigger_function(connection)
+        install_trigger(connection, "settings", mode=mode, operations=["UPDATE"], **options)
+
+        execute(client, "INSERT INTO public.settings(id, key, value) VALUES(1, 'foo', 1), (2, 'bar', 2);")
+        execute(client, "UPDATE public.settings SET id = id + 10;")
+
+        evts = _poll_events(connection, 3)
+
+        assert sorted((evt.type, evt.row_id) for evt in evts) == [("UPDATE", 11), ("UPDATE", 12)]
+
+    def test_event_frompayload_key_types(self):
+        payload = (
+            '[3,"c2d29867-3d0b-d497-9191-18a9d8ee7830","U","public","widget",'
+            '[["6f0dc2e8-8d5e-4d0c-a5a4-0e59e0e0d2f4",1]],"ui"]'
+        )
+
+        evts = event.Event.frompayload(payload)
+
+        assert evts[0].row_id == (UUID("6f0dc2e8-8d5e-4d0c-a5a4-0e59e0e0d2f4"), 1)
+        assert event.Event.frompayload(evts[0].topayload()) == evts
+        assert event.Event.fromjson(evts[0].tojson()) == evts[0]
+
+    @mark.parametrize("mode", ["row", "statement", "buffered"])
+    @mark.usefixtures("event_channel_registered")
+    def test_poll_uuid_key(self, connection, client, mode):
+        execute(connection, "CREATE TABLE public.documents (uid uuid PRIMARY KEY, body text);")
+        install_trigger_function(connection)
+        install_trigger(connection, "documents", mode=mode, changes_only=True)
+        uid = UUID("6f0dc2e8-8d5e-4d0c-a5a4-0e59e0e0d2f4")
+
+        execute(client, "INSERT INTO public.documents(uid, body) VALUES(%s, 'foo');", (str(uid),))
+        execute(client, "UPDATE public.documents SET body = 'bar';")
+
+        evts = _poll_events(connection, 2)
+
+        assert [(evt.type, evt.row_id) for evt in evts] == [("INSERT", uid), ("UPDATE", uid)]
+
+    @mark.parametrize("mode", ["row", "statement", "buffered"])
+    @mark.usefixtures("event_channel_registered")
+    def test_poll_composite_key(self, connection, client, mode):
+        execute(
+            connection,
+            "CREATE TABLE public.order_lines (line int, order_id bigint, sku text, PRIMARY KEY (order_id, line));",
+        )
+        install_trigger_function(connection)
+        install_trigger(connection, "order_lines", mode=mode)
+
+        execute(client, "INSERT INTO public.order_lines VALUES(1, 10000000000, 'a'), (2, 10000000000, 'b');")
+        execute(client, "DELETE FROM public.order_lines WHERE line = 2;")
+
+        evts = _poll_events(connection, 3)
+
+        assert [(evt.type, evt.row_id) for evt in evts] == [
+            ("INSERT", (10000000000, 1)),
+            ("INSERT", (10000000000, 2)),
+            ("DELETE", (10000000000, 2)),
+        ]
+
+    @mark.parametrize("mode", ["row", "statement", "buffered"])
+    @mark.usefixtures("event_channel_registered")
+    def test_poll_explicit_key(self, connection, client, mode):
+        install_trigger_function(connection)
+        install_trigger(connection, "settings", mode=mode, key=["key"])
+
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1);")
+
+        evts = _poll_events(connection, 1)
+
+        assert [(evt.type, evt.row_id) for evt in evts] == [("INSERT", "foo")]
+
+    @mark.parametrize("mode", ["row", "statement", "buffered"])
+    @mark.parametrize("key", [["value"], ["key", "value"]])
+    @mark.usefixtures("event_channel_registered")
+    def test_poll_null_key(self, connection, client, mode, key):
+        install_trigger_function(connection)
+        install_trigger(connection, "settings", mode=mode, key=key)
+
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', NULL);")
+
+        evts = _poll_events(connection, 1)
+
+        assert [evt.row_id for evt in evts] == [None if len(key) == 1 else ("foo", None)]
+
+    def test_event_frompayload_row_data(self):
+        payload = '[3,"c2d29867-3d0b-d497-9191-18a9d8ee7830","U","public","widget",[1,2],"",[{"value":3},null]]'
+
+        evts = event.Event.frompayload(payload)
+
+        assert [(evt.row_id, evt.data) for evt in evts] == [(1, {"value": 3}), (2, None)]
+        assert event.Event.frompayload(evts[0].topayload())[0].data == {"value": 3}
+        assert event.Event.fromjson(evts[0].tojson()).data == {"value": 3}
+
+    @mark.parametrize("mode", ["row", "statement", "buffered"])
+    @mark.usefixtures("event_channel_registered")
+    def test_poll_row_data(self, connection, client, mode):
+        install_trigger_function(connection)
+        install_trigger(connection, "settings", mode=mode, data="row", data_columns=["key", "value"])
+
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1), ('bar', 2);")
+        execute(client, "DELETE FROM public.settings WHERE key = 'foo';")
+
+        evts = _poll_events(connection, 3)
+
+        assert [(evt.type, evt.row_id, evt.data) for evt in evts] == [
+            ("INSERT", 1, {"key": "foo", "value": 1}),
+            ("INSERT", 2, {"key": "bar", "value": 2}),
+            ("DELETE", 1, {"key": "foo", "value": 1}),
+        ]
+
+    @mark.parametrize("mode", ["row", "statement", "buffered"])
+    @mark.usefixtures("event_channel_registered")
+    def test_poll_diff_data(self, connection, client, mode):
+        install_trigger_function(connection)
+        install_trigger(connection, "settings", mode=mode, operations=["UPDATE"], data="diff")
+
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1), ('bar', 2);")
+        execute(client, "UPDATE public.settings SET value = 3 WHERE key = 'foo';")
+        execute(client, "UPDATE public.settings SET key = 'baz', value = value;")
+
+        evts = _poll_events(connection, 3)
+
+        assert [(evt.row_id, evt.data) for evt in evts[:1]] == [(1, {"value": 3})]
+        assert sorted((evt.row_id, evt.data["key"]) for evt in evts[1:]) == [(1, "baz"), (2, "baz")]
+        assert all(list(evt.data) == ["key"] for evt in evts[1:])
+
+    @mark.parametrize("mode", ["statement", "buffered"])
+    @mark.usefixtures("event_channel_registered")
+    def test_poll_packed_long_keys(self, connection, client, mode):
+        install_trigger_function(connection)
+        install_trigger(connection, "settings", mode=mode, key=["key"])
+
+        execute(
+            client,
+            "INSERT INTO public.settings(key, value) SELECT lpad(i::text, 998, 'x'), i FROM generate_series(1, 16) AS i;",
+        )
+        notifies = _wait_for_notifies(connection, 3)
+
+        assert all(len(notify.payload) < 8000 for notify in notifies)
+        assert sum(len(event.Event.frompayload(notify.payload)) for notify in notifies) == 16
+
+    @mark.parametrize("mode", ["row", "statement", "buffered"])
+    @mark.usefixtures("event_channel_registered")
+    def test_poll_oversized_row_data(self, connection, client, mode):
+        install_trigger_function(connection)
+        install_trigger(connection, "settings", mode=mode, data="row")
+
+        execute(
+            client,
+            "INSERT INTO public.settings(key, value) VALUES(repeat('x', 5000), 1), (repeat('y', 5000), 2), ('z', 3);",
+        )
+
+        evts = _poll_events(connection, 3)
+
+        assert [(evt.row_id, evt.data is None) for evt in evts] == [(1, False), (2, False), (3, False)]
+        assert evts[0].data["key"] == "x" * 5000
+
+        execute(client, "UPDATE public.settings SET key = repeat('w', 8000) WHERE id = 3;")
+
+        evts = _poll_events(connection, 1)
+
+        assert [(evt.row_id, evt.data) for evt in evts] == [(3, None)]
@@ -0,0 +1,110 @@
+import functools
+import multiprocessing
+import threading
+
+from pytest import mark, raises
+
+from psycopg2_pgevents.group import ConsumerGroup, shard
+from tests.helpers import FakeSource, make_event
+
+
+def _record(handled, evt):
+    handled.put((evt.table_name, evt.row_id, evt.id))
+
+
+class TestGroup:
+    def test_shard_by_row(self):
+        assert shard(make_event(1, 0), 8) == shard(make_event(1, 5), 8)
+        assert {shard(make_event(row_id), 8) for row_id in range(100)} == set(range(8))
+
+    @mark.parametrize("processes", [False, True])
+    def test_keeps_order_per_row(self, processes):
+        if processes:
+            handled_queue = multiprocessing.Queue()
+            handler = functools.partial(_record, handled_queue)
+        else:
+            handled = []
+            handler = lambda evt: handled.append((evt.table_name, evt.row_id, evt.id))  # noqa: E731
+
+        evts = [make_event(minor % 10, minor) for minor in range(200)]
+        with ConsumerGroup(handler, workers=4, processes=processes) as group:
+            group.dispatch(evts[:100])
+            group.dispatch(evts[100:])
+
+        if processes:
+            handled = [handled_queue.get(timeout=5) for _ in evts]
+
+        assert sorted(handled) == sorted((evt.table_name, evt.row_id, evt.id) for evt in evts)
+        for row_id in range(10):
+            minors = [id_[1] for _table, handled_row_id, id_ in handled if handled_row_id == row_id]
+            assert minors == sorted(minors)
+
+    def test_run_source(self):
+        handled = []
+        source = FakeSource([[make_event(1, 0), make_event(2, 1)], [], [make_event(1, 2)]])
+
+        with ConsumerGroup(handled.append, workers=2) as group:
+            group.run(source)
+
+        assert sorted(evt.id for evt in handled) == [(1, 0), (1, 1), (1, 2)]
+
+    def test_backpressure(self):
+        started = threading.Event()
+        release = threading.Event()
+        dispatched = threading.Event()
+
+        def handler(evt):
+            started.set()
+            release.wait()
+
+        def dispatch():
+            group.dispatch([make_event(3)])
+            dispatched.set()
+
+        group = ConsumerGroup(handler, workers=1, max_pending=1)
+
+        # The first batch is taken by the worker, the second fills its queue
+        group.dispatch([make_event(1)])
+        assert started.wait(5)
+        group.dispatch([make_event(2)])
+
+        dispatcher = threading.Thread(target=dispatch)
+        dispatcher.start()
+        blocked = not dispatched.wait(0.3)
+
+        release.set()
+        unblocked = dispatched.wait(5)
+        dispatcher.join()
+        group.close()
+
+        assert blocked
+        assert unblocked
+
+    def test_handler_errors_do_not_stop_workers(self):
+        handled = []
+
+        def handler(evt):
+            if evt.row_id == 1:
+                raise RuntimeError("boom")
+            handled.append(evt.row_id)
+
+        with ConsumerGroup(handler, workers=1) as group:
+            group.dispatch([make_event(1), make_event(2)])
+
+        assert handled == [2]
+
+    def test_close_drains_and_rejects(self):
+        handled = []
+        group = ConsumerGroup(handled.append, workers=3)
+        group.dispatch(make_event(row_id) for row_id in range(50))
+        group.close()
+
+        assert len(handled) == 50
+        assert group.closed
+        with raises(ValueError):
+            group.dispatch([make_event(1)])
+
+    @mark.parametrize("options", [{"workers": 0}, {"max_pending": 0}])
+    def test_invalid_options(self, options):
+        with raises(ValueError):
+            ConsumerGroup(print, **options)
@@ -0,0 +1,112 @@
+from uuid import UUID
+
+from pytest import fixture, raises
+
+from psycopg2_pgevents import hydrate
+from psycopg2_pgevents.event import Event, poll, register_event_channel
+from psycopg2_pgevents.sql import execute
+from psycopg2_pgevents.trigger import install_trigger, install_trigger_function
+
+
+def _event(type_, table, row_id, schema="public"):
+    return Event("c2d29867-3d0b-d497-9191-18a9d8ee7830", type_, schema, table, row_id)
+
+
+@fixture
+def settings(connection):
+    execute(connection, "INSERT INTO public.settings(id, key, value) VALUES(1, 'foo', 1), (2, 'bar', 2);")
+    execute(connection, "INSERT INTO pointofsale.orders(id, description) VALUES(1, 'baz');")
+
+
+class TestHydrate:
+    def test_hydrate(self, connection, settings):
+        evts = [
+            _event("INSERT", "settings", 1),
+            _event("INSERT", "orders", 1, schema="pointofsale"),
+            _event("UPDATE", "settings", 2),
+            _event("DELETE", "settings", 3),
+            _event("UPDATE", "settings", 4),
+        ]
+
+        result = list(hydrate.hydrate_events(connection, evts))
+
+        assert result == [
+            (evts[0], {"id": 1, "key": "foo", "value": 1}),
+            (evts[1], {"id": 1, "description": "baz"}),
+            (evts[2], {"id": 2, "key": "bar", "value": 2}),
+            (evts[3], None),
+            (evts[4], None),
+        ]
+
+    def test_hydrate_one_query_per_table(self, connection, settings, monkeypatch):
+        statements = []
+        original_execute = hydrate.execute
+
+        def counting_execute(*args, **kwargs):
+            statements.append(args[1])
+            return original_execute(*args, **kwargs)
+
+        monkeypatch.setattr(hydrate, "execute", counting_execute)
+        hydrator = hydrate.RowHydrator(connection)
+        list(hydrator.hydrate([_event("INSERT", "settings", 1)]))
+        del statements[:]
+
+        evts = [_event("UPDATE", "settings", row_id) for row_id in [1, 2, 1, 2, 1]]
+        evts.append(_event("INSERT", "orders", 1, schema="pointofsale"))
+        result = list(hydrator.hydrate(evts))
+
+        assert len(statements) == 2
+        assert [row["id"] for _, row in result] == [1, 2, 1, 2, 1, 1]
+
+    def test_hydrate_columns(self, connection, settings):
+        result = list(hydrate.hydrate_events(connection, [_event("INSERT", "settings", 2)], columns=["value"]))
+
+        assert [row for _, row in result] == [{"value": 2}]
+
+    def test_hydrate_typed_keys(self, connection):
+        uid = UUID("6f0dc2e8-8d5e-4d0c-a5a4-0e59e0e0d2f4")
+        execute(connection, "CREATE TABLE public.documents (uid uuid PRIMARY KEY, body text);")
+        execute(
+            connection, "CREATE TABLE public.order_lines (line int, order_id bigint, PRIMARY KEY (order_id, line));"
+        )
+        execute(connection, "INSERT INTO public.documents VALUES(%s, 'foo');", (str(uid),))
+        execute(connection, "INSERT INTO public.order_lines VALUES(1, 10000000000), (2, 10000000000);")
+
+        result = list(
+            hydrate.hydrate_events(
+                connection, [_event("INSERT", "documents", uid), _event("INSERT", "order_lines", (10000000000, 2))],
+            )
+        )
+
+        assert [row for _, row in result] == [
+            {"uid": str(uid), "body": "foo"},
+            {"line": 2, "order_id": 10000000000},
+        ]
+
+    def test_hydrate_keys_encoded_by_triggers(self, connection, client):
+        execute(connection, "CREATE TABLE public.readings (taken_at timestamp, amount numeric(6, 2), value int);")
+        execute(connection, "ALTER TABLE public.readings ADD PRIMARY KEY (taken_at, amount);")
+        install_trigger_function(connection)
+        install_trigger(connection, "readings")
+        register_event_channel(connection)
+
+        execute(client, "INSERT INTO public.readings VALUES('2020-01-01 10:00:00', 10, 1);")
+        evts = list(poll(connection))
+
+        result = list(hydrate.hydrate_events(connection, evts))
+
+        assert [evt.row_id for evt in evts] == [("2020-01-01T10:00:00", 10.0)]
+        assert [row["value"] for _, row in result] == [1]
+
+    def test_hydrate_explicit_key(self, connection, settings):
+        hydrator = hydrate.RowHydrator(connection, keys={("public", "settings"): ["key"]})
+
+        result = list(hydrator.hydrate([_event("UPDATE", "settings", "bar")]))
+
+        assert [row for _, row in result] == [{"id": 2, "key": "bar", "value": 2}]
+
+    def test_hydrate_missing_key(self, connection):
+        execute(connection, "CREATE TABLE public.notes (body text);")
+
+        with raises(ValueError):
+            list(hydrate.hydrate_events(connection, [_event("INSERT", "notes", 1)]))
@@ -0,0 +1,235 @@
+import json
+import struct
+from types import SimpleNamespace
+from uuid import UUID
+
+from psycopg2 import connect
+from psycopg2.extras import LogicalReplicationConnection
+from pytest import fixture, mark, raises, skip
+
+from psycopg2_pgevents.event import poll, register_event_channel
+from psycopg2_pgevents.logical import (
+    LogicalEventSource,
+    _PgOutputDecoder,
+    _Wal2JsonDecoder,
+    create_replication_slot,
+)
+from psycopg2_pgevents.sql import execute
+from psycopg2_pgevents.trigger import install_trigger, install_trigger_function
+from tests.conftest import TEST_DATABASE_DSN
+
+WORKLOAD = [
+    "INSERT INTO public.settings(key, value) VALUES('foo', 1), ('bar', 2);",
+    "INSERT INTO pointofsale.orders(description) VALUES('baz');",
+    "UPDATE public.settings SET value = 3 WHERE key = 'foo';",
+    "DELETE FROM public.settings WHERE key = 'bar';",
+]
+
+
+def _string(value):
+    return value.encode() + b"\0"
+
+
+def _tuple(*values):
+    encoded = struct.pack("!H", len(values))
+    for value in values:
+        if value is None:
+            encoded += b"n"
+        else:
+            encoded += b"t" + struct.pack("!i", len(value.encode())) + value.encode()
+    return encoded
+
+
+def _relation(oid, schema, table, columns):
+    encoded = b"R" + struct.pack("!I", oid) + _string(schema) + _string(table) + b"d" + struct.pack("!H", len(columns))
+    for name, type_oid, key in columns:
+        encoded += struct.pack("!B", 1 if key else 0) + _string(name) + struct.pack("!Ii", type_oid, -1)
+    return encoded
+
+
+def _begin(xid):
+    return b"B" + struct.pack("!QqI", 100, 0, xid)
+
+
+class FakeCursor:
+    """Stand-in for a replication cursor, returning a predefined sequence of wal2json messages."""
+
+    def __init__(self, messages):
+        self.messages = [
+            SimpleNamespace(data_start=data_start, payload=json.dumps(change)) for data_start, change in messages
+        ]
+        self.feedback = []
+
+    def start_replication(self, slot_name, decode, options):
+        pass
+
+    def read_message(self):
+        return self.messages.pop(0) if self.messages else None
+
+    def send_feedback(self, flush_lsn):
+        self.feedback.append(flush_lsn)
+
+
+def _insert(row_id):
+    return {
+        "action": "I",
+        "schema": "public",
+        "table": "settings",
+        "columns": [{"name": "id", "type": "integer", "value": row_id}],
+        "pk": [{"name": "id", "type": "integer"}],
+    }
+
+
+@fixture
+def replication(connection):
+    wal_level = execute(connection, "SHOW wal_level;")[0][0]
+    if wal_level != "logical":
+        skip("Logical decoding requires wal_level = logical")
+
+    conn = connect(dsn=TEST_DATABASE_DSN, password="postgres", connection_factory=LogicalReplicationConnection)
+    try:
+        create_replication_slot(conn, "pgevents_test")
+    except Exception as e:
+        conn.close()
+        skip("wal2json is not available: {}".format(e))
+
+    yield conn
+
+    conn.close()
+    execute(connection, "SELECT pg_drop_replication_slot('pgevents_test');")
+
+
+class TestLogical:
+    def test_wal2json_decoder(self):
+        decoder = _Wal2JsonDecoder(None)
+        changes = [
+            (10, {"action": "B"}),
+            (
+                11,
+                {
+                    "action": "I",
+                    "schema": "public",
+                    "table": "settings",
+                    "columns": [
+                        {"name": "id", "type": "integer", "value": 1},
+                        {"name": "key", "type": "character varying", "value": "foo"},
+                    ],
+                    "pk": [{"name": "id", "type": "integer"}],
+                },
+            ),
+            (
+                12,
+                {
+                    "action": "D",
+                    "schema": "public",
+                    "table": "tokens",
+                    "identity": [
+                        {"name": "tenant", "type": "text", "value": "acme"},
+                        {"name": "token", "type": "uuid", "value": "c2d29867-3d0b-d497-9191-18a9d8ee7830"},
+                    ],
+                    "pk": [{"name": "tenant", "type": "text"}, {"name": "token", "type": "uuid"}],
+                },
+            ),
+            (13, {"action": "C"}),
+        ]
+
+        evts = [evt for data_start, change in changes for evt in decoder.decode(data_start, json.dumps(change))]
+
+        assert [(evt.id, evt.type, evt.schema_name, evt.table_name, evt.row_id) for evt in evts] == [
+            ((10, 0), "INSERT", "public", "settings", 1),
+            ((10, 1), "DELETE", "public", "tokens", ("acme", UUID("c2d29867-3d0b-d497-9191-18a9d8ee7830"))),
+        ]
+
+    def test_wal2json_tables(self):
+        decoder = _Wal2JsonDecoder([("public", "settings"), ("pointofsale", "order.lines")])
+
+        assert decoder.options["add-tables"] == "public.settings,pointofsale.order\\.lines"
+
+    def test_pgoutput_decoder(self):
+        decoder = _PgOutputDecoder("pgevents")
+        messages = [
+            (20, _begin(7)),
+            (21, _relation(1000, "public", "settings", [("id", 23, True), ("key", 1043, False)])),
+            (22, b"I" + struct.pack("!I", 1000) + b"N" + _tuple("1", "foo")),
+            (23, b"U" + struct.pack("!I", 1000) + b"K" + _tuple("1", None) + b"N" + _tuple("2", "foo")),
+            (24, b"D" + struct.pack("!I", 1000) + b"K" + _tuple("2", None)),
+            (25, b"C" + b"\0" * 25),
+        ]
+
+        evts = [evt for data_start, message in messages for evt in decoder.decode(data_start, message)]
+
+        assert [(evt.id, evt.type, evt.table_name, evt.row_id) for evt in evts] == [
+            ((20, 0), "INSERT", "settings", 1),
+            ((20, 1), "UPDATE", "settings", 2),
+            ((20, 2), "DELETE", "settings", 2),
+        ]
+
+    def test_ack_events_yielded(self):
+        cursor = FakeCursor(
+            [(10, {"action": "B"}), (11, _insert(1)), (12, _insert(2)), (13, {"action": "C"}), (20, {"action": "B"})]
+        )
+        source = LogicalEventSource(SimpleNamespace(cursor=lambda: cursor), "pgevents", timeout=0)
+
+        evts = iter(source)
+        assert next(evts).row_id == 1
+        source.ack()
+        assert next(evts).row_id == 2
+        source.ack()
+
+        # The commit of the transaction is only acknowledged once the next
+        # event is requested, as its last event has then been handled
+        source.close()
+        assert list(evts) == []
+        source.ack()
+
+        assert cursor.feedback == [11, 12, 20]
+
+    def test_ack_poll_batch(self):
+        cursor = FakeCursor([(10, {"action": "B"}), (11, _insert(1)), (12, _insert(2)), (13, {"action": "C"})])
+        source = LogicalEventSource(SimpleNamespace(cursor=lambda: cursor), "pgevents", timeout=0)
+
+        assert [evt.row_id for evt in source.poll()] == [1, 2]
+        source.ack()
+
+        assert cursor.feedback == [13]
+
+    @mark.parametrize(
+        "options",
+        [
+            {"plugin": "test_decoding"},
+            {"plugin": "pgoutput"},
+            {"plugin": "pgoutput", "publication": "pgevents", "tables": [("public", "settings")]},
+            {"plugin": "wal2json", "publication": "pgevents"},
+        ],
+    )
+    def test_invalid_options(self, options):
+        with raises(ValueError):
+            LogicalEventSource(None, "pgevents", **options)
+
+    def test_same_events_as_triggers(self, connection, client, replication):
+        install_trigger_function(connection)
+        install_trigger(connection, "settings")
+        install_trigger(connection, "orders", schema="pointofsale")
+        register_event_channel(connection)
+
+        for statement in WORKLOAD:
+            execute(client, statement)
+
+        trigger_evts = []
+        for _ in range(10):
+            trigger_evts.extend(poll(connection, timeout=0.1))
+
+        with LogicalEventSource(replication, "pgevents_test", timeout=0.5) as source:
+            logical_evts = []
+            while len(logical_evts) < len(trigger_evts):
+                evts = source.poll()
+                if not evts:
+                    break
+                logical_evts.extend(evts)
+            source.ack()
+
+        def summary(evts):
+            return [(evt.type, evt.schema_name, evt.table_name, evt.row_id) for evt in evts]
+
+        assert len(trigger_evts) == 5
+        assert summary(logical_evts) == summary(trigger_evts)
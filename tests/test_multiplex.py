@@ -0,0 +1,157 @@
+import socket
+
+from psycopg2 import connect
+from psycopg2.extensions import Notify
+from pytest import fixture, mark, raises
+
+from psycopg2_pgevents.event import Event, register_event_channel
+from psycopg2_pgevents.multiplex import EventMultiplexer
+from psycopg2_pgevents.sql import execute
+from psycopg2_pgevents.trigger import install_trigger, install_trigger_function
+from tests.conftest import TEST_DATABASE_DSN
+
+
+@fixture
+def triggers_installed(connection):
+    install_trigger_function(connection)
+    install_trigger(connection, "settings")
+    install_trigger(connection, "orders", schema="pointofsale")
+
+
+@fixture
+def listeners(connection):
+    others = [connect(dsn=TEST_DATABASE_DSN, password="postgres") for _ in range(2)]
+    conns = [connection] + others
+    for conn in conns:
+        conn.autocommit = True
+        register_event_channel(conn)
+
+    yield conns
+
+    for conn in others:
+        conn.close()
+
+
+class BrokenConnection:
+    def __init__(self):
+        self._reader, self._writer = socket.socketpair()
+        self._writer.send(b"x")
+        self.notifies = []
+        self.dsn = "broken"
+
+    def fileno(self):
+        return self._reader.fileno()
+
+    def poll(self):
+        raise OSError("connection lost")
+
+    def close(self):
+        self._reader.close()
+        self._writer.close()
+
+
+def _poll_events(mux, count, polls=50):
+    evts = []
+    for _ in range(polls):
+        if len(evts) >= count:
+            break
+        evts.extend(mux.poll(timeout=0.1))
+    return evts
+
+
+class TestMultiplex:
+    @mark.usefixtures("triggers_installed")
+    def test_multiplex_tags_sources(self, listeners, client):
+        with EventMultiplexer() as mux:
+            for index, conn in enumerate(listeners):
+                mux.add(conn, source="shard{}".format(index))
+
+            execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1);")
+
+            evts = _poll_events(mux, 3)
+
+        assert sorted(evt.source for evt in evts) == ["shard0", "shard1", "shard2"]
+        assert {(evt.type, evt.table_name, evt.row_id) for evt in evts} == {("INSERT", "settings", 1)}
+
+    @mark.usefixtures("triggers_installed")
+    def test_multiplex_default_source(self, listeners, client):
+        with EventMultiplexer(listeners[:1]) as mux:
+            execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1);")
+
+            evts = _poll_events(mux, 1)
+
+        assert [evt.source for evt in evts] == [listeners[0].dsn]
+
+    @mark.usefixtures("triggers_installed")
+    def test_multiplex_add_remove(self, listeners, client):
+        first, second, _ = listeners
+
+        with EventMultiplexer() as mux:
+            mux.add(first, source="first")
+            execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1);")
+            evts = _poll_events(mux, 1)
+
+            mux.add(second, source="second")
+            mux.remove(first)
+            assert mux.connections == [second]
+
+            execute(client, "INSERT INTO public.settings(key, value) VALUES('bar', 2);")
+            evts.extend(_poll_events(mux, 2))
+
+        # The second connection was already listening when the first row was inserted
+        assert [(evt.source, evt.row_id) for evt in evts] == [("first", 1), ("second", 1), ("second", 2)]
+
+    def test_multiplex_add_twice(self, connection):
+        with EventMultiplexer([connection]) as mux:
+            with raises(ValueError):
+                mux.add(connection)
+
+    def test_multiplex_remove_unknown(self, connection):
+        with EventMultiplexer() as mux:
+            with raises(ValueError):
+                mux.remove(connection)
+
+    def test_multiplex_pending_notifies(self, connection):
+        payload = Event("c2d29867-3d0b-d497-9191-18a9d8ee7830", "INSERT", "public", "widget", 1).tojson()
+        connection.notifies.append(Notify(0, "psycopg2_pgevents_channel", payload))
+
+        with EventMultiplexer() as mux:
+            mux.add(connection, source="db")
+            evts = mux.poll(timeout=0.0)
+
+        assert [(evt.source, evt.row_id) for evt in evts] == [("db", 1)]
+
+    @mark.usefixtures("triggers_installed")
+    def test_multiplex_broken_connection(self, listeners, client):
+        broken = BrokenConnection()
+        try:
+            with EventMultiplexer() as mux:
+                mux.add(listeners[0], source="db")
+                mux.add(broken)
+
+                execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1);")
+
+                with raises(OSError):
+                    for _ in range(50):
+                        mux.poll(timeout=0.1)
+
+                assert mux.connections == [listeners[0]]
+                evts = _poll_events(mux, 1)
+        finally:
+            broken.close()
+
+        assert [(evt.source, evt.row_id) for evt in evts] == [("db", 1)]
+
+    @mark.usefixtures("triggers_installed")
+    def test_multiplex_close(self, listeners, client):
+        mux = EventMultiplexer(listeners, timeout=0.1)
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1);")
+
+        evts = []
+        for evt in mux:
+            evts.append(evt)
+            mux.close()
+
+        assert mux.closed
+        assert mux.connections == []
+        assert len(evts) >= 1
@@ -0,0 +1,187 @@
+from pytest import fixture, mark, raises
+
+from psycopg2_pgevents.event import register_event_channel
+from psycopg2_pgevents.outbox import (
+    START_POSITION,
+    OutboxConsumer,
+    acknowledge,
+    maintain_outbox,
+    outbox_position,
+    read_outbox,
+)
+from psycopg2_pgevents.sql import execute
+from psycopg2_pgevents.trigger import (
+    install_trigger,
+    install_trigger_function,
+    uninstall_trigger_function,
+)
+
+
+@fixture
+def outbox_installed(connection):
+    install_trigger_function(connection, outbox=True)
+    install_trigger(connection, "settings")
+    install_trigger(connection, "orders", schema="pointofsale", mode="statement")
+
+
+def _partitions(connection):
+    statement = """
+    SELECT
+        c.relname
+    FROM
+        pg_catalog.pg_inherits i
+        JOIN pg_catalog.pg_class c ON c.oid = i.inhrelid
+    WHERE
+        i.inhparent = 'public.pgevents_outbox'::regclass
+    ORDER BY
+        c.relname;
+    """
+    return [row[0] for row in execute(connection, statement) or []]
+
+
+class TestOutbox:
+    @mark.usefixtures("outbox_installed")
+    def test_events_written_to_outbox(self, connection, client):
+        register_event_channel(connection)
+
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1), ('bar', 2);")
+        execute(client, "INSERT INTO pointofsale.orders(description) VALUES('baz'), ('qux');")
+
+        batch = read_outbox(connection)
+
+        assert [(evt.type, evt.table_name, evt.row_id) for evt in batch.events] == [
+            ("INSERT", "settings", 1),
+            ("INSERT", "settings", 2),
+            ("INSERT", "orders", 1),
+            ("INSERT", "orders", 2),
+        ]
+        assert batch.position > START_POSITION
+
+        # Notifications only carry wakeup hints, on their own channel
+        connection.poll()
+        assert connection.notifies == []
+
+    @mark.usefixtures("outbox_installed")
+    def test_read_outbox_by_position(self, connection, client):
+        for value in range(5):
+            execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', %s);", (value,))
+
+        first = read_outbox(connection, limit=2)
+        second = read_outbox(connection, first.position, limit=10)
+        third = read_outbox(connection, second.position)
+
+        assert [evt.row_id for evt in first.events] == [1, 2]
+        assert [evt.row_id for evt in second.events] == [3, 4, 5]
+        assert third == (second.position, [], [])
+
+    @mark.usefixtures("outbox_installed")
+    def test_read_outbox_holds_back_open_transactions(self, connection, client):
+        client.autocommit = False
+        try:
+            with client.cursor() as cursor:
+                cursor.execute("SELECT txid_current();")
+            execute(connection, "INSERT INTO public.settings(key, value) VALUES('foo', 1);")
+
+            # The open transaction is older than the insert, and may still
+            # write events that sort before it
+            held_back = read_outbox(connection)
+        finally:
+            client.rollback()
+            client.autocommit = True
+
+        assert held_back.events == []
+        assert [evt.row_id for evt in read_outbox(connection).events] == [1]
+
+    @mark.usefixtures("outbox_installed")
+    def test_acknowledge(self, connection):
+        assert outbox_position(connection, "indexer") == START_POSITION
+
+        acknowledge(connection, "indexer", (10, 3))
+        acknowledge(connection, "indexer", (9, 7))
+
+        assert outbox_position(connection, "indexer") == (10, 3)
+
+    @mark.usefixtures("outbox_installed")
+    def test_consumer_resumes_from_acknowledged_position(self, connection, client):
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1), ('bar', 2);")
+
+        with OutboxConsumer(connection, "indexer", timeout=0) as consumer:
+            assert [evt.row_id for evt in consumer.poll()] == [1, 2]
+            consumer.ack()
+
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('baz', 3);")
+
+        with OutboxConsumer(connection, "indexer", timeout=0) as consumer:
+            assert [evt.row_id for evt in consumer.poll()] == [3]
+
+        # Events that were never acknowledged are read again
+        with OutboxConsumer(connection, "indexer", timeout=0) as consumer:
+            assert [evt.row_id for evt in consumer.poll()] == [3]
+
+    @mark.usefixtures("outbox_installed")
+    def test_consumer_acknowledges_events_yielded(self, connection, client):
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1), ('bar', 2), ('baz', 3);")
+
+        with OutboxConsumer(connection, "indexer", timeout=0) as consumer:
+            for evt in consumer:
+                consumer.ack()
+                break
+
+        assert evt.row_id == 1
+
+        # The rest of the batch was never handled, so it is read again
+        with OutboxConsumer(connection, "indexer", timeout=0) as consumer:
+            assert [evt.row_id for evt in consumer.poll()] == [2, 3]
+
+    @mark.usefixtures("outbox_installed")
+    def test_consumer_acknowledges_packed_rows_once_handled(self, connection, client):
+        # The statement-level trigger packs both events into a single row
+        execute(client, "INSERT INTO pointofsale.orders(description) VALUES('foo'), ('bar');")
+
+        with OutboxConsumer(connection, "indexer", timeout=0) as consumer:
+            for evt in consumer:
+                consumer.ack()
+                break
+
+        with OutboxConsumer(connection, "indexer", timeout=0) as consumer:
+            assert [evt.row_id for evt in consumer.poll()] == [1, 2]
+
+    @mark.usefixtures("outbox_installed")
+    def test_consumer_wakes_up_on_hint(self, connection, client):
+        with OutboxConsumer(connection, "indexer") as consumer:
+            assert consumer.poll(timeout=0) == []
+
+            execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1);")
+
+            assert [evt.row_id for evt in consumer.poll(timeout=5)] == [1]
+
+    @mark.usefixtures("outbox_installed")
+    def test_maintain_outbox_drops_acknowledged_partitions(self, connection, client):
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1);")
+        before = _partitions(connection)
+
+        # Nothing is dropped until a consumer has acknowledged events
+        assert maintain_outbox(connection, partitions_ahead=1) == 0
+
+        acknowledge(connection, "indexer", (2 ** 62, 0))
+        dropped = maintain_outbox(connection, partitions_ahead=1)
+
+        # All but the default partition are dropped, and the current one created anew
+        assert dropped == len(before) - 1
+        assert len(_partitions(connection)) == 2
+        assert read_outbox(connection).events == []
+
+    @mark.parametrize("options", [{"partition_size": 0}, {"partitions_ahead": 0}])
+    def test_maintain_outbox_invalid_options(self, options):
+        with raises(ValueError):
+            maintain_outbox(None, **options)
+
+    def test_read_outbox_invalid_limit(self):
+        with raises(ValueError):
+            read_outbox(None, limit=0)
+
+    @mark.usefixtures("outbox_installed")
+    def test_uninstall_drops_outbox(self, connection):
+        uninstall_trigger_function(connection, force=True)
+
+        assert not execute(connection, "SELECT to_regclass('public.pgevents_outbox');")[0][0]
@@ -1,6 +1,35 @@
-from psycopg2 import ProgrammingError
+from psycopg2 import DataError, ProgrammingError
+from psycopg2.extensions import STATUS_READY
+from pytest import fixture
 
-from psycopg2_pgevents.sql import execute
+from psycopg2_pgevents import sql
+from psycopg2_pgevents.sql import execute, execute_prepared
+
+SELECT_SETTING_STATEMENT = "SELECT setting FROM pg_settings WHERE name = $1;"
+
+
+@fixture
+def transactional_connection(connection):
+    connection.autocommit = False
+    yield connection
+    connection.rollback()
+    connection.autocommit = True
+
+
+def _counting_execute(monkeypatch):
+    statements = []
+    cursor_execute = sql.Psycopg2Cursor.execute
+
+    def counting_execute(self, query, args=None):
+        statements.append(query)
+        return cursor_execute(self, query, args)
+
+    monkeypatch.setattr(sql.Psycopg2Cursor, "execute", counting_execute)
+    return statements
+
+
+def _prepared_statements(connection):
+    return execute(connection, "SELECT name FROM pg_prepared_statements ORDER BY name;") or []
 
 
 class TestSql:
@@ -23,3 +52,104 @@ class TestSql:
         results = execute(connection, "SELECT * FROM information_schema.triggers;")
 
         assert results is None
+
+    def test_execute_args(self, connection):
+        results = execute(connection, "SELECT %s, %s;", ("foo", 1))
+
+        assert results == [("foo", 1)]
+
+    def test_execute_skips_mogrify_without_debug(self, connection, monkeypatch):
+        def mogrify(self, query, args=None):
+            raise AssertionError("mogrify called")
+
+        monkeypatch.setattr(sql.Psycopg2Cursor, "mogrify", mogrify)
+
+        assert execute(connection, "SELECT %s;", (1,)) == [(1,)]
+
+    def test_execute_prepared(self, connection):
+        first = execute_prepared(connection, "select_setting", SELECT_SETTING_STATEMENT, ("client_encoding",))
+        second = execute_prepared(connection, "select_setting", SELECT_SETTING_STATEMENT, ("client_encoding",))
+
+        assert first == second == [("UTF8",)]
+        assert _prepared_statements(connection) == [("select_setting",)]
+
+    def test_execute_prepared_no_args(self, connection):
+        results = execute_prepared(connection, "select_one", "SELECT 1;")
+
+        assert results == [(1,)]
+
+    def test_execute_prepared_after_deallocate(self, connection):
+        execute_prepared(connection, "select_setting", SELECT_SETTING_STATEMENT, ("client_encoding",))
+        execute(connection, "DEALLOCATE ALL;")
+
+        results = execute_prepared(connection, "select_setting", SELECT_SETTING_STATEMENT, ("client_encoding",))
+
+        assert results == [("UTF8",)]
+        assert _prepared_statements(connection) == [("select_setting",)]
+
+    def test_execute_prepared_after_failed_first_execution(self, connection):
+        division_error_raised = False
+        try:
+            execute_prepared(connection, "select_inverse", "SELECT 1 / $1::integer;", (0,))
+        except DataError:
+            division_error_raised = True
+
+        results = execute_prepared(connection, "select_inverse", "SELECT 1 / $1::integer;", (1,))
+
+        assert division_error_raised
+        assert results == [(1,)]
+        assert _prepared_statements(connection) == [("select_inverse",)]
+
+    def test_execute_prepared_after_failed_first_execution_transaction(self, transactional_connection):
+        division_error_raised = False
+        try:
+            execute_prepared(transactional_connection, "select_inverse", "SELECT 1 / $1::integer;", (0,))
+        except DataError:
+            division_error_raised = True
+
+        results = execute_prepared(transactional_connection, "select_inverse", "SELECT 1 / $1::integer;", (1,))
+
+        assert division_error_raised
+        assert results == [(1,)]
+        assert transactional_connection.status == STATUS_READY
+
+    def test_execute_prepared_single_round_trip(self, connection, monkeypatch):
+        statements = _counting_execute(monkeypatch)
+
+        execute_prepared(connection, "select_setting", SELECT_SETTING_STATEMENT, ("client_encoding",))
+        execute_prepared(connection, "select_setting", SELECT_SETTING_STATEMENT, ("client_encoding",))
+
+        assert len(statements) == 2
+
+    def test_execute_transaction(self, transactional_connection):
+        execute(transactional_connection, "CREATE TABLE foo (id integer);")
+
+        assert transactional_connection.status == STATUS_READY
+        assert execute(transactional_connection, "SELECT to_regclass('foo') IS NOT NULL;") == [(True,)]
+
+    def test_execute_autocommit_opt_in(self, transactional_connection):
+        execute(transactional_connection, "CREATE TABLE foo (id integer);", autocommit=True)
+
+        assert transactional_connection.status == STATUS_READY
+        assert not transactional_connection.autocommit
+        assert execute(transactional_connection, "SELECT to_regclass('foo') IS NOT NULL;") == [(True,)]
+
+    def test_execute_autocommit_opt_in_is_atomic(self, transactional_connection):
+        try:
+            execute(transactional_connection, "CREATE TABLE foo (id integer); SELECT 1/0;", autocommit=True)
+        except Exception:
+            pass
+
+        assert not transactional_connection.autocommit
+        assert execute(transactional_connection, "SELECT to_regclass('foo') IS NULL;") == [(True,)]
+
+    def test_execute_autocommit_opt_in_during_transaction(self, transactional_connection):
+        with transactional_connection.cursor() as cursor:
+            cursor.execute("CREATE TABLE foo (id integer);")
+
+        execute(transactional_connection, "SELECT 1;", autocommit=True)
+
+        # The transaction in progress is completed, as without the opt-in
+        assert transactional_connection.status == STATUS_READY
+        assert not transactional_connection.autocommit
+        assert execute(transactional_connection, "SELECT to_regclass('foo') IS NOT NULL;") == [(True,)]
@@ -0,0 +1,97 @@
+import time
+from itertools import islice
+from threading import Timer
+
+from pytest import fixture, mark
+
+from psycopg2_pgevents.event import register_event_channel
+from psycopg2_pgevents.sql import execute
+from psycopg2_pgevents.stream import EventStream, listen_forever
+from psycopg2_pgevents.trigger import install_trigger, install_trigger_function
+
+
+@fixture
+def event_channel_registered(connection):
+    register_event_channel(connection)
+
+
+@fixture
+def triggers_installed(connection):
+    install_trigger_function(connection)
+    install_trigger(connection, "settings")
+    install_trigger(connection, "orders", schema="pointofsale")
+
+
+def _listening_channels(connection):
+    return [row[0] for row in execute(connection, "SELECT pg_listening_channels();") or []]
+
+
+class TestStream:
+    @mark.usefixtures("triggers_installed", "event_channel_registered")
+    def test_stream_poll_timeout(self, connection):
+        with EventStream(connection) as stream:
+            start = time.monotonic()
+            evts = stream.poll(timeout=0.2)
+
+            assert evts == []
+            assert time.monotonic() - start >= 0.2
+
+    @mark.usefixtures("triggers_installed", "event_channel_registered")
+    def test_stream_iterates_across_wakeups(self, connection, client):
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1);")
+
+        with EventStream(connection, timeout=0.1) as stream:
+            evts = []
+            for evt in stream:
+                evts.append(evt)
+                if len(evts) == 1:
+                    execute(client, "INSERT INTO pointofsale.orders(description) VALUES('bar');")
+                    execute(client, "DELETE FROM public.settings;")
+                elif len(evts) == 3:
+                    break
+
+        assert [(evt.type, evt.table_name) for evt in evts] == [
+            ("INSERT", "settings"),
+            ("INSERT", "orders"),
+            ("DELETE", "settings"),
+        ]
+
+    @mark.usefixtures("triggers_installed", "event_channel_registered")
+    def test_stream_drains_burst(self, connection, client):
+        execute(client, "INSERT INTO public.settings(key, value) SELECT 'foo', n FROM generate_series(1, 2000) AS n;")
+
+        with EventStream(connection) as stream:
+            evts = list(islice(stream, 2000))
+
+        assert [evt.row_id for evt in evts] == list(range(1, 2001))
+
+    @mark.usefixtures("triggers_installed", "event_channel_registered")
+    def test_stream_close(self, connection, client):
+        execute(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1), ('bar', 2);")
+
+        stream = EventStream(connection, timeout=0.1)
+        evts = []
+        for evt in stream:
+            evts.append(evt)
+            stream.close()
+
+        assert stream.closed
+        assert len(evts) == 2
+
+    @mark.usefixtures("triggers_installed")
+    def test_listen_forever(self, connection, client):
+        # Write once the listener has had time to register the event channel
+        writer = Timer(0.5, execute, args=(client, "INSERT INTO public.settings(key, value) VALUES('foo', 1);"))
+        writer.start()
+
+        listener = listen_forever(connection, timeout=0.1)
+        try:
+            evt = next(listener)
+            channels = _listening_channels(connection)
+        finally:
+            listener.close()
+            writer.join()
+
+        assert evt.type == "INSERT"
+        assert channels == ["psycopg2_pgevents_channel"]
+        assert _listening_channels(connection) == []
@@ -1,8 +1,10 @@
+import time
+
 from psycopg2 import InternalError, ProgrammingError
-from pytest import fixture, mark
+from pytest import fixture, mark, raises
 
 from psycopg2_pgevents import trigger
-from psycopg2_pgevents.sql import execute
+from psycopg2_pgevents.sql import execute, execute_prepared
 
 
 @fixture
@@ -20,6 +22,50 @@ def custom_schema_trigger_installed(connection):
     trigger.install_trigger(connection, "orders", schema="pointofsale")
 
 
+@fixture
+def statement_trigger_installed(connection):
+    trigger.install_trigger(connection, "settings", mode="statement")
+
+
+@fixture
+def trigger_cache_ttl():
+    yield trigger.set_trigger_cache_ttl
+    trigger.set_trigger_cache_ttl(trigger.DEFAULT_TRIGGER_CACHE_TTL)
+
+
+def _counting_execute(monkeypatch):
+    statements = []
+
+    def counting_execute(connection, statement, *args, **kwargs):
+        statements.append(statement)
+        return execute(connection, statement, *args, **kwargs)
+
+    def counting_execute_prepared(connection, name, statement, *args, **kwargs):
+        statements.append(statement)
+        return execute_prepared(connection, name, statement, *args, **kwargs)
+
+    monkeypatch.setattr(trigger, "execute", counting_execute)
+    monkeypatch.setattr(trigger, "execute_prepared", counting_execute_prepared)
+    return statements
+
+
+def _trigger_names(connection, table, schema="public"):
+    statement = """
+    SELECT
+        DISTINCT trigger_name
+    FROM
+        information_schema.triggers
+    WHERE
+        event_object_schema = '{schema}' AND
+        event_object_table = '{table}'
+    ORDER BY
+        trigger_name;
+    """.format(
+        schema=schema, table=table
+    )
+    return [row[0] for row in execute(connection, statement) or []]
+
+
 class TestTrigger:
     # TODO: add tests for install_trigger_function where:
     #       - overwrite=False, prior_install=True
@@ -216,3 +262,300 @@ class TestTrigger:
             trigger_installed = False
 
         assert not trigger_installed
+
+    @mark.usefixtures("trigger_fn_installed")
+    def test_add_statement_trigger(self, connection):
+        trigger.install_trigger(connection, "settings", mode="statement")
+
+        assert _trigger_names(connection, "settings") == [
+            "psycopg2_pgevents_trigger_delete",
+            "psycopg2_pgevents_trigger_insert",
+            "psycopg2_pgevents_trigger_update",
+        ]
+
+    @mark.usefixtures("trigger_fn_installed", "statement_trigger_installed")
+    def test_statement_trigger_installed(self, connection):
+        installed = trigger.trigger_installed(connection, "settings")
+
+        assert installed
+
+    @mark.usefixtures("trigger_fn_installed", "statement_trigger_installed")
+    def test_overwrite_statement_trigger_with_row_trigger(self, connection):
+        trigger.install_trigger(connection, "settings", overwrite=True)
+
+        assert _trigger_names(connection, "settings") == ["psycopg2_pgevents_trigger"]
+
+    @mark.usefixtures("trigger_fn_installed", "statement_trigger_installed")
+    def test_remove_statement_trigger(self, connection):
+        trigger.uninstall_trigger(connection, "settings")
+
+        assert _trigger_names(connection, "settings") == []
+
+    @mark.usefixtures("trigger_fn_installed")
+    def test_add_trigger_invalid_mode(self, connection):
+        with raises(ValueError):
+            trigger.install_trigger(connection, "settings", mode="table")
+
+        assert _trigger_names(connection, "settings") == []
+
+    @mark.usefixtures("trigger_fn_installed")
+    def test_add_buffered_trigger(self, connection):
+        trigger.install_trigger(connection, "settings", mode="buffered")
+
+        assert _trigger_names(connection, "settings") == [
+            "psycopg2_pgevents_trigger",
+            "psycopg2_pgevents_trigger_flush",
+        ]
+        assert trigger.trigger_installed(connection, "settings")
+
+    @mark.usefixtures("trigger_fn_installed")
+    def test_force_remove_trigger_function_removes_helpers(self, connection):
+        trigger.uninstall_trigger_function(connection, force=True)
+
+        result = execute(connection, "SELECT proname FROM pg_proc WHERE proname LIKE 'psycopg2\\_pgevents\\_%';")
+
+        assert result is None
+
+    @mark.parametrize("id_strategy", ["sequence", "txid"])
+    def test_add_trigger_function_without_uuid_extension(self, connection, id_strategy):
+        trigger.install_trigger_function(connection, id_strategy=id_strategy)
+
+        assert trigger.trigger_function_installed(connection)
+        assert execute(connection, "SELECT extname FROM pg_extension WHERE extname = 'uuid-ossp';") is None
+
+    def test_add_trigger_function_invalid_id_strategy(self, connection):
+        with raises(ValueError):
+            trigger.install_trigger_function(connection, id_strategy="random")
+
+        assert not trigger.trigger_function_installed(connection)
+
+    @mark.usefixtures("trigger_fn_installed")
+    def test_force_remove_trigger_function_removes_sequence(self, connection):
+        trigger.uninstall_trigger_function(connection, force=True)
+        trigger.install_trigger_function(connection, id_strategy="sequence")
+        trigger.uninstall_trigger_function(connection, force=True)
+
+        assert (
+            execute(connection, "SELECT relname FROM pg_class WHERE relname = 'psycopg2_pgevents_event_id_seq';")
+            is None
+        )
+
+    def test_triggers_not_installed(self, connection):
+        result = trigger.triggers_installed(connection, ["settings", ("pointofsale", "orders")])
+
+        assert result == {("public", "settings"): False, ("pointofsale", "orders"): False}
+
+    @mark.usefixtures("trigger_fn_installed", "public_schema_trigger_installed")
+    def test_triggers_installed(self, connection):
+        result = trigger.triggers_installed(connection, ["settings", ("pointofsale", "orders")])
+
+        assert result == {("public", "settings"): True, ("pointofsale", "orders"): False}
+
+    @mark.usefixtures("trigger_fn_installed", "public_schema_trigger_installed")
+    def test_add_triggers(self, connection, monkeypatch):
+        trigger.invalidate_trigger_cache(connection)
+        statements = _counting_execute(monkeypatch)
+
+        result = trigger.install_triggers(connection, ["settings", ("pointofsale", "orders")], mode="statement")
+
+        assert result == {("public", "settings"): False, ("pointofsale", "orders"): True}
+        # One query for installed triggers, one for key columns and one for the DDL, whatever the number of tables.
+        assert len(statements) == 3
+        assert _trigger_names(connection, "settings") == ["psycopg2_pgevents_trigger"]
+        assert _trigger_names(connection, "orders", schema="pointofsale") == [
+            "psycopg2_pgevents_trigger_delete",
+            "psycopg2_pgevents_trigger_insert",
+            "psycopg2_pgevents_trigger_update",
+        ]
+
+    @mark.usefixtures("trigger_fn_installed", "public_schema_trigger_installed")
+    def test_overwrite_triggers(self, connection):
+        result = trigger.install_triggers(
+            connection, ["settings", ("pointofsale", "orders")], overwrite=True, mode="buffered"
+        )
+
+        assert result == {("public", "settings"): True, ("pointofsale", "orders"): True}
+        assert _trigger_names(connection, "settings") == [
+            "psycopg2_pgevents_trigger",
+            "psycopg2_pgevents_trigger_flush",
+        ]
+
+    @mark.usefixtures("trigger_fn_installed")
+    def test_add_triggers_is_atomic(self, connection):
+        with raises(ProgrammingError):
+            trigger.install_triggers(connection, ["settings", "nonexistent"])
+
+        assert _trigger_names(connection, "settings") == []
+
+    @mark.usefixtures("trigger_fn_installed")
+    def test_add_triggers_invalid_mode(self, connection):
+        with raises(ValueError):
+            trigger.install_triggers(connection, ["settings"], mode="table")
+
+    @mark.usefixtures("trigger_fn_installed", "public_schema_trigger_installed")
+    def test_remove_triggers(self, connection):
+        result = trigger.uninstall_triggers(connection, ["settings", ("pointofsale", "orders")])
+
+        assert result == {("public", "settings"): True, ("pointofsale", "orders"): False}
+        assert _trigger_names(connection, "settings") == []
+
+    @mark.usefixtures("trigger_fn_installed", "public_schema_trigger_installed")
+    def test_trigger_installed_cached(self, connection, monkeypatch):
+        trigger.trigger_installed(connection, "settings")
+        statements = _counting_execute(monkeypatch)
+
+        assert trigger.trigger_installed(connection, "settings")
+        assert not trigger.trigger_installed(connection, "orders", schema="pointofsale")
+        assert trigger.triggers_installed(connection, ["settings"]) == {("public", "settings"): True}
+        assert statements == []
+
+    @mark.usefixtures("trigger_fn_installed")
+    def test_trigger_cache_invalidated_by_same_connection(self, connection):
+        assert not trigger.trigger_installed(connection, "settings")
+
+        trigger.install_trigger(connection, "settings")
+        assert trigger.trigger_installed(connection, "settings")
+
+        trigger.uninstall_trigger(connection, "settings")
+        assert not trigger.trigger_installed(connection, "settings")
+
+        trigger.install_triggers(connection, ["settings"])
+        assert trigger.trigger_installed(connection, "settings")
+
+        trigger.uninstall_trigger_function(connection, force=True)
+        assert not trigger.trigger_installed(connection, "settings")
+
+    @mark.usefixtures("trigger_fn_installed")
+    def test_trigger_cache_other_connection(self, connection, client):
+        assert not trigger.trigger_installed(connection, "settings")
+
+        trigger.install_trigger(client, "settings")
+        assert not trigger.trigger_installed(connection, "settings")
+
+        trigger.invalidate_trigger_cache(connection)
+        assert trigger.trigger_installed(connection, "settings")
+
+    @mark.usefixtures("trigger_fn_installed")
+    def test_install_trigger_ignores_cache(self, connection, client):
+        trigger.install_trigger(connection, "settings")
+        trigger.install_trigger(connection, "orders", schema="pointofsale")
+        assert trigger.trigger_installed(connection, "settings")
+
+        trigger.uninstall_trigger(client, "settings")
+        trigger.uninstall_trigger(client, "orders", schema="pointofsale")
+        # The cached state is stale, but installing does not rely on it
+        assert trigger.trigger_installed(connection, "settings")
+
+        trigger.install_trigger(connection, "settings")
+        assert trigger.install_triggers(connection, [("pointofsale", "orders")]) == {("pointofsale", "orders"): True}
+
+        assert _trigger_names(connection, "settings") != []
+        assert trigger.triggers_installed(connection, ["settings", ("pointofsale", "orders")], cached=False) == {
+            ("public", "settings"): True,
+            ("pointofsale", "orders"): True,
+        }
+
+    @mark.usefixtures("trigger_fn_installed")
+    def test_uninstall_triggers_ignores_cache(self, connection, client):
+        assert not trigger.trigger_installed(connection, "settings")
+
+        trigger.install_triggers(client, ["settings", ("pointofsale", "orders")])
+
+        assert trigger.uninstall_triggers(connection, ["settings", ("pointofsale", "orders")]) == {
+            ("public", "settings"): True,
+            ("pointofsale", "orders"): True,
+        }
+        assert _trigger_names(connection, "settings") == []
+        assert not trigger.trigger_installed(client, "orders", schema="pointofsale", cached=False)
+
+    @mark.usefixtures("trigger_fn_installed")
+    def test_trigger_cache_ttl(self, connection, client, trigger_cache_ttl):
+        trigger_cache_ttl(0.1)
+        assert not trigger.trigger_installed(connection, "settings")
+
+        trigger.install_trigger(client, "settings")
+        time.sleep(0.2)
+
+        assert trigger.trigger_installed(connection, "settings")
+
+    @mark.usefixtures("trigger_fn_installed", "public_schema_trigger_installed")
+    def test_trigger_cache_disabled(self, connection, monkeypatch, trigger_cache_ttl):
+        trigger_cache_ttl(0)
+        statements = _counting_execute(monkeypatch)
+
+        assert trigger.trigger_installed(connection, "settings")
+        assert trigger.trigger_installed(connection, "settings")
+        assert len(statements) == 2
+
+    def test_trigger_cache_invalid_ttl(self):
+        with raises(ValueError):
+            trigger.set_trigger_cache_ttl(-1)
+
+    @mark.usefixtures("trigger_fn_installed")
+    def test_add_trigger_invalid_channel(self, connection):
+        with raises(ValueError):
+            trigger.install_trigger(connection, "settings", channel="database")
+
+        with raises(ValueError):
+            trigger.install_triggers(connection, ["settings"], channel="database")
+
+        assert _trigger_names(connection, "settings") == []
+
+    @mark.usefixtures("trigger_fn_installed")
+    def test_add_changes_only_trigger(self, connection):
+        trigger.install_trigger(connection, "settings", changes_only=True)
+
+        assert _trigger_names(connection, "settings") == [
+            "psycopg2_pgevents_trigger",
+            "psycopg2_pgevents_trigger_update",
+        ]
+        assert trigger.trigger_installed(connection, "settings")
+
+    @mark.usefixtures("trigger_fn_installed")
+    def test_add_update_only_trigger(self, connection):
+        trigger.install_trigger(connection, "settings", operations=["update"], changes_only=True)
+
+        assert _trigger_names(connection, "settings") == ["psycopg2_pgevents_trigger_update"]
+        assert trigger.trigger_installed(connection, "settings")
+
+    @mark.parametrize(
+        "options",
+        [
+            {"operations": []},
+            {"operations": ["TRUNCATE"]},
+            {"operations": ["INSERT"], "columns": ["value"]},
+            {"key": ["missing"]},
+            {"key": ["id,key"]},
+            {"data": "columns"},
+            {"data_columns": ["value"]},
+        ],
+    )
+    @mark.usefixtures("trigger_fn_installed")
+    def test_add_trigger_invalid_filter(self, connection, options):
+        with raises(ValueError):
+            trigger.install_trigger(connection, "settings", **options)
+
+        assert _trigger_names(connection, "settings") == []
+
+    @mark.usefixtures("trigger_fn_installed")
+    def test_add_trigger_discovers_primary_key(self, connection):
+        execute(
+            connection, "CREATE TABLE public.order_lines (line int, order_id bigint, PRIMARY KEY (order_id, line));"
+        )
+
+        trigger.install_trigger(connection, "order_lines")
+
+        arguments = execute(
+            connection,
+            "SELECT encode(tgargs, 'escape') FROM pg_trigger WHERE tgrelid = 'public.order_lines'::regclass;",
+        )
+        assert arguments[0][0].split("\\000")[2:4] == ["order_id,line", "ii"]
+
+    @mark.usefixtures("trigger_fn_installed")
+    def test_add_trigger_without_key(self, connection):
+        execute(connection, "CREATE TABLE public.notes (body text);")
+
+        with raises(ValueError):
+            trigger.install_triggers(connection, ["settings", "notes"])
+
+        assert _trigger_names(connection, "settings") == []